@@ -0,0 +1,232 @@
+"""
+背景音模块
+==========
+为整段专注时间（25–90 分钟）流式生成背景音，内存占用与时长无关。
+
+音色：
+- brown：布朗噪声（白噪声经泄漏积分），低沉
+- pink：粉红噪声（Paul Kellet 简化滤波器）
+- binaural：双耳节拍，左右声道频率相差 beat 赫兹
+- rain：高通后的粉红噪声 + 随机雨滴
+
+实现：
+- 每种音色都是生成器，按固定帧数逐块产出 16 位 PCM 字节，滤波器状态跨块保持
+- 整块使用 NumPy 向量运算；未安装 NumPy 时背景音不可用（AVAILABLE 为 False）——
+  纯 Python 逐采样生成每 0.5 秒雨声约需 90 ms CPU，会在计时期间持续占用 GIL
+- AmbientPlayer 把块依次排入 pygame 混音器通道的队列，只保留当前块和下一块
+"""
+
+import math
+import threading
+from array import array
+
+from synth import HAS_NUMPY, np, PCM16_MIN, PCM16_MAX
+
+
+AMBIENT_KINDS = {
+    "brown": "🟤 布朗噪声",
+    "pink": "🌸 粉红噪声",
+    "binaural": "🎧 双耳节拍",
+    "rain": "🌧 雨声",
+}
+
+DEFAULT_CHUNK_SECONDS = 0.5
+
+# 背景音需要 NumPy
+AVAILABLE = HAS_NUMPY
+
+
+# ---------- 块运算后端 ----------
+
+class NumpyOps:
+    """NumPy 向量化块运算"""
+
+    def __init__(self, seed=None):
+        self._rng = np.random.default_rng(seed)
+
+    def white(self, n):
+        return self._rng.uniform(-1.0, 1.0, n)
+
+    def one_pole(self, x, a, state):
+        """
+        y[n] = a * y[n-1] + x[n] 的向量化求解
+        y[n] = a^n * (a * y0 + Σ x[k] * a^-k)，分段计算避免 a^-k 溢出
+        """
+        if a == 0:
+            return x.copy(), float(x[-1]) if len(x) else state
+        block = max(1, min(len(x), int(600 / -math.log(abs(a))) if abs(a) < 1 else len(x)))
+        y = np.empty(len(x))
+        for start in range(0, len(x), block):
+            segment = x[start:start + block]
+            k = np.arange(len(segment))
+            powers = np.power(a, k, dtype=np.float64)
+            y[start:start + len(segment)] = powers * (a * state + np.cumsum(segment / powers))
+            state = float(y[start + len(segment) - 1])
+        return y, state
+
+    def sine(self, frequency, n, phase, sample_rate):
+        step = 2 * math.pi * frequency / sample_rate
+        values = np.sin(phase + step * np.arange(n))
+        return values, (phase + n * step) % (2 * math.pi)
+
+    def impulses(self, n, rate, sample_rate):
+        hits = self._rng.random(n) < rate / sample_rate
+        return np.where(hits, 0.3 + 0.7 * self._rng.random(n), 0.0)
+
+    @staticmethod
+    def mix(*terms):
+        total = np.zeros(len(terms[0][0]))
+        for values, gain in terms:
+            total += gain * values
+        return total
+
+    @staticmethod
+    def mul(a, b):
+        return a * b
+
+    @staticmethod
+    def pcm16_stereo(left, right, volume):
+        frames = np.empty((len(left), 2))
+        frames[:, 0] = left
+        frames[:, 1] = right
+        frames *= volume * PCM16_MAX
+        return np.clip(frames, PCM16_MIN, PCM16_MAX).astype('<i2').tobytes()
+
+
+def create_ops(seed=None):
+    """创建块运算对象；未安装 NumPy 时抛出 RuntimeError"""
+    if not HAS_NUMPY:
+        raise RuntimeError("背景音需要 NumPy")
+    return NumpyOps(seed)
+
+
+# ---------- 音色生成器 ----------
+
+def brown_noise(ops, frames, sample_rate):
+    """布朗噪声：白噪声经泄漏积分（泄漏防止直流漂移）"""
+    state = 0.0
+    while True:
+        values, state = ops.one_pole(ops.white(frames), 0.998, state)
+        yield values, values, 0.06
+
+
+def pink_noise(ops, frames, sample_rate):
+    """粉红噪声：Paul Kellet 简化三极点滤波器"""
+    states = [0.0, 0.0, 0.0]
+    poles = ((0.99765, 0.0990460), (0.96300, 0.2965164), (0.57000, 1.0526913))
+    while True:
+        white = ops.white(frames)
+        terms = [(white, 0.1848)]
+        for i, (a, gain) in enumerate(poles):
+            values, states[i] = ops.one_pole(white, a, states[i])
+            terms.append((values, gain * (1 - a)))
+        values = ops.mix(*terms)
+        yield values, values, 2.0
+
+
+def binaural(ops, frames, sample_rate, base=200.0, beat=10.0):
+    """双耳节拍：左声道 base 赫兹，右声道 base + beat 赫兹"""
+    left_phase = right_phase = 0.0
+    while True:
+        left, left_phase = ops.sine(base, frames, left_phase, sample_rate)
+        right, right_phase = ops.sine(base + beat, frames, right_phase, sample_rate)
+        yield left, right, 0.5
+
+
+def rain(ops, frames, sample_rate, drops_per_second=40):
+    """雨声：高通粉红噪声作底 + 随机雨滴（噪声短脉冲）"""
+    bed = pink_noise(ops, frames, sample_rate)
+    low_state = drop_state = 0.0
+    while True:
+        noise, _, _ = next(bed)
+        low, low_state = ops.one_pole(noise, 0.95, low_state)
+        hiss = ops.mix((noise, 1.0), (low, -0.05))
+        drops = ops.impulses(frames, drops_per_second, sample_rate)
+        envelope, drop_state = ops.one_pole(drops, 0.993, drop_state)
+        splash = ops.mul(envelope, ops.white(frames))
+        values = ops.mix((hiss, 1.2), (splash, 0.25))
+        yield values, values, 1.0
+
+
+GENERATORS = {
+    "brown": brown_noise,
+    "pink": pink_noise,
+    "binaural": binaural,
+    "rain": rain,
+}
+
+
+def ambient_chunks(kind, sample_rate=44100, chunk_seconds=DEFAULT_CHUNK_SECONDS, volume=0.3,
+                   seed=None):
+    """
+    无限产出某种背景音的 16 位立体声 PCM 块
+    每块 chunk_seconds 秒，内存占用只与块大小有关
+    """
+    if kind not in GENERATORS:
+        raise ValueError(f"未知的背景音: {kind}")
+    ops = create_ops(seed)
+    frames = max(1, int(sample_rate * chunk_seconds))
+    for left, right, gain in GENERATORS[kind](ops, frames, sample_rate):
+        yield ops.pcm16_stereo(left, right, volume * gain)
+
+
+# ---------- 输出 ----------
+
+class AmbientPlayer:
+    """
+    通过 pygame 混音器通道流式播放背景音
+    通道中只有“正在播放”和“已排队”两个块，播完一块再生成下一块
+    """
+
+    def __init__(self, pygame, kind, volume=0.3, chunk_seconds=DEFAULT_CHUNK_SECONDS):
+        self._pygame = pygame
+        self.kind = kind
+        self.volume = volume
+        self.chunk_seconds = chunk_seconds
+        self._thread = None
+        self._stop = threading.Event()
+        self.chunks = 0
+
+    @property
+    def is_playing(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.is_playing:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._feed, name="ambient", daemon=True)
+        self._thread.start()
+
+    def _feed(self):
+        mixer = self._pygame.mixer
+        frequency, _, channels = mixer.get_init()
+        chunks = ambient_chunks(self.kind, frequency, self.chunk_seconds, self.volume)
+        channel = mixer.find_channel(True)
+
+        def next_sound():
+            data = next(chunks)
+            if channels == 1:
+                data = _downmix(data)
+            self.chunks += 1
+            return mixer.Sound(buffer=data)
+
+        channel.play(next_sound())
+        channel.queue(next_sound())
+        poll = self.chunk_seconds / 4
+        while not self._stop.wait(poll):
+            if channel.get_queue() is None:
+                channel.queue(next_sound())
+        channel.fadeout(300)
+
+    def stop(self):
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=1)
+
+
+def _downmix(data):
+    """立体声 16 位 PCM 取左声道转为单声道"""
+    pcm = array('h', data)
+    return pcm[::2].tobytes()
@@ -0,0 +1,312 @@
+"""
+音频播放支持模块
+================
+为番茄钟提供与界面无关的音频基础设施。
+
+功能：
+- SoundBank：预解码的内存铃声库，播放时无需磁盘 I/O 和解码
+- AudioDispatcher：共享的音频调度器（有界队列 + 固定工作线程池）
+"""
+
+import time
+import threading
+from collections import OrderedDict, deque
+
+import metrics
+
+
+class SoundBank:
+    """
+    内存铃声库
+    内置铃声解码一次后常驻内存，自定义铃声放入有界 LRU 缓存
+    """
+
+    DEFAULT_CAPACITY = 4  # 自定义铃声最多缓存数量
+
+    def __init__(self, loader, capacity=DEFAULT_CAPACITY, on_evict=None):
+        """
+        loader: 将文件路径解码为可播放对象的函数（如 pygame.mixer.Sound）
+        capacity: 自定义铃声 LRU 容量
+        on_evict: 自定义铃声被挤出 LRU 或清空时的回调，参数为文件路径（释放解码资源）
+        """
+        self._loader = loader
+        self._on_evict = on_evict
+        self._capacity = max(1, capacity)
+        self._pinned = {}
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _decode(self, path):
+        """解码音频文件，失败时返回 None"""
+        try:
+            return self._loader(path)
+        except Exception as e:
+            print(f"解码铃声失败 {path}: {e}")
+            return None
+
+    def preload(self, paths):
+        """预解码并常驻内置铃声"""
+        for path in paths:
+            if path in self._pinned:
+                continue
+            sound = self._decode(path)
+            if sound is not None:
+                with self._lock:
+                    self._pinned[path] = sound
+
+    def load(self, path, reload=False):
+        """
+        解码自定义铃声并放入 LRU 缓存
+        reload 为 True 时丢弃旧的解码结果（文件可能已被替换）
+        """
+        if not path:
+            return None
+
+        with self._lock:
+            if path in self._pinned:
+                return self._pinned[path]
+            if not reload and path in self._recent:
+                self._recent.move_to_end(path)
+                return self._recent[path]
+
+        sound = self._decode(path)
+        if sound is None:
+            return None
+
+        evicted = []
+        with self._lock:
+            self._recent[path] = sound
+            self._recent.move_to_end(path)
+            while len(self._recent) > self._capacity:
+                evicted.append(self._recent.popitem(last=False)[0])
+        self._evict(evicted)
+        return sound
+
+    def _evict(self, paths):
+        """在锁外通知被移出缓存的路径"""
+        if self._on_evict is None:
+            return
+        for path in paths:
+            try:
+                self._on_evict(path)
+            except Exception as e:
+                print(f"释放铃声失败 {path}: {e}")
+
+    def get(self, path):
+        """获取已解码的铃声，未命中时解码并缓存"""
+        with self._lock:
+            sound = self._pinned.get(path)
+            if sound is None:
+                sound = self._recent.get(path)
+                if sound is not None:
+                    self._recent.move_to_end(path)
+            if sound is not None:
+                self.hits += 1
+                return sound
+            self.misses += 1
+        return self.load(path)
+
+    def __contains__(self, path):
+        with self._lock:
+            return path in self._pinned or path in self._recent
+
+    def clear(self):
+        """清空所有缓存"""
+        with self._lock:
+            self._pinned.clear()
+            evicted = list(self._recent)
+            self._recent.clear()
+        self._evict(evicted)
+
+
+class AudioDispatcher:
+    """
+    音频调度器
+    所有播放请求进入一个有界队列，由固定数量的工作线程依次执行。
+
+    合并策略：
+    - preview：新的试听请求替换队列中尚未开始的试听
+    - reminder：相同铃声已在排队或刚播放过（dedupe_window 秒内）时丢弃
+    - alarm：结束铃声插到队首，并移除排队中的间隔提醒
+
+    以 start_paused=True 创建时，请求只排队不播放，直到调用 open()
+    （用于音频后端在后台初始化期间暂存播放请求）
+    """
+
+    PREVIEW = "preview"
+    REMINDER = "reminder"
+    ALARM = "alarm"
+
+    def __init__(self, player, workers=2, max_queue=8, dedupe_window=1.0, clock=time.monotonic,
+                 start_paused=False):
+        """
+        player: 实际播放函数，接收文件路径
+        workers: 工作线程数
+        max_queue: 队列容量
+        dedupe_window: 重复间隔提醒的合并窗口（秒）
+        start_paused: 是否在 open() 之前暂缓播放
+        """
+        self._player = player
+        self._workers_count = max(1, workers)
+        self._max_queue = max(1, max_queue)
+        self._dedupe_window = dedupe_window
+        self._clock = clock
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._workers = []
+        self._stopped = False
+        self._open = not start_paused
+        self._last_started = {}
+
+        self.submitted = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.played = 0
+        self.failed = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+        self._local = threading.local()
+        self._start_latency = metrics.histogram(
+            "pomodoro_audio_queue_wait_seconds", "播放请求在队列中等待的时间")
+        self._played_total = metrics.counter("pomodoro_audio_played_total", "已播放的铃声数")
+        self._failed_total = metrics.counter("pomodoro_audio_failed_total", "播放失败次数")
+        self._dropped_total = metrics.counter("pomodoro_audio_dropped_total", "因队列满被丢弃的请求数")
+
+    def _ensure_workers(self):
+        """首次提交时再启动工作线程"""
+        if self._workers:
+            return
+        for i in range(self._workers_count):
+            worker = threading.Thread(target=self._worker_loop, name=f"audio-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, path, kind=REMINDER):
+        """
+        提交播放请求
+        返回 True 表示已入队，False 表示被合并或丢弃
+        """
+        if not path:
+            return False
+
+        with self._cond:
+            if self._stopped:
+                return False
+            self.submitted += 1
+            now = self._clock()
+            request = (kind, path, now)
+
+            if kind == self.PREVIEW:
+                before = len(self._queue)
+                self._queue = deque(r for r in self._queue if r[0] != self.PREVIEW)
+                self.coalesced += before - len(self._queue)
+
+            elif kind == self.REMINDER:
+                last = self._last_started.get((kind, path))
+                duplicate = any(r[0] == kind and r[1] == path for r in self._queue)
+                if duplicate or (last is not None and now - last < self._dedupe_window):
+                    self.coalesced += 1
+                    return False
+
+            elif kind == self.ALARM:
+                before = len(self._queue)
+                self._queue = deque(r for r in self._queue if r[0] != self.REMINDER)
+                self.coalesced += before - len(self._queue)
+
+            if len(self._queue) >= self._max_queue:
+                if kind != self.ALARM:
+                    self.dropped += 1
+                    self._dropped_total.inc()
+                    return False
+                # 为结束铃声腾出位置：丢弃最旧的非结束铃声请求
+                for victim in self._queue:
+                    if victim[0] != self.ALARM:
+                        self._queue.remove(victim)
+                        break
+                else:
+                    self._queue.pop()
+                self.dropped += 1
+                self._dropped_total.inc()
+
+            if kind == self.ALARM:
+                self._queue.appendleft(request)
+            else:
+                self._queue.append(request)
+
+            self._ensure_workers()
+            self._cond.notify()
+        return True
+
+    def _worker_loop(self):
+        """工作线程：取出请求并播放"""
+        while True:
+            with self._cond:
+                while not (self._queue and self._open) and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                kind, path, submitted_at = self._queue.popleft()
+                started_at = self._clock()
+                self._last_started[(kind, path)] = started_at
+                latency = started_at - submitted_at
+                self._latency_total += latency
+                self._latency_max = max(self._latency_max, latency)
+            self._start_latency.record(latency)
+
+            self._local.submitted_at = submitted_at
+            try:
+                self._player(path)
+                ok = True
+            except Exception as e:
+                print(f"音频播放失败: {e}")
+                ok = False
+            self._local.submitted_at = None
+
+            with self._cond:
+                if ok:
+                    self.played += 1
+                    self._played_total.inc()
+                else:
+                    self.failed += 1
+                    self._failed_total.inc()
+
+    def request_age(self):
+        """
+        当前工作线程正在播放的请求自提交以来经过的秒数
+        在播放函数内调用，用于测量“请求到实际开始播放”的延迟；其他线程中返回 None
+        """
+        submitted_at = getattr(self._local, "submitted_at", None)
+        if submitted_at is None:
+            return None
+        return self._clock() - submitted_at
+
+    def open(self):
+        """开始播放排队中的请求"""
+        with self._cond:
+            self._open = True
+            self._cond.notify_all()
+
+    def metrics(self):
+        """调度器统计：队列深度、丢弃/合并数量、启动延迟"""
+        with self._cond:
+            started = self.played + self.failed
+            return {
+                "queue_depth": len(self._queue),
+                "submitted": self.submitted,
+                "dropped": self.dropped,
+                "coalesced": self.coalesced,
+                "played": self.played,
+                "failed": self.failed,
+                "start_latency_avg": self._latency_total / started if started else 0.0,
+                "start_latency_max": self._latency_max,
+            }
+
+    def stop(self):
+        """停止调度器，丢弃尚未开始的请求"""
+        with self._cond:
+            self._stopped = True
+            self._queue.clear()
+            self._cond.notify_all()
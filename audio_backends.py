@@ -0,0 +1,374 @@
+"""
+音频后端模块
+============
+统一的音频后端接口，播放逻辑不再按后端名称分支。
+
+后端：
+- pygame：预解码到内存，支持混音器原生 PCM 与流式背景音
+- playsound：按文件播放（阻塞，由调度器工作线程执行）
+- winsound：Windows 自带，只支持 WAV
+- null：不出声，只记录带时间戳的播放请求（测量请求到播放的延迟）
+- wav-sink：软件混音器，把所有播放按时间轴叠加混音后写入 WAV 文件
+  （无声卡的无界面 Linux CI 上检查重叠播放、吞吐量与时序）
+
+create_backend("auto") 依次尝试 pygame、playsound、winsound。
+"""
+
+import sys
+import time
+import wave
+import threading
+from array import array
+from collections import deque, namedtuple
+
+
+BACKEND_NAMES = ("auto", "pygame", "playsound", "winsound", "null", "wav-sink")
+DEFAULT_SINK_PATH = "pomodoro_sink.wav"
+
+
+def system_beep():
+    """系统提示音：Windows 使用 MessageBeep，其他平台输出响铃字符"""
+    try:
+        import winsound
+        winsound.MessageBeep(winsound.MB_ICONEXCLAMATION)
+    except ImportError:
+        print("\a", end="", flush=True)
+    except Exception as e:
+        print(f"系统提示音播放失败: {e}")
+
+
+class AudioBackend:
+    """
+    音频后端接口
+    load() 的返回值由 SoundBank 缓存，之后传给 play() / play_blocking()
+    """
+
+    name = None
+    formats = None   # 可直接加载的文件格式（pcm_cache.probe_format 的结果），None 表示不限
+
+    def check_format(self, path):
+        """文件格式不受本后端支持时抛出 ValueError（无法读取时抛出 OSError）"""
+        if self.formats is None:
+            return
+        import pcm_cache
+        kind = pcm_cache.probe_format(path)
+        if kind not in self.formats:
+            raise ValueError(f"{self.name} 后端不支持 {kind.upper()} 铃声，"
+                             f"请改用 {'/'.join(f.upper() for f in self.formats)} 文件或使用 pygame 后端")
+
+    def load(self, path):
+        """把音频文件准备为可播放对象；默认不解码，直接使用路径"""
+        return path
+
+    def load_pcm(self, data):
+        """由混音器原生 16 位 PCM 构造可播放对象（仅 pcm_decoder() 不为 None 的后端）"""
+        raise NotImplementedError
+
+    def pcm_decoder(self):
+        """供 pcm_cache 使用的解码函数；不支持直接播放 PCM 的后端返回 None"""
+        return None
+
+    def play(self, sound):
+        """开始播放（可能阻塞到播放结束，由调度器工作线程调用）"""
+        raise NotImplementedError
+
+    def play_blocking(self, sound):
+        """播放并等待结束"""
+        self.play(sound)
+
+    def stream(self, kind, volume):
+        """创建流式背景音播放器；不支持时返回 None"""
+        return None
+
+    def beep(self):
+        system_beep()
+
+    def close(self):
+        pass
+
+
+class PygameBackend(AudioBackend):
+    """pygame 混音器"""
+
+    name = "pygame"
+
+    def __init__(self):
+        import pygame
+        pygame.mixer.init()
+        self.pygame = pygame
+
+    def load(self, path):
+        return self.pygame.mixer.Sound(path)
+
+    def load_pcm(self, data):
+        return self.pygame.mixer.Sound(buffer=data)
+
+    def pcm_decoder(self):
+        import pcm_cache
+        return pcm_cache.pygame_decoder(self.pygame)
+
+    def play(self, sound):
+        sound.play()
+
+    def play_blocking(self, sound):
+        sound.play()
+        time.sleep(sound.get_length())
+
+    def stream(self, kind, volume):
+        import ambient
+        if not ambient.AVAILABLE:
+            return None
+        return ambient.AmbientPlayer(self.pygame, kind, volume)
+
+    def close(self):
+        try:
+            self.pygame.mixer.quit()
+        except Exception:
+            pass
+
+
+class PlaysoundBackend(AudioBackend):
+    """playsound（按文件播放，阻塞到播放结束）"""
+
+    name = "playsound"
+
+    def __init__(self):
+        from playsound import playsound
+        self._playsound = playsound
+
+    def play(self, sound):
+        self._playsound(sound)
+
+
+class WinsoundBackend(AudioBackend):
+    """Windows winsound（只支持 WAV）"""
+
+    name = "winsound"
+    formats = ("wav",)
+
+    def __init__(self):
+        import winsound
+        self._winsound = winsound
+
+    def load(self, path):
+        self.check_format(path)
+        return path
+
+    def play(self, sound):
+        self._winsound.PlaySound(sound, self._winsound.SND_FILENAME | self._winsound.SND_ASYNC)
+
+    def play_blocking(self, sound):
+        self._winsound.PlaySound(sound, self._winsound.SND_FILENAME)
+
+
+PlayEvent = namedtuple("PlayEvent", ["time", "sound"])
+
+
+class NullBackend(AudioBackend):
+    """不出声，只记录播放请求的时间戳（最多 max_events 条）"""
+
+    name = "null"
+
+    def __init__(self, clock=time.monotonic, max_events=10000):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.events = deque(maxlen=max_events)
+        self.plays = 0
+        self.beeps = 0
+
+    def play(self, sound):
+        with self._lock:
+            self.events.append(PlayEvent(self._clock(), sound))
+            self.plays += 1
+
+    def beep(self):
+        with self._lock:
+            self.beeps += 1
+
+
+class SinkSound:
+    """wav-sink 后端中已转换为混音格式的声音"""
+
+    __slots__ = ("name", "samples")
+
+    def __init__(self, name, samples):
+        self.name = name
+        self.samples = samples   # array('h')，交织的立体声
+
+    @property
+    def frames(self):
+        return len(self.samples) // 2
+
+
+class WavSinkBackend(AudioBackend):
+    """
+    软件混音器：每次播放按请求时刻放到时间轴上，close() 时把所有声音叠加混音
+    （限幅）写入 16 位立体声 WAV，并统计最大同时发声数与削波采样数
+    """
+
+    name = "wav-sink"
+    formats = ("wav",)
+    CHUNK_FRAMES = 44100
+
+    def __init__(self, path=DEFAULT_SINK_PATH, sample_rate=44100, clock=time.monotonic,
+                 sleep=time.sleep):
+        self.path = path
+        self.sample_rate = sample_rate
+        self._clock = clock
+        self._sleep = sleep
+        self._origin = clock()
+        self._lock = threading.Lock()
+        self._voices = []          # (开始帧, SinkSound)
+        self.plays = 0
+        self.max_overlap = 0
+        self.clipped = 0
+        self.frames_written = 0
+
+    # ---------- 加载 ----------
+
+    def load(self, path):
+        """读取 16 位 WAV 并转换为混音格式（立体声、混音采样率）"""
+        self.check_format(path)
+        try:
+            with wave.open(path, "rb") as wav_file:
+                if wav_file.getsampwidth() != 2:
+                    raise ValueError(f"wav-sink 后端只支持 16 位 WAV，请先转换: {path}")
+                channels = wav_file.getnchannels()
+                rate = wav_file.getframerate()
+                data = wav_file.readframes(wav_file.getnframes())
+        except (wave.Error, EOFError) as e:
+            raise ValueError(f"无法读取 WAV 文件 {path}: {e}") from e
+        return SinkSound(path, self._convert(data, rate, channels))
+
+    def _convert(self, data, rate, channels):
+        samples = array('h')
+        samples.frombytes(data[:len(data) // (2 * channels) * 2 * channels])
+        if sys.byteorder == "big":
+            samples.byteswap()
+        frames = len(samples) // channels
+        if channels == 1:
+            left = right = samples
+        else:
+            left, right = samples[0::channels], samples[1::channels]
+        if rate != self.sample_rate:
+            # 最近邻重采样（只用于测试输出，不追求音质）
+            step = rate / self.sample_rate
+            count = int(frames / step)
+            left = array('h', (left[int(i * step)] for i in range(count)))
+            right = left if channels == 1 else array('h', (right[int(i * step)] for i in range(count)))
+            frames = count
+        stereo = array('h', bytes(4 * frames))
+        stereo[0::2] = left[:frames]
+        stereo[1::2] = right[:frames]
+        return stereo
+
+    # ---------- 播放 ----------
+
+    def play(self, sound):
+        start = int(round((self._clock() - self._origin) * self.sample_rate))
+        with self._lock:
+            self._voices.append((start, sound))
+            self.plays += 1
+
+    def play_blocking(self, sound):
+        self.play(sound)
+        self._sleep(sound.frames / self.sample_rate)
+
+    def beep(self):
+        """提示音以 0.1 秒 880 Hz 方波写入时间轴"""
+        period = max(2, self.sample_rate // 880)
+        frames = self.sample_rate // 10
+        tone = array('h', (8000 if (i // 2) % period < period // 2 else -8000
+                           for i in range(2 * frames)))
+        self.play(SinkSound("beep", tone))
+
+    # ---------- 混音输出 ----------
+
+    def _overlap(self, voices):
+        """同时发声的最大数量"""
+        edges = sorted([(start, 1) for start, sound in voices] +
+                       [(start + sound.frames, -1) for start, sound in voices])
+        current = peak = 0
+        for _, delta in edges:
+            current += delta
+            peak = max(peak, current)
+        return peak
+
+    def mix(self):
+        """按块混音全部声音并写出 WAV，返回写出的帧数"""
+        with self._lock:
+            voices = sorted(self._voices, key=lambda voice: voice[0])
+        total = max((start + sound.frames for start, sound in voices), default=0)
+        self.max_overlap = self._overlap(voices)
+        self.clipped = 0
+        chunk = self.CHUNK_FRAMES
+        with wave.open(self.path, "wb") as wav_file:
+            wav_file.setnchannels(2)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(self.sample_rate)
+            for chunk_start in range(0, total, chunk):
+                chunk_end = min(total, chunk_start + chunk)
+                out = array('h', bytes(4 * (chunk_end - chunk_start)))
+                parts = []
+                for start, sound in voices:
+                    if start >= chunk_end:
+                        break
+                    lo = max(start, chunk_start)
+                    hi = min(start + sound.frames, chunk_end)
+                    if lo < hi:
+                        parts.append((2 * (lo - chunk_start), sound.samples[2 * (lo - start):2 * (hi - start)]))
+                if len(parts) == 1:
+                    # 只有一个声音：直接复制，无需求和与限幅
+                    base, src = parts[0]
+                    out[base:base + len(src)] = src
+                elif parts:
+                    acc = [0] * len(out)
+                    for base, src in parts:
+                        for i, value in enumerate(src, base):
+                            acc[i] += value
+                    for i, value in enumerate(acc):
+                        if value > 32767:
+                            value = 32767
+                            self.clipped += 1
+                        elif value < -32768:
+                            value = -32768
+                            self.clipped += 1
+                        out[i] = value
+                if sys.byteorder == "big":
+                    out.byteswap()
+                wav_file.writeframes(out.tobytes())
+        self.frames_written = total
+        return total
+
+    def close(self):
+        try:
+            self.mix()
+        except OSError as e:
+            print(f"写出混音文件失败: {e}")
+
+
+def create_backend(name="auto", sink_path=None):
+    """
+    按名称创建音频后端；"auto" 依次尝试 pygame、playsound、winsound
+    指定的后端不可用时返回 None
+    """
+    if name == "null":
+        return NullBackend()
+    if name == "wav-sink":
+        return WavSinkBackend(sink_path or DEFAULT_SINK_PATH)
+    candidates = {
+        "pygame": (PygameBackend,),
+        "playsound": (PlaysoundBackend,),
+        "winsound": (WinsoundBackend,),
+        "auto": (PygameBackend, PlaysoundBackend, WinsoundBackend),
+    }.get(name)
+    if candidates is None:
+        raise ValueError(f"未知的音频后端: {name}")
+    for cls in candidates:
+        try:
+            return cls()
+        except ImportError:
+            continue
+        except Exception as e:
+            print(f"{cls.name} 音频初始化失败: {e}")
+    return None
@@ -0,0 +1,111 @@
+"""
+音频后端基准测试
+================
+无需声卡：用 null 后端测量播放请求从提交到实际播放的延迟和调度吞吐，
+用 wav-sink 后端检查重叠播放的混音结果与软件混音速度。
+
+运行：
+    python benchmarks/bench_audio.py
+    python benchmarks/bench_audio.py --requests 5000 --sink out.wav
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio import SoundBank, AudioDispatcher
+from audio_backends import NullBackend, WavSinkBackend
+from metrics import Histogram
+from timer_engine import FakeClock
+import sounds
+
+
+def dispatch_latency(requests, workers=2):
+    """
+    通过调度器向 null 后端提交 requests 个播放请求
+    返回 (请求到播放延迟直方图, 每秒播放数)
+    """
+    backend = NullBackend()
+    bank = SoundBank(backend.load)
+    latency = Histogram("latency")
+    dispatcher = None
+
+    def player(path):
+        age = dispatcher.request_age()
+        backend.play(bank.get(path))
+        latency.record(age)
+
+    dispatcher = AudioDispatcher(player, workers=workers, max_queue=requests)
+    begin = time.perf_counter()
+    for i in range(requests):
+        dispatcher.submit(f"sound-{i}.wav", AudioDispatcher.REMINDER)
+    while dispatcher.played + dispatcher.failed + dispatcher.dropped < requests:
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - begin
+    dispatcher.stop()
+    assert backend.plays == requests, f"只播放了 {backend.plays}/{requests} 个请求"
+    return latency, requests / elapsed
+
+
+def sink_mix(path, overlap=3, repeats=20):
+    """
+    在 wav-sink 时间轴上每隔 0.2 秒叠加 overlap 个内置铃声，重复 repeats 轮
+    返回 (后端, 混音耗时秒数)
+    """
+    clock = FakeClock()
+    backend = WavSinkBackend(path, clock=clock, sleep=clock.sleep)
+    names = [sounds.get_alarm_sound(), sounds.get_ding_sound()] + \
+        [sounds.get_builtin_sound(name) for name in ("bell", "chime")]
+    loaded = [backend.load(name) for name in names]
+    for _ in range(repeats):
+        for i in range(overlap):
+            backend.play(loaded[i % len(loaded)])
+            clock.advance(0.2)
+        clock.advance(2.0)
+    begin = time.perf_counter()
+    backend.mix()
+    return backend, time.perf_counter() - begin
+
+
+def run(requests=2000, sink_path=None):
+    latency, rate = dispatch_latency(requests)
+    if sink_path is None:
+        sink_path = os.path.join(tempfile.mkdtemp(), "sink.wav")
+    sink, mix_seconds = sink_mix(sink_path)
+    return {
+        "latency": latency.snapshot(),
+        "plays_per_second": rate,
+        "sink_path": sink_path,
+        "sink_plays": sink.plays,
+        "sink_max_overlap": sink.max_overlap,
+        "sink_clipped": sink.clipped,
+        "sink_audio_seconds": sink.frames_written / sink.sample_rate,
+        "sink_mix_seconds": mix_seconds,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="音频后端基准测试")
+    parser.add_argument("--requests", type=int, default=2000, help="提交的播放请求数")
+    parser.add_argument("--sink", default=None, help="wav-sink 输出文件（默认写入临时目录）")
+    args = parser.parse_args(argv)
+
+    sounds.get_sound_generator().generate_all_sounds()
+    results = run(args.requests, args.sink)
+    latency = results["latency"]
+    print(f"请求到播放延迟: p50 {latency['p50'] * 1000:.3f} ms  p99 {latency['p99'] * 1000:.3f} ms  "
+          f"最大 {latency['max'] * 1000:.3f} ms")
+    print(f"调度吞吐: {results['plays_per_second']:.0f} 次/秒")
+    print(f"wav-sink: {results['sink_plays']} 次播放，最多同时 {results['sink_max_overlap']} 个声音，"
+          f"削波 {results['sink_clipped']} 个采样")
+    speed = results["sink_audio_seconds"] / max(results["sink_mix_seconds"], 1e-9)
+    print(f"软件混音: {results['sink_audio_seconds']:.1f} 秒音频用时 "
+          f"{results['sink_mix_seconds'] * 1000:.0f} ms（{speed:.0f}x 实时） -> {results['sink_path']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+"""
+铃声管线与计时核心基准测试
+==========================
+测量：
+- SoundGenerator 各 generate_* 方法（冷：合成 + 写盘；热：已缓存）
+- _save_wav 写盘吞吐（MB/s）
+- get_builtin_sounds() 冷启动（空目录）、温启动（新进程读缓存清单）、热调用
+- 纯 Python 后端冷启动时串行合成与进程池并行合成全部内置铃声的耗时
+- 配置加载 / 保存（ConfigStore.load、save 登记、同步写盘）
+- 模拟长时间会话的计时偏差（模拟时钟，无需真实等待）
+
+结果写为 JSON，便于在无界面的 Linux 机器上比较不同提交之间的回归。
+
+运行：
+    python benchmarks/bench_core.py
+    python benchmarks/bench_core.py --output results.json --compare baseline.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sounds import SoundGenerator
+from synth import create_synth
+from config_store import ConfigStore
+from timer_engine import TimerEngine, FakeClock, simulate_session
+
+
+GENERATE_METHODS = {
+    "ding": "generate_ding",
+    "bell": "generate_bell",
+    "alarm": "generate_alarm",
+    "chime": "generate_soft_chime",
+    "double_beep": "generate_double_beep",
+}
+
+
+# 模拟会话（含抖动、处理耗时与暂停）允许的最大完成偏差（秒）
+MAX_COMPLETION_DRIFT = 0.010
+
+
+def measure(func, repeat, setup=None):
+    """执行 repeat 次，返回耗时统计（秒）；setup 的耗时不计入"""
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        begin = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - begin)
+    return {
+        "runs": repeat,
+        "mean": statistics.fmean(samples),
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "max": max(samples),
+    }
+
+
+class ScratchDir:
+    """每次测量使用的临时铃声目录"""
+
+    def __init__(self):
+        self.path = tempfile.mkdtemp(prefix="pomodoro-bench-")
+
+    def reset(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.makedirs(self.path)
+
+    def close(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def bench_generate(scratch, repeat):
+    """各 generate_* 方法的冷/热耗时"""
+    results = {}
+    for name, method in GENERATE_METHODS.items():
+        state = {}
+
+        def setup():
+            scratch.reset()
+            state["generator"] = SoundGenerator(scratch.path)
+
+        cold = measure(lambda: getattr(state["generator"], method)(), repeat, setup)
+        generator = SoundGenerator(scratch.path)
+        getattr(generator, method)()
+        hot = measure(lambda: getattr(generator, method)(), repeat * 20)
+        results[name] = {"cold": cold, "hot": hot}
+    return results
+
+
+def bench_parallel(scratch, repeat):
+    """
+    纯 Python 后端冷启动合成全部铃声：串行 / 进程池并行 / 最慢的单个铃声
+    理想情况下并行耗时接近最慢的单个铃声
+    单核机器上不创建进程池，两者都是串行
+    """
+    state = {}
+    workers = os.cpu_count() or 1
+
+    def setup():
+        scratch.reset()
+        generator = SoundGenerator(scratch.path)
+        generator.synth = create_synth(generator.SAMPLE_RATE, "array")
+        state["generator"] = generator
+
+    serial = measure(lambda: state["generator"].generate_all_sounds(workers=0), repeat, setup)
+    parallel = measure(lambda: state["generator"].generate_all_sounds(workers=max(2, workers)),
+                       repeat, setup)
+    slowest = 0.0
+    for method in GENERATE_METHODS.values():
+        timing = measure(lambda: getattr(state["generator"], method)(), repeat, setup)
+        slowest = max(slowest, timing["median"])
+    return {"workers": workers, "serial": serial, "parallel": parallel, "slowest_median": slowest}
+
+
+def bench_save_wav(scratch, repeat, seconds=10.0):
+    """_save_wav 写盘吞吐：一段 seconds 秒的单声道 16 位音频"""
+    scratch.reset()
+    generator = SoundGenerator(scratch.path)
+    samples = generator.synth.decay_tone(440, seconds, 0.8, 0.5)
+    size_mb = len(samples) * generator.SAMPLE_WIDTH / (1024 * 1024)
+    timing = measure(lambda: generator._save_wav(samples, "bench.wav"), repeat)
+    timing["megabytes"] = size_mb
+    timing["mb_per_s"] = size_mb / timing["median"]
+    return timing
+
+
+def bench_builtin_sounds(scratch, repeat):
+    """get_builtin_sounds() 冷（空目录）、温（新实例读缓存清单）、热（同一实例）"""
+    state = {}
+
+    def cold_setup():
+        scratch.reset()
+        state["generator"] = SoundGenerator(scratch.path)
+
+    def warm_setup():
+        state["generator"] = SoundGenerator(scratch.path)
+
+    cold = measure(lambda: state["generator"].get_builtin_sounds(), repeat, cold_setup)
+    warm = measure(lambda: state["generator"].get_builtin_sounds(), repeat * 5, warm_setup)
+    generator = SoundGenerator(scratch.path)
+    generator.get_builtin_sounds()
+    hot = measure(generator.get_builtin_sounds, repeat * 20)
+    return {"cold": cold, "warm": warm, "hot": hot}
+
+
+def bench_config(scratch, repeat):
+    """配置加载、save() 登记与同步写盘"""
+    path = os.path.join(scratch.path, "config.json")
+    defaults = {
+        "default_minutes": 25,
+        "sound_path": "",
+        "interval_minutes": 3,
+        "interval_enabled": True,
+        "selected_builtin_sound": 3,
+        "timer_mode": "after",
+    }
+    store = ConfigStore(path, defaults, quiet_period=3600)
+    store._write(dict(defaults))
+
+    load = measure(lambda: ConfigStore(path, defaults).load(), repeat * 10)
+
+    counter = {"n": 0}
+
+    def change():
+        counter["n"] += 1
+        store.data["default_minutes"] = 25 + counter["n"] % 30
+
+    save = measure(lambda: (change(), store.save()), repeat * 10)
+
+    def write():
+        change()
+        store._write(dict(store.data))
+
+    write_sync = measure(write, repeat * 2)
+    store.close()
+    return {"load": load, "save": save, "write": write_sync}
+
+
+def check_drift(hours):
+    """
+    2 小时会话（无暂停、含两次暂停/继续）和 hours 小时会话的完成偏差
+    都必须在 MAX_COMPLETION_DRIFT 以内
+    """
+    cases = {
+        "2h": simulate_session(2 * 3600),
+        "2h_paused": simulate_session(2 * 3600, pauses=[(5400, 120.5), (600, 33.3)]),
+        f"{hours}h_paused": simulate_session(hours * 3600, pauses=[(hours * 3600 // 2, 300.5)]),
+    }
+    for name, session in cases.items():
+        assert session.finished, f"{name} 会话未完成"
+        assert abs(session.completion_drift) <= MAX_COMPLETION_DRIFT, \
+            f"{name} 会话完成偏差 {session.completion_drift * 1000:.3f} ms 超过 " \
+            f"{MAX_COMPLETION_DRIFT * 1000:.0f} ms"
+    return {name: session.completion_drift * 1000 for name, session in cases.items()}
+
+
+def bench_timer(hours=8):
+    """模拟 hours 小时会话的计时偏差（超出上限时断言失败），以及模拟本身的运行耗时"""
+    check_drift(hours)
+    begin = time.perf_counter()
+    session = simulate_session(hours * 3600, jitter=0.005, work=0.002,
+                               pauses=[(hours * 3600 // 2, 300.5)])
+    countdown_seconds = time.perf_counter() - begin
+
+    clock = FakeClock(jitter=0.005, seed=1)
+    engine = TimerEngine(clock=clock, sleep=clock.sleep)
+    ticks = {"n": 0}
+    engine.subscribe("tick", lambda remaining: ticks.__setitem__("n", ticks["n"] + 1))
+    begin = time.perf_counter()
+    engine.start(hours * 3600, interval_seconds=180)
+    engine.run()
+    engine_seconds = time.perf_counter() - begin
+    assert abs(engine.countdown.completion_drift) <= MAX_COMPLETION_DRIFT, \
+        f"计时引擎完成偏差 {engine.countdown.completion_drift * 1000:.3f} ms 超过上限"
+
+    return {
+        "simulated_hours": hours,
+        "completion_drift_ms": session.completion_drift * 1000,
+        "max_tick_drift_ms": session.max_drift * 1000,
+        "ticks": session.tick_count,
+        "countdown_us_per_tick": countdown_seconds / session.tick_count * 1e6,
+        "engine_completion_drift_ms": engine.countdown.completion_drift * 1000,
+        "engine_reminders": engine.reminders,
+        "engine_us_per_tick": engine_seconds / max(1, ticks["n"]) * 1e6,
+    }
+
+
+def environment():
+    """记录测量环境，便于比较"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": numpy_version,
+        "synth": type(create_synth()).__name__,
+    }
+
+
+def run(repeat=5, hours=8):
+    scratch = ScratchDir()
+    try:
+        return {
+            "environment": environment(),
+            "generate": bench_generate(scratch, repeat),
+            "save_wav": bench_save_wav(scratch, repeat),
+            "builtin_sounds": bench_builtin_sounds(scratch, repeat),
+            "parallel": bench_parallel(scratch, repeat),
+            "config": bench_config(scratch, repeat),
+            "timer": bench_timer(hours),
+        }
+    finally:
+        scratch.close()
+
+
+def flatten(results, prefix=""):
+    """把嵌套结果展开为 {"a.b.median": 数值}，用于比较"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(current, baseline):
+    """与基线结果比较耗时中位数和吞吐，返回报告行"""
+    now, before = flatten(current), flatten(baseline)
+    lines = []
+    for name in sorted(now):
+        if name not in before or not before[name]:
+            continue
+        if not (name.endswith(".median") or name.endswith("mb_per_s") or name.endswith("drift_ms")):
+            continue
+        change = (now[name] - before[name]) / before[name] * 100
+        lines.append(f"  {name:<40} {before[name]:>12.6g} -> {now[name]:>12.6g}  ({change:+.1f}%)")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="铃声管线与计时核心基准测试")
+    parser.add_argument("--repeat", type=int, default=5, help="每项冷测量的重复次数")
+    parser.add_argument("--hours", type=int, default=8, help="模拟会话时长（小时）")
+    parser.add_argument("--output", default="bench_core_results.json", help="结果 JSON 路径")
+    parser.add_argument("--compare", default=None, help="用于比较的基线结果 JSON")
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat, args.hours)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    env = results["environment"]
+    print(f"提交 {env['commit'] or '-'}，Python {env['python']}，合成后端 {env['synth']}")
+    print("generate_*（冷 ms / 热 us）:")
+    for name, timing in results["generate"].items():
+        print(f"  {name:<12} {timing['cold']['median'] * 1000:8.2f} / {timing['hot']['median'] * 1e6:6.2f}")
+    save = results["save_wav"]
+    print(f"_save_wav: {save['mb_per_s']:.1f} MB/s（{save['megabytes']:.2f} MB，{save['median'] * 1000:.2f} ms）")
+    builtin = results["builtin_sounds"]
+    print(f"get_builtin_sounds: 冷 {builtin['cold']['median'] * 1000:.2f} ms，"
+          f"温 {builtin['warm']['median'] * 1000:.3f} ms，热 {builtin['hot']['median'] * 1e6:.2f} us")
+    parallel = results["parallel"]
+    pool_label = "进程池" if parallel["workers"] > 1 else "进程池（单核，已退回串行）"
+    print(f"纯 Python 冷启动（{parallel['workers']} 核）: 串行 {parallel['serial']['median'] * 1000:.1f} ms，"
+          f"{pool_label} {parallel['parallel']['median'] * 1000:.1f} ms，"
+          f"最慢单个铃声 {parallel['slowest_median'] * 1000:.1f} ms")
+    config = results["config"]
+    print(f"配置: 加载 {config['load']['median'] * 1e6:.1f} us，save() 登记 {config['save']['median'] * 1e6:.1f} us，"
+          f"写盘 {config['write']['median'] * 1000:.2f} ms")
+    timer = results["timer"]
+    print(f"计时（模拟 {timer['simulated_hours']} 小时）: 完成偏差 {timer['completion_drift_ms']:.3f} ms，"
+          f"最大 tick 偏差 {timer['max_tick_drift_ms']:.3f} ms，引擎 {timer['engine_us_per_tick']:.2f} us/tick")
+    print(f"结果已写入 {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"与基线 {baseline.get('environment', {}).get('commit', args.compare)} 比较:")
+        for line in compare(results, baseline):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+多计时器基准测试
+================
+比较 1 个与 10,000 个并发计时器在等待期间的 CPU 开销和唤醒次数，
+并测量大量计时器同时到期时的处理吞吐。
+
+运行：
+    python benchmarks/bench_multi_timer.py
+    python benchmarks/bench_multi_timer.py --timers 50000 --seconds 3
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from multi_timer import TimerManager
+from timer_engine import FakeClock
+
+
+def idle_cost(count, seconds, tick=0.05):
+    """
+    运行 count 个计时器 seconds 秒（其中一个每 tick 秒到期并重新开始，模拟活跃计时器）
+    返回 (CPU 秒数, 唤醒次数, 到期次数)
+    """
+    manager = TimerManager()
+    for i in range(count - 1):
+        manager.add(f"timer-{i}", 3600 + i)
+    manager.add("active", tick, on_expire=lambda timer: manager.restart(timer.name))
+
+    manager.start()
+    cpu_start = time.process_time()
+    time.sleep(seconds)
+    cpu = time.process_time() - cpu_start
+    manager.stop()
+    return cpu, manager.wakeups, manager.expired
+
+
+def expiry_throughput(count):
+    """用模拟时钟让 count 个计时器依次到期，返回每个到期的平均处理耗时（微秒）"""
+    clock = FakeClock()
+    manager = TimerManager(clock=clock)
+    for i in range(count):
+        manager.add(f"timer-{i}", 1 + i * 0.001)
+    clock.advance(2 + count * 0.001)
+    begin = time.perf_counter()
+    fired = manager.poll()
+    elapsed = time.perf_counter() - begin
+    assert len(fired) == count
+    return elapsed / count * 1e6
+
+
+def run(timers=10_000, seconds=2.0, tolerance=2.0):
+    """
+    返回结果字典；timers 个计时器的等待 CPU 开销超过单个计时器的 tolerance 倍
+    （且差值超过 20 ms）时抛出 AssertionError
+    """
+    one = idle_cost(1, seconds)
+    many = idle_cost(timers, seconds)
+    assert many[0] <= one[0] * tolerance or many[0] - one[0] < 0.02, \
+        f"CPU 开销随计时器数量增长: {one[0] * 1000:.1f} ms -> {many[0] * 1000:.1f} ms"
+    return {
+        "single": one,
+        "many": many,
+        "expiry_us": expiry_throughput(timers),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="多计时器基准测试")
+    parser.add_argument("--timers", type=int, default=10_000, help="并发计时器数量")
+    parser.add_argument("--seconds", type=float, default=2.0, help="每轮等待时长（秒）")
+    args = parser.parse_args(argv)
+
+    results = run(args.timers, args.seconds)
+    for label, key in (("1 个计时器", "single"), (f"{args.timers} 个计时器", "many")):
+        cpu, wakeups, expired = results[key]
+        print(f"{label:<14} CPU {cpu * 1000:7.1f} ms  唤醒 {wakeups:>4} 次  到期 {expired:>4} 次")
+    print(f"批量到期处理: {results['expiry_us']:.2f} us/个")
+    print("等待开销与计时器数量无关 ✓")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+专注统计基准测试
+================
+生成大量模拟会话（默认 100 万条，约 10 年），在历史增长的不同阶段
+测量统计查询延迟，并断言查询延迟不随历史规模增长。
+
+运行：
+    python benchmarks/bench_stats.py
+    python benchmarks/bench_stats.py --sessions 200000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history import SessionRecord
+from stats import FocusStats, summary_lines
+
+
+TAGS = ["", "写作", "编程", "阅读", "会议"]
+
+
+def synthetic_sessions(count, years=10, seed=0):
+    """按时间顺序生成 count 条模拟会话，均匀分布在最近 years 年内"""
+    rng = random.Random(seed)
+    end = time.time()
+    start = end - years * 365 * 86400
+    step = (end - start) / count
+    for i in range(count):
+        begin = start + i * step
+        planned = rng.choice((15, 25, 25, 25, 45, 60)) * 60
+        completed = rng.random() < 0.85
+        focused = planned if completed else rng.uniform(0, planned)
+        yield SessionRecord(begin, begin + focused, planned, focused,
+                            rng.randint(0, 3), rng.randint(0, 8), completed,
+                            rng.choice(TAGS), "⏰ 闹钟 (Alarm)")
+
+
+def measure_queries(stats, repeat=200):
+    """各查询的平均延迟（微秒）"""
+    today = datetime.date.today()
+    month_ago = today - datetime.timedelta(days=30)
+    queries = {
+        "day": lambda: stats.day(today),
+        "week": lambda: stats.week(today),
+        "tag_totals": stats.tag_totals,
+        "current_streak": lambda: stats.current_streak(today),
+        "histogram_rows": stats.histogram_rows,
+        "daily_range_30d": lambda: stats.daily_range(month_ago, today),
+        "summary_lines": lambda: summary_lines(stats, today),
+    }
+    results = {}
+    for name, query in queries.items():
+        begin = time.perf_counter()
+        for _ in range(repeat):
+            query()
+        results[name] = (time.perf_counter() - begin) / repeat * 1e6
+    return results
+
+
+def run(total=1_000_000, checkpoints=(10_000, 100_000, 1_000_000), tolerance=3.0):
+    """
+    逐步汇总 total 条会话，在各检查点测量查询延迟
+    返回 {检查点: {查询: 微秒}}；最大规模下任一查询慢于最小规模的 tolerance 倍
+    （且差值超过 50 微秒）时抛出 AssertionError
+    """
+    checkpoints = sorted(c for c in checkpoints if c <= total)
+    stats = FocusStats()
+    results = {}
+    ingest_start = time.perf_counter()
+    for i, record in enumerate(synthetic_sessions(total), 1):
+        stats.add(record)
+        if checkpoints and i == checkpoints[0]:
+            results[i] = measure_queries(stats)
+            checkpoints.pop(0)
+    ingest_seconds = time.perf_counter() - ingest_start
+
+    sizes = sorted(results)
+    smallest, largest = results[sizes[0]], results[sizes[-1]]
+    for name, latency in largest.items():
+        baseline = smallest[name]
+        assert latency <= baseline * tolerance or latency - baseline < 50, \
+            f"{name} 查询延迟随历史增长: {baseline:.1f}us -> {latency:.1f}us"
+    return results, ingest_seconds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="专注统计基准测试")
+    parser.add_argument("--sessions", type=int, default=1_000_000, help="模拟会话数量")
+    args = parser.parse_args(argv)
+
+    checkpoints = sorted({max(1, args.sessions // 100), max(1, args.sessions // 10), args.sessions})
+    results, ingest_seconds = run(args.sessions, checkpoints)
+    print(f"汇总 {args.sessions} 条会话耗时 {ingest_seconds:.2f} s "
+          f"({ingest_seconds / args.sessions * 1e6:.2f} us/条)")
+    names = list(next(iter(results.values())))
+    print("查询延迟 (us):" + "".join(f"{size:>12}" for size in results))
+    for name in names:
+        print(f"  {name:<16}" + "".join(f"{results[size][name]:>12.1f}" for size in results))
+    print("查询延迟不随历史规模增长 ✓")
+
+
+if __name__ == "__main__":
+    main()
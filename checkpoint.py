@@ -0,0 +1,242 @@
+"""
+会话检查点模块
+==============
+把正在进行的番茄钟会话写入一个定长的小文件，进程崩溃或重启后可以原样恢复。
+
+功能：
+- 只在状态转换时写入（开始、暂停、继续、阶段切换、间隔提醒），tick 不写盘
+- 记录计划参数、已运行时间及其对应的墙上时钟时刻、暂停与提醒计数
+- 崩溃后留下的运行中会话按墙上时钟继续计时：停机期间的时间照常计入，
+  恢复后由下一次 tick 补发错过的阶段切换或完成
+- 有意关闭窗口时 suspend() 把会话存为暂停（剩余时间冻结），下次启动恢复为暂停，
+  不会把关闭期间补算成一次完成的专注
+- 定长记录带 CRC32 校验，经由临时文件 + 重命名原子替换（写入加锁串行）；损坏或版本不符时忽略
+- 会话结束或重置时删除文件，启动时检查只需一次小文件读取
+"""
+
+import os
+import time
+import zlib
+import struct
+import threading
+from collections import namedtuple
+
+from cycles import CyclePlan, FOCUS
+from reminders import ReminderPattern
+from timer_engine import RUNNING, PAUSED
+
+
+MAGIC = b"PMDK"
+VERSION = 1
+MAX_TAILS = 4  # 最多保存的尾段提醒规则数
+
+# 魔数, 版本, 是否暂停, 专注, 短休息, 长休息, 轮数, 长休息间隔,
+# 基础提醒间隔, 尾段数, 尾段 (间隔, 窗口) × MAX_TAILS,
+# 已运行秒数, 写入时刻, 会话开始时刻, 阶段下标, 暂停次数, 提醒次数
+RECORD_STRUCT = struct.Struct("<4sHBIIIHHIB" + "II" * MAX_TAILS + "dddHHH")
+CRC_STRUCT = struct.Struct("<I")
+
+
+Checkpoint = namedtuple("Checkpoint", [
+    "paused",          # 是否处于暂停
+    "plan_spec",       # CyclePlan.spec
+    "reminder_every",  # 基础提醒间隔（秒）
+    "reminder_tails",  # 尾段提醒 ((间隔, 窗口), ...)
+    "elapsed",         # 写入时计划已运行的秒数（不含暂停）
+    "written_at",      # 写入时的墙上时钟时刻
+    "session_start",   # 当前专注阶段开始的墙上时钟时刻
+    "phase_index",     # 写入时所在的阶段
+    "pauses",          # 当前阶段的暂停次数
+    "reminders",       # 当前阶段的间隔提醒次数
+])
+
+
+def capture(engine, session_start=None, wall_clock=time.time):
+    """
+    从计时引擎生成检查点
+    引擎未在计时中，或计划无法由参数重建时返回 None
+    """
+    if engine.state not in (RUNNING, PAUSED) or engine.plan is None or engine.plan.spec is None:
+        return None
+    pattern = engine.reminder_pattern
+    now = wall_clock()
+    return Checkpoint(
+        paused=engine.state == PAUSED,
+        plan_spec=engine.plan.spec,
+        reminder_every=pattern.every if pattern else 0,
+        reminder_tails=tuple(pattern.tails[:MAX_TAILS]) if pattern else (),
+        elapsed=engine.elapsed(),
+        written_at=now,
+        session_start=now if session_start is None else session_start,
+        phase_index=engine.phase_index,
+        pauses=engine.pauses,
+        reminders=engine.reminders,
+    )
+
+
+def restore(engine, checkpoint, wall_clock=time.time):
+    """
+    按检查点恢复计时引擎，返回恢复后的计划已运行秒数
+    运行中的会话加上停机期间经过的墙上时间（时钟回拨时不倒退）
+    """
+    offline = 0.0 if checkpoint.paused else max(0.0, wall_clock() - checkpoint.written_at)
+    pattern = ReminderPattern(checkpoint.reminder_every, checkpoint.reminder_tails)
+    engine.restore(
+        CyclePlan.build(*checkpoint.plan_spec),
+        checkpoint.elapsed,
+        phase_index=checkpoint.phase_index,
+        paused=checkpoint.paused,
+        pauses=checkpoint.pauses,
+        reminders=checkpoint.reminders,
+        reminder_pattern=pattern or None,
+        offline=offline,
+    )
+    return checkpoint.elapsed + offline
+
+
+def pack(checkpoint):
+    """编码为定长字节串（末尾附 CRC32）"""
+    tails = list(checkpoint.reminder_tails[:MAX_TAILS])
+    flat = [value for tail in tails + [(0, 0)] * (MAX_TAILS - len(tails)) for value in tail]
+    focus, short_break, long_break, cycles, long_break_every = checkpoint.plan_spec
+    data = RECORD_STRUCT.pack(
+        MAGIC, VERSION, 1 if checkpoint.paused else 0,
+        focus, short_break, long_break, cycles, long_break_every,
+        checkpoint.reminder_every, len(tails), *flat,
+        checkpoint.elapsed, checkpoint.written_at, checkpoint.session_start,
+        checkpoint.phase_index, min(checkpoint.pauses, 0xFFFF), min(checkpoint.reminders, 0xFFFF),
+    )
+    return data + CRC_STRUCT.pack(zlib.crc32(data))
+
+
+def unpack(data):
+    """解码定长字节串，格式、版本或校验不符时返回 None"""
+    if len(data) != RECORD_STRUCT.size + CRC_STRUCT.size:
+        return None
+    body = data[:RECORD_STRUCT.size]
+    if CRC_STRUCT.unpack(data[RECORD_STRUCT.size:])[0] != zlib.crc32(body):
+        return None
+    fields = RECORD_STRUCT.unpack(body)
+    magic, version, paused = fields[:3]
+    if magic != MAGIC or version != VERSION:
+        return None
+    plan_spec = fields[3:8]
+    reminder_every, tail_count = fields[8:10]
+    flat = fields[10:10 + 2 * MAX_TAILS]
+    elapsed, written_at, session_start, phase_index, pauses, reminders = fields[10 + 2 * MAX_TAILS:]
+    tails = tuple((flat[2 * i], flat[2 * i + 1]) for i in range(min(tail_count, MAX_TAILS)))
+    return Checkpoint(bool(paused), plan_spec, reminder_every, tails, elapsed, written_at,
+                      session_start, phase_index, pauses, reminders)
+
+
+class CheckpointFile:
+    """
+    会话检查点文件
+    attach() 后在引擎每次状态转换时自动写入，会话结束或重置时删除
+    """
+
+    def __init__(self, path, wall_clock=time.time):
+        self.path = path
+        self._wall_clock = wall_clock
+        self._engine = None
+        self.enabled = True
+        self.session_start = None  # 当前专注阶段开始的墙上时钟时刻
+        self.writes = 0
+        # 引擎事件可能来自 UI 线程和计时线程，写入、删除串行执行，
+        # 避免共用临时文件，也避免较旧的快照覆盖较新的
+        self._lock = threading.RLock()
+
+    def load(self):
+        """读取检查点；文件不存在或已损坏时返回 None"""
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read(RECORD_STRUCT.size + CRC_STRUCT.size + 1)
+        except OSError:
+            return None
+        return unpack(data)
+
+    def resume(self):
+        """
+        读取检查点并恢复已 attach 的引擎，返回检查点；没有可用检查点时返回 None
+        """
+        checkpoint = self.load()
+        if checkpoint is None or self._engine is None:
+            return None
+        self.session_start = checkpoint.session_start
+        try:
+            restore(self._engine, checkpoint, self._wall_clock)
+        except (ValueError, IndexError) as e:
+            print(f"会话检查点无效，已忽略: {e}")
+            self.session_start = None
+            self.clear()
+            return None
+        return checkpoint
+
+    def save(self, checkpoint):
+        """原子写入检查点（临时文件 + fsync + 重命名）"""
+        tmp_path = self.path + ".tmp"
+        with self._lock:
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(pack(checkpoint))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+                self.writes += 1
+            except OSError as e:
+                print(f"写入会话检查点失败: {e}")
+
+    def clear(self):
+        """删除检查点文件"""
+        with self._lock:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"删除会话检查点失败: {e}")
+
+    def suspend(self):
+        """
+        有意关闭时调用：把当前会话写为暂停状态（已运行时间冻结），之后不再写入
+        只有崩溃留下的运行中检查点才在恢复时按墙上时钟补算
+        """
+        with self._lock:
+            self.enabled = False
+            if self._engine is None:
+                return
+            checkpoint = capture(self._engine, self.session_start, self._wall_clock)
+            if checkpoint is None:
+                self.clear()
+            else:
+                self.save(checkpoint._replace(paused=True))
+
+    # ---------- 与计时引擎联动 ----------
+
+    def attach(self, engine):
+        """订阅引擎的状态转换事件"""
+        self._engine = engine
+        engine.subscribe("state", self._on_state)
+        engine.subscribe("phase", self._on_phase)
+        engine.subscribe("reminder", lambda elapsed_min: self._write())
+
+    def _on_state(self, state):
+        if state == RUNNING and self.session_start is None:
+            self.session_start = self._wall_clock()
+        elif state not in (RUNNING, PAUSED):
+            self.session_start = None
+        self._write()
+
+    def _on_phase(self, phase, summary):
+        self.session_start = self._wall_clock() if phase.kind == FOCUS else None
+        self._write()
+
+    def _write(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            checkpoint = capture(self._engine, self.session_start, self._wall_clock)
+            if checkpoint is None:
+                self.clear()
+            else:
+                self.save(checkpoint)
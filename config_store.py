@@ -0,0 +1,144 @@
+"""
+配置存储模块
+============
+防抖、原子、后台写入的 JSON 配置存储。
+
+功能：
+- save() 只登记变更，静默期（quiet_period）过后由后台线程统一写入
+- 写入经由临时文件 + fsync + 重命名，崩溃不会留下半截配置
+- 序列化内容与上次写入相同时跳过写盘
+- close() 同步写出尚未落盘的变更
+"""
+
+import os
+import json
+import time
+import threading
+
+import metrics
+
+
+class ConfigStore:
+    """防抖的后台配置存储"""
+
+    DEFAULT_QUIET_PERIOD = 0.5  # 静默期（秒）
+
+    def __init__(self, path, defaults=None, quiet_period=DEFAULT_QUIET_PERIOD, name="config",
+                 label="配置"):
+        """
+        path: 配置文件路径
+        defaults: 默认配置，加载时被文件中的值覆盖
+        quiet_period: 最后一次变更后等待多久再写盘
+        name / label: 指标名称中的标识与提示信息中的名称（其他 JSON 文件复用本存储时区分）
+        """
+        self.path = path
+        self.data = dict(defaults or {})
+        self.quiet_period = quiet_period
+
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._pending = None         # 等待写入的快照
+        self._due = 0.0              # 预计写盘时刻
+        self._last_written = None    # 上次写入（或加载）的序列化内容
+        self._writer = None
+        self._closed = False
+
+        self.label = label
+        self.writes = 0
+        self.skipped = 0
+        self._save_seconds = metrics.histogram(f"pomodoro_{name}_save_seconds", f"{label}写盘耗时")
+        self._writes_total = metrics.counter(f"pomodoro_{name}_writes_total", f"{label}写盘次数")
+        self._skipped_total = metrics.counter(f"pomodoro_{name}_skipped_total",
+                                              f"{label}内容未变化而跳过的写盘次数")
+        self._errors_total = metrics.counter(f"pomodoro_{name}_errors_total", f"{label}读写失败次数")
+
+    @staticmethod
+    def _serialize(data):
+        return json.dumps(data, ensure_ascii=False, indent=2)
+
+    def load(self):
+        """加载配置文件，返回配置字典（与 self.data 为同一对象）"""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    text = f.read()
+                self.data.update(json.loads(text))
+                if text == self._serialize(self.data):
+                    self._last_written = text
+        except Exception as e:
+            self._errors_total.inc()
+            print(f"加载{self.label}文件失败: {e}")
+        return self.data
+
+    def save(self):
+        """登记一次保存请求；静默期后由后台线程写盘"""
+        with self._cond:
+            if self._closed:
+                return
+            self._pending = dict(self.data)
+            self._due = time.monotonic() + self.quiet_period
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._writer_loop, name="config-writer",
+                                                daemon=True)
+                self._writer.start()
+            self._cond.notify()
+
+    def _writer_loop(self):
+        """后台写入线程：等待静默期结束后写出最新快照"""
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                delay = self._due - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                snapshot = self._pending
+                self._pending = None
+            self._write(snapshot)
+
+    def _write(self, snapshot):
+        """原子写入：临时文件 + fsync + 重命名；内容未变化时跳过"""
+        text = self._serialize(snapshot)
+        with self._write_lock:
+            if text == self._last_written:
+                self.skipped += 1
+                self._skipped_total.inc()
+                return
+
+            started = time.perf_counter()
+            tmp_path = self.path + ".tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(text)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+                self._last_written = text
+                self.writes += 1
+                self._writes_total.inc()
+                self._save_seconds.record(time.perf_counter() - started)
+            except Exception as e:
+                self._errors_total.inc()
+                print(f"保存{self.label}文件失败: {e}")
+
+    def flush(self):
+        """立即同步写出尚未落盘的变更"""
+        with self._cond:
+            snapshot = self._pending
+            self._pending = None
+        if snapshot is not None:
+            self._write(snapshot)
+
+    def close(self):
+        """停止后台线程，并同步写出当前配置"""
+        with self._cond:
+            self._closed = True
+            self._pending = dict(self.data)
+            self._cond.notify_all()
+        writer = self._writer
+        if writer is not None and writer is not threading.current_thread():
+            writer.join(timeout=1)
+        self.flush()
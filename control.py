@@ -0,0 +1,363 @@
+"""
+本地控制接口模块
+================
+让脚本和编辑器插件通过本机 HTTP 或 Unix 域套接字控制正在运行的番茄钟。
+
+功能：
+- 独立线程中的 asyncio 事件循环，不阻塞 Tk 主循环
+- 只监听 127.0.0.1 或 Unix 域套接字（权限 0600），不对外网开放
+- 每次启动生成随机令牌，写入仅当前用户可读的令牌文件；所有请求都须在
+  X-Pomodoro-Token 请求头中携带令牌，网页无法跨站伪造请求
+- 拒绝 Host 不是 127.0.0.1:<端口> / localhost:<端口> 的请求（防 DNS 重绑定），
+  以及带有其他来源 Origin 的请求
+- GET /status 查询状态；POST /start、/pause、/resume、/toggle、/reset 控制计时
+- GET /events 以 Server-Sent Events 推送 tick、阶段切换、完成等事件，无需轮询
+- 慢速订阅者的事件队列有界，满时丢弃最旧的事件
+
+示例：
+    TOKEN=$(cat pomodoro_control.token)
+    curl -H "X-Pomodoro-Token: $TOKEN" http://127.0.0.1:8765/status
+    curl -X POST -H "X-Pomodoro-Token: $TOKEN" http://127.0.0.1:8765/start
+    curl -N -H "X-Pomodoro-Token: $TOKEN" http://127.0.0.1:8765/events
+    python control.py status --port 8765
+"""
+
+import os
+import sys
+import hmac
+import json
+import socket
+import asyncio
+import secrets
+import threading
+import concurrent.futures
+
+
+LOOPBACK = "127.0.0.1"
+EVENT_QUEUE_SIZE = 64  # 每个订阅者最多缓存的事件数
+TOKEN_HEADER = "X-Pomodoro-Token"
+TOKEN_FILENAME = "pomodoro_control.token"
+MAX_HEADER_LINES = 100
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    401: "Unauthorized",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+}
+
+
+def write_token(path, token):
+    """写入令牌文件（仅当前用户可读写）"""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="ascii") as f:
+        f.write(token)
+    os.chmod(path, 0o600)
+
+
+def read_token(path):
+    """读取令牌文件；不存在时返回 None"""
+    try:
+        with open(path, "r", encoding="ascii") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+class ControlServer:
+    """本地控制服务"""
+
+    def __init__(self, status, commands, port=0, socket_path=None, token=None, token_path=None):
+        """
+        status: 返回状态字典（或结果为状态字典的 concurrent.futures.Future）的函数
+        commands: {命令名: 函数}，函数返回状态字典或 concurrent.futures.Future；
+                  通过 POST /<命令名> 调用
+        port: 本机 HTTP 端口（0 表示自动分配，None 表示不监听 TCP）
+        socket_path: Unix 域套接字路径（None 表示不使用）
+        token: 请求须携带的令牌（None 表示随机生成）
+        token_path: 启动后把令牌写入该文件，停止时删除（None 表示不写文件）
+        两个函数都在服务线程中调用；需要在界面线程执行的操作可转交后返回 Future
+        """
+        self._status = status
+        self._commands = dict(commands)
+        self._port = port
+        self._socket_path = socket_path
+        self.token = token or secrets.token_urlsafe(32)
+        self._token_path = token_path
+        self._loop = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._servers = []
+        self._subscribers = set()
+        self._error = None
+
+        self.address = None   # 实际监听的 (host, port)
+        self.requests = 0
+        self.events_published = 0
+        self.events_dropped = 0
+        self.rejected = 0
+
+    # ---------- 启动与停止 ----------
+
+    def start(self):
+        """在后台线程中启动事件循环，监听失败时抛出 OSError"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="control-api", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            self._thread = None
+            raise self._error
+        if self._token_path:
+            write_token(self._token_path, self.token)
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._listen())
+        except OSError as e:
+            self._error = e
+            self._ready.set()
+            self._loop.close()
+            return
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+    async def _listen(self):
+        if self._port is not None:
+            server = await asyncio.start_server(
+                lambda reader, writer: self._handle(reader, writer, check_host=True),
+                LOOPBACK, self._port)
+            self.address = server.sockets[0].getsockname()[:2]
+            self._servers.append(server)
+        if self._socket_path and hasattr(socket, "AF_UNIX"):
+            if os.path.exists(self._socket_path):
+                os.remove(self._socket_path)
+            server = await asyncio.start_unix_server(self._handle, self._socket_path)
+            os.chmod(self._socket_path, 0o600)
+            self._servers.append(server)
+
+    def stop(self):
+        """关闭监听并停止事件循环"""
+        loop, thread = self._loop, self._thread
+        if loop is None or thread is None or loop.is_closed():
+            return
+
+        async def shutdown():
+            for server in self._servers:
+                server.close()
+            for queue in list(self._subscribers):
+                if queue.full():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+        try:
+            asyncio.run_coroutine_threadsafe(shutdown(), loop).result(timeout=1)
+            loop.call_soon_threadsafe(loop.stop)
+        except Exception:
+            pass
+        thread.join(timeout=1)
+        self._thread = None
+        for path in (self._socket_path, self._token_path):
+            if path and os.path.exists(path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    # ---------- 事件推送 ----------
+
+    def publish(self, event, data=None):
+        """推送事件给所有 /events 订阅者，可在任意线程调用"""
+        loop = self._loop
+        if loop is None or not self._subscribers or loop.is_closed():
+            return
+        message = json.dumps({"event": event, "data": data}, ensure_ascii=False)
+        try:
+            loop.call_soon_threadsafe(self._deliver, event, message)
+        except RuntimeError:
+            pass  # 事件循环已关闭
+
+    def _deliver(self, event, message):
+        self.events_published += 1
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+                self.events_dropped += 1
+            queue.put_nowait((event, message))
+
+    # ---------- HTTP 处理 ----------
+
+    def _allowed_hosts(self):
+        port = self.address[1] if self.address else self._port
+        return {f"{LOOPBACK}:{port}", f"localhost:{port}"}
+
+    def _reject_reason(self, headers, check_host):
+        """
+        校验请求头，返回 (状态码, 错误信息)；通过时返回 None
+        TCP 连接要求 Host 为本机地址加端口，带 Origin 时必须同源（浏览器发起的跨站请求一律拒绝）
+        """
+        if check_host:
+            allowed = self._allowed_hosts()
+            if headers.get("host", "").lower() not in allowed:
+                return 403, "host not allowed"
+            origin = headers.get("origin")
+            if origin is not None and origin.lower() not in {f"http://{host}" for host in allowed}:
+                return 403, "origin not allowed"
+        if not hmac.compare_digest(headers.get(TOKEN_HEADER.lower(), ""), self.token):
+            return 401, f"missing or invalid {TOKEN_HEADER}"
+        return None
+
+    async def _get_status(self):
+        result = self._status()
+        if isinstance(result, concurrent.futures.Future):
+            result = await asyncio.wrap_future(result)
+        return result
+
+    async def _handle(self, reader, writer, check_host=False):
+        try:
+            request_line = await reader.readline()
+            headers = {}
+            for _ in range(MAX_HEADER_LINES):
+                line = await reader.readline()
+                if not line or line in (b"\r\n", b"\n"):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            parts = request_line.decode("latin-1").split()
+            if len(parts) < 2:
+                await self._respond(writer, 400, {"error": "bad request"})
+                return
+            self.requests += 1
+            rejected = self._reject_reason(headers, check_host)
+            if rejected is not None:
+                self.rejected += 1
+                await self._respond(writer, rejected[0], {"error": rejected[1]})
+                return
+            method, path = parts[0].upper(), parts[1].split("?", 1)[0].rstrip("/") or "/"
+
+            if path == "/events":
+                if method != "GET":
+                    await self._respond(writer, 405, {"error": "use GET"})
+                else:
+                    await self._stream_events(writer)
+            elif path in ("/", "/status"):
+                await self._respond(writer, 200, await self._get_status())
+            elif path.lstrip("/") in self._commands:
+                if method != "POST":
+                    await self._respond(writer, 405, {"error": "use POST"})
+                else:
+                    result = self._commands[path.lstrip("/")]()
+                    if isinstance(result, concurrent.futures.Future):
+                        result = await asyncio.wrap_future(result)
+                    await self._respond(writer, 200, result)
+            else:
+                await self._respond(writer, 404, {"error": f"unknown path {path}",
+                                                  "commands": sorted(self._commands)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            try:
+                await self._respond(writer, 500, {"error": str(e)})
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, code, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = (f"HTTP/1.1 {code} {STATUS_TEXT.get(code, '')}\r\n"
+                "Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def _stream_events(self, writer):
+        """Server-Sent Events：先推送一次当前状态，之后推送每个事件"""
+        queue = asyncio.Queue(EVENT_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        try:
+            writer.write(b"HTTP/1.1 200 OK\r\n"
+                         b"Content-Type: text/event-stream; charset=utf-8\r\n"
+                         b"Cache-Control: no-cache\r\n"
+                         b"Connection: close\r\n\r\n")
+            status = json.dumps({"event": "status", "data": await self._get_status()},
+                                ensure_ascii=False)
+            writer.write(f"event: status\ndata: {status}\n\n".encode("utf-8"))
+            await writer.drain()
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                event, message = item
+                writer.write(f"event: {event}\ndata: {message}\n\n".encode("utf-8"))
+                await writer.drain()
+        finally:
+            self._subscribers.discard(queue)
+
+
+def request(command="status", port=None, socket_path=None, token=None, timeout=5.0):
+    """
+    向正在运行的番茄钟发送一个命令，返回响应字典
+    command 为 "status" 时使用 GET，其余命令使用 POST
+    token: 控制令牌（见令牌文件）
+    """
+    method = "GET" if command == "status" else "POST"
+    if socket_path:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+    else:
+        sock = socket.create_connection((LOOPBACK, port), timeout=timeout)
+    with sock:
+        host = "localhost" if socket_path else f"{LOOPBACK}:{port}"
+        sock.sendall(f"{method} /{command} HTTP/1.1\r\nHost: {host}\r\n"
+                     f"{TOKEN_HEADER}: {token or ''}\r\n"
+                     "Content-Length: 0\r\n\r\n".encode("latin-1"))
+        chunks = []
+        while True:
+            data = sock.recv(65536)
+            if not data:
+                break
+            chunks.append(data)
+    _, _, body = b"".join(chunks).partition(b"\r\n\r\n")
+    return json.loads(body.decode("utf-8"))
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="番茄钟本地控制客户端")
+    parser.add_argument("command", nargs="?", default="status",
+                        help="status / start / pause / resume / toggle / reset")
+    parser.add_argument("--port", type=int, default=8765, help="控制接口端口")
+    parser.add_argument("--socket", default=None, help="Unix 域套接字路径（代替端口）")
+    parser.add_argument("--token-file",
+                        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), TOKEN_FILENAME),
+                        help="番茄钟启动时写出的令牌文件")
+    args = parser.parse_args(argv)
+
+    token = read_token(args.token_file)
+    if token is None:
+        print(f"找不到控制令牌文件 {args.token_file}（番茄钟是否已开启控制接口？）", file=sys.stderr)
+        return 1
+    try:
+        result = request(args.command, port=args.port, socket_path=args.socket, token=token)
+    except OSError as e:
+        print(f"无法连接番茄钟控制接口: {e}", file=sys.stderr)
+        return 1
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
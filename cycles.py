@@ -0,0 +1,106 @@
+"""
+番茄循环计划模块
+================
+把“专注 - 短休息 - ... - 长休息”的循环预先展开成完整的阶段计划。
+
+功能：
+- 开始前一次性计算所有阶段的起止偏移（秒），计时中不再逐 tick 重新推算
+- 二分查找任意已用时间所处的阶段
+- 每个阶段对应的内置提示音（阶段开始时播放）
+"""
+
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+
+
+# 阶段类型
+FOCUS = "focus"
+SHORT_BREAK = "short_break"
+LONG_BREAK = "long_break"
+
+PHASE_LABELS = {
+    FOCUS: "专注",
+    SHORT_BREAK: "短休息",
+    LONG_BREAK: "长休息",
+}
+
+# 阶段开始时播放的内置铃声（sounds.BUILTIN_RECIPES 或 sound_recipes/ 中的配方名称）
+DEFAULT_PHASE_SOUNDS = {
+    FOCUS: "bell",
+    SHORT_BREAK: "chime",
+    LONG_BREAK: "double_beep",
+}
+
+
+Phase = namedtuple("Phase", [
+    "kind",    # 阶段类型
+    "cycle",   # 所属轮次（从 1 开始）
+    "start",   # 相对计划开始的偏移（秒）
+    "end",     # 相对计划开始的结束偏移（秒）
+])
+
+
+class CyclePlan:
+    """预先展开的阶段计划"""
+
+    def __init__(self, phases):
+        if not phases:
+            raise ValueError("计划至少需要一个阶段")
+        self.phases = tuple(phases)
+        self.ends = array('q', (phase.end for phase in self.phases))
+        self.total_seconds = self.phases[-1].end
+        # 生成计划的参数 (专注, 短休息, 长休息, 轮数, 长休息间隔)，供检查点重建计划；
+        # 直接由阶段列表构造时为 None
+        self.spec = None
+
+    @classmethod
+    def single(cls, focus_seconds):
+        """只有一个专注阶段的计划（普通番茄钟）"""
+        return cls.build(focus_seconds, 0, 0, 1)
+
+    @classmethod
+    def build(cls, focus_seconds, short_break_seconds, long_break_seconds, cycles,
+              long_break_every=4):
+        """
+        展开 cycles 轮专注，每轮之间插入短休息，每 long_break_every 轮插入长休息
+        最后一轮专注之后不再安排休息
+        """
+        if cycles <= 0:
+            raise ValueError("轮数必须大于 0")
+        long_break_every = max(1, long_break_every)
+        phases = []
+        offset = 0
+        for cycle in range(1, cycles + 1):
+            phases.append(Phase(FOCUS, cycle, offset, offset + focus_seconds))
+            offset += focus_seconds
+            if cycle == cycles:
+                break
+            if cycle % long_break_every == 0:
+                kind, seconds = LONG_BREAK, long_break_seconds
+            else:
+                kind, seconds = SHORT_BREAK, short_break_seconds
+            if seconds > 0:
+                phases.append(Phase(kind, cycle, offset, offset + seconds))
+                offset += seconds
+        plan = cls(phases)
+        plan.spec = (focus_seconds, short_break_seconds, long_break_seconds, cycles, long_break_every)
+        return plan
+
+    def __len__(self):
+        return len(self.phases)
+
+    def __getitem__(self, index):
+        return self.phases[index]
+
+    @property
+    def cycles(self):
+        return self.phases[-1].cycle
+
+    def phase_index(self, elapsed):
+        """已用时间 elapsed（秒）所处阶段的下标；计划结束后返回最后一个阶段"""
+        return min(bisect_right(self.ends, elapsed), len(self.phases) - 1)
+
+    def focus_seconds(self):
+        """计划中的专注总时长（秒）"""
+        return sum(phase.end - phase.start for phase in self.phases if phase.kind == FOCUS)
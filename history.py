@@ -0,0 +1,143 @@
+"""
+专注历史模块
+============
+把每次番茄钟会话追加记录到一个定长二进制日志文件。
+
+文件格式：
+- 8 字节文件头：魔数 b"PMDH" + 版本号(uint16) + 记录长度(uint16)
+- 之后是按时间顺序排列的定长记录（RECORD_STRUCT）
+
+定长记录使得：
+- 追加为 O(1)（一次 write）
+- 任意区间的记录可以直接定位读取（统计索引只补读快照之后新增的记录）
+- 末尾因崩溃写了一半的记录在打开时被截掉
+"""
+
+import os
+import struct
+import threading
+from collections import namedtuple
+
+
+MAGIC = b"PMDH"
+VERSION = 1
+HEADER_STRUCT = struct.Struct("<4sHH")
+
+# 开始时间, 结束时间, 计划秒数, 实际专注秒数, 暂停次数, 间隔提醒次数, 是否完成, 标签, 铃声
+RECORD_STRUCT = struct.Struct("<ddIdHHB16s40s7x")
+
+TAG_BYTES = 16
+SOUND_BYTES = 40
+
+
+SessionRecord = namedtuple("SessionRecord", [
+    "start",             # 开始时间（Unix 时间戳）
+    "end",               # 结束时间（Unix 时间戳）
+    "planned_seconds",   # 计划时长（秒）
+    "focused_seconds",   # 实际专注时长（秒，不含暂停）
+    "pauses",            # 暂停次数
+    "reminders",         # 触发的间隔提醒次数
+    "completed",         # 是否完整完成
+    "tag",               # 标签
+    "sound",             # 使用的结束铃声
+])
+
+
+def _encode_text(text, size):
+    """按 UTF-8 编码并截断到 size 字节（不截断在多字节字符中间）"""
+    data = (text or "").encode("utf-8")
+    if len(data) <= size:
+        return data
+    return data[:size].decode("utf-8", "ignore").encode("utf-8")
+
+
+def _decode_text(data):
+    return data.rstrip(b"\0").decode("utf-8", "ignore")
+
+
+class SessionLog:
+    """定长记录的追加式会话日志"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._count = 0
+        self._open()
+
+    def _open(self):
+        """创建或校验日志文件，并截掉末尾不完整的记录"""
+        size = RECORD_STRUCT.size
+        header = HEADER_STRUCT.pack(MAGIC, VERSION, size)
+
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < HEADER_STRUCT.size:
+            with open(self.path, "wb") as f:
+                f.write(header)
+            return
+
+        with open(self.path, "r+b") as f:
+            magic, version, record_size = HEADER_STRUCT.unpack(f.read(HEADER_STRUCT.size))
+            if magic != MAGIC or version != VERSION or record_size != size:
+                raise ValueError(f"无法识别的专注历史文件: {self.path}")
+            body = os.path.getsize(self.path) - HEADER_STRUCT.size
+            self._count, partial = divmod(body, size)
+            if partial:
+                f.truncate(HEADER_STRUCT.size + self._count * size)
+
+    def __len__(self):
+        return self._count
+
+    def append(self, record):
+        """追加一条会话记录"""
+        packed = RECORD_STRUCT.pack(
+            record.start,
+            record.end,
+            int(record.planned_seconds),
+            float(record.focused_seconds),
+            min(int(record.pauses), 0xFFFF),
+            min(int(record.reminders), 0xFFFF),
+            1 if record.completed else 0,
+            _encode_text(record.tag, TAG_BYTES),
+            _encode_text(record.sound, SOUND_BYTES),
+        )
+        with self._lock:
+            with open(self.path, "ab") as f:
+                f.write(packed)
+                f.flush()
+                os.fsync(f.fileno())
+            self._count += 1
+
+    @staticmethod
+    def _unpack(data):
+        start, end, planned, focused, pauses, reminders, completed, tag, sound = \
+            RECORD_STRUCT.unpack(data)
+        return SessionRecord(start, end, planned, focused, pauses, reminders,
+                             bool(completed), _decode_text(tag), _decode_text(sound))
+
+    def read(self, index):
+        """读取第 index 条记录（支持负数下标）"""
+        with self._lock:
+            count = self._count
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError(index)
+        with open(self.path, "rb") as f:
+            f.seek(HEADER_STRUCT.size + index * RECORD_STRUCT.size)
+            return self._unpack(f.read(RECORD_STRUCT.size))
+
+    def iter_range(self, start=0, stop=None, chunk_records=4096):
+        """按顺序分块读取 [start, stop) 范围内的记录"""
+        with self._lock:
+            count = self._count
+        stop = count if stop is None else min(stop, count)
+        size = RECORD_STRUCT.size
+        with open(self.path, "rb") as f:
+            f.seek(HEADER_STRUCT.size + start * size)
+            position = start
+            while position < stop:
+                n = min(chunk_records, stop - position)
+                data = f.read(n * size)
+                for offset in range(0, len(data), size):
+                    yield self._unpack(data[offset:offset + size])
+                position += n
+
@@ -0,0 +1,264 @@
+"""
+运行指标模块
+============
+可选的指标注册表：计数器 + HDR 风格（对数线性分桶）的延迟直方图。
+
+功能：
+- 直方图按 2 的幂分段、每段 1024 个线性子桶记录微秒值，相对误差约 0.1%（三位有效数字），
+  记录为 O(1)，内存只与出现过的桶数有关
+- 查询任意百分位（p50/p99/p999）、最小/最大值、总和
+- 导出 Prometheus 文本格式（textfile collector 可直接读取）或 JSON 快照
+- 未启用时使用空注册表，埋点调用几乎没有开销
+
+使用：
+    import metrics
+    metrics.enable()                       # 程序启动时启用
+    tick = metrics.histogram("pomodoro_tick_interval_seconds", "实际 tick 间隔")
+    tick.record(1.002)
+    metrics.REGISTRY.write("metrics.prom")  # 或 metrics.json
+"""
+
+import os
+import json
+import threading
+
+
+SUB_BUCKET_BITS = 11                      # 每个 2 的幂区间分 2^(11-1) = 1024 个子桶
+_HALF = 1 << (SUB_BUCKET_BITS - 1)
+_LINEAR_LIMIT = 1 << SUB_BUCKET_BITS
+
+# Prometheus 导出使用的 le 分桶边界（秒）
+EXPORT_BOUNDS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def _bucket_index(micros):
+    """微秒整数值所在的桶下标（对数线性分桶）"""
+    if micros < _LINEAR_LIMIT:
+        return micros
+    shift = micros.bit_length() - SUB_BUCKET_BITS
+    return (shift + 1) * _HALF + ((micros >> shift) - _HALF)
+
+
+def _bucket_bounds(index):
+    """桶下标对应的 [下界, 上界) 微秒值"""
+    if index < _LINEAR_LIMIT:
+        return index, index + 1
+    shift = index // _HALF - 1
+    mantissa = index % _HALF + _HALF
+    return mantissa << shift, (mantissa + 1) << shift
+
+
+class Counter:
+    """单调递增计数器"""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text=""):
+        self.name = name
+        self.help = help_text
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self):
+        return {"value": self.value}
+
+    def prometheus_lines(self):
+        return [f"{self.name} {self.value}"]
+
+
+class Histogram:
+    """HDR 风格的延迟直方图（单位：秒，内部按微秒记录）"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text=""):
+        self.name = name
+        self.help = help_text
+        self._counts = {}
+        self._lock = threading.Lock()
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, seconds):
+        """记录一个值（秒），负值按 0 处理"""
+        seconds = max(0.0, seconds)
+        index = _bucket_index(int(seconds * 1_000_000))
+        with self._lock:
+            self._counts[index] = self._counts.get(index, 0) + 1
+            self.count += 1
+            self.sum += seconds
+            if self.min is None or seconds < self.min:
+                self.min = seconds
+            if self.max is None or seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, percent):
+        """百分位数（秒），取所在桶的上界；没有数据时返回 None"""
+        with self._lock:
+            if not self.count:
+                return None
+            target = max(1, -(-self.count * percent // 100))
+            seen = 0
+            for index in sorted(self._counts):
+                seen += self._counts[index]
+                if seen >= target:
+                    return min(_bucket_bounds(index)[1] / 1_000_000, self.max)
+            return self.max
+
+    def cumulative(self, bounds=EXPORT_BOUNDS):
+        """各 le 边界（秒）以下的累计次数"""
+        with self._lock:
+            items = sorted(self._counts.items())
+        result = []
+        position = 0
+        seen = 0
+        for bound in bounds:
+            limit = bound * 1_000_000
+            while position < len(items) and _bucket_bounds(items[position][0])[1] <= limit:
+                seen += items[position][1]
+                position += 1
+            result.append((bound, seen))
+        return result
+
+    def snapshot(self):
+        data = {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+        }
+        for percent in PERCENTILES:
+            data[f"p{percent:g}"] = self.percentile(percent)
+        return data
+
+    def prometheus_lines(self):
+        lines = [f'{self.name}_bucket{{le="{bound:g}"}} {seen}'
+                 for bound, seen in self.cumulative()]
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f"{self.name}_sum {self.sum:.6f}")
+        lines.append(f"{self.name}_count {self.count}")
+        return lines
+
+
+class Registry:
+    """指标注册表"""
+
+    enabled = True
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help_text):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"指标 {name} 已注册为 {metric.kind}")
+            return metric
+
+    def counter(self, name, help_text=""):
+        return self._get(Counter, name, help_text)
+
+    def histogram(self, name, help_text=""):
+        return self._get(Histogram, name, help_text)
+
+    def snapshot(self):
+        """JSON 可序列化的快照"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: dict(type=metric.kind, **metric.snapshot()) for metric in metrics}
+
+    def to_prometheus(self):
+        """Prometheus 文本格式"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            if metric.help:
+                lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.prometheus_lines())
+        return "\n".join(lines) + "\n"
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+
+    def write(self, path):
+        """原子写出指标文件：.json 结尾写 JSON 快照，否则写 Prometheus 文本"""
+        text = self.to_json() if path.endswith(".json") else self.to_prometheus()
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"写出指标文件失败: {e}")
+
+
+class _NullMetric:
+    """未启用时的空指标"""
+
+    value = count = 0
+
+    def inc(self, amount=1):
+        pass
+
+    def record(self, seconds):
+        pass
+
+
+class NullRegistry:
+    """未启用时的空注册表，所有埋点都是空操作"""
+
+    enabled = False
+    _metric = _NullMetric()
+
+    def counter(self, name, help_text=""):
+        return self._metric
+
+    def histogram(self, name, help_text=""):
+        return self._metric
+
+    def snapshot(self):
+        return {}
+
+    def to_prometheus(self):
+        return ""
+
+    def to_json(self):
+        return "{}"
+
+    def write(self, path):
+        pass
+
+
+REGISTRY = NullRegistry()
+
+
+def enable():
+    """启用指标收集（需在创建各组件之前调用），返回注册表"""
+    global REGISTRY
+    if not REGISTRY.enabled:
+        REGISTRY = Registry()
+    return REGISTRY
+
+
+def counter(name, help_text=""):
+    """从当前注册表获取计数器"""
+    return REGISTRY.counter(name, help_text)
+
+
+def histogram(name, help_text=""):
+    """从当前注册表获取直方图"""
+    return REGISTRY.histogram(name, help_text)
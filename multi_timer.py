@@ -0,0 +1,220 @@
+"""
+多计时器模块
+============
+在一个进程中同时运行大量独立的命名倒计时（会议、等待构建、专注等）。
+
+功能：
+- 所有计时器的截止时间放在同一个最小堆中，只有一个唤醒线程
+- 唤醒线程只睡到最近的截止时间，空闲的计时器不产生任何开销
+- 暂停/继续/删除采用惰性失效（代数计数），无需在堆中查找
+- snapshot() 按剩余时间排序输出，供紧凑的列表视图使用
+"""
+
+import time
+import heapq
+import itertools
+import threading
+
+from timer_engine import RUNNING, PAUSED, FINISHED
+
+
+class NamedTimer:
+    """一个命名倒计时"""
+
+    __slots__ = ("name", "total_seconds", "deadline", "paused_remaining", "state",
+                 "generation", "on_expire")
+
+    def __init__(self, name, total_seconds, on_expire=None):
+        self.name = name
+        self.total_seconds = total_seconds
+        self.deadline = None          # 运行中的单调时钟截止时间
+        self.paused_remaining = total_seconds
+        self.state = PAUSED
+        self.generation = 0           # 每次重新入堆加一，旧的堆条目随之失效
+        self.on_expire = on_expire
+
+    def remaining(self, now):
+        """剩余秒数（浮点）"""
+        if self.state == RUNNING:
+            return max(0.0, self.deadline - now)
+        if self.state == FINISHED:
+            return 0.0
+        return self.paused_remaining
+
+
+class TimerManager:
+    """基于截止时间堆的多计时器管理器"""
+
+    def __init__(self, clock=time.monotonic, on_expire=None):
+        """
+        clock: 单调时钟函数
+        on_expire: 任一计时器到期时的回调，参数为 NamedTimer（在唤醒线程中执行）
+        """
+        self._clock = clock
+        self._on_expire = on_expire
+        self._timers = {}
+        self._heap = []               # (截止时间, 序号, 代数, 计时器)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+        self.wakeups = 0
+        self.expired = 0
+
+    # ---------- 计时器管理 ----------
+
+    def __len__(self):
+        return len(self._timers)
+
+    def __contains__(self, name):
+        return name in self._timers
+
+    def get(self, name):
+        return self._timers.get(name)
+
+    def _push(self, timer):
+        """把运行中的计时器放入堆，并在它成为最早截止时唤醒线程"""
+        timer.generation += 1
+        heapq.heappush(self._heap, (timer.deadline, next(self._seq), timer.generation, timer))
+        if self._heap[0][3] is timer:
+            self._cond.notify()
+
+    def add(self, name, seconds, on_expire=None, start=True):
+        """添加（或替换同名）计时器，返回 NamedTimer"""
+        with self._cond:
+            old = self._timers.get(name)
+            if old is not None:
+                old.generation += 1
+            timer = NamedTimer(name, seconds, on_expire)
+            self._timers[name] = timer
+            if start:
+                timer.state = RUNNING
+                timer.deadline = self._clock() + seconds
+                self._push(timer)
+            return timer
+
+    def remove(self, name):
+        """删除计时器（堆中的条目惰性失效）"""
+        with self._cond:
+            timer = self._timers.pop(name, None)
+            if timer is not None:
+                timer.generation += 1
+            return timer
+
+    def pause(self, name):
+        with self._cond:
+            timer = self._timers[name]
+            if timer.state == RUNNING:
+                timer.paused_remaining = max(0.0, timer.deadline - self._clock())
+                timer.deadline = None
+                timer.state = PAUSED
+                timer.generation += 1
+
+    def resume(self, name):
+        with self._cond:
+            timer = self._timers[name]
+            if timer.state == PAUSED:
+                timer.deadline = self._clock() + timer.paused_remaining
+                timer.state = RUNNING
+                self._push(timer)
+
+    def restart(self, name):
+        """从头重新开始计时"""
+        with self._cond:
+            timer = self._timers[name]
+            timer.deadline = self._clock() + timer.total_seconds
+            timer.state = RUNNING
+            self._push(timer)
+
+    # ---------- 到期处理 ----------
+
+    def _discard_stale(self):
+        """弹出堆顶已失效的条目"""
+        heap = self._heap
+        while heap:
+            _, _, generation, timer = heap[0]
+            if generation == timer.generation and timer.state == RUNNING \
+                    and self._timers.get(timer.name) is timer:
+                return
+            heapq.heappop(heap)
+
+    def poll(self, now=None):
+        """处理所有已到期的计时器并执行回调，返回到期的计时器列表"""
+        fired = []
+        with self._cond:
+            now = self._clock() if now is None else now
+            heap = self._heap
+            while True:
+                self._discard_stale()
+                if not heap or heap[0][0] > now:
+                    break
+                _, _, _, timer = heapq.heappop(heap)
+                timer.state = FINISHED
+                timer.deadline = None
+                timer.paused_remaining = 0.0
+                timer.generation += 1
+                fired.append(timer)
+            self.expired += len(fired)
+
+        for timer in fired:
+            for callback in (timer.on_expire, self._on_expire):
+                if callback is None:
+                    continue
+                try:
+                    callback(timer)
+                except Exception as e:
+                    print(f"计时器回调失败 {timer.name}: {e}")
+        return fired
+
+    def _run(self):
+        """唤醒线程：睡到最近的截止时间，没有计时器时一直等待"""
+        while True:
+            with self._cond:
+                if self._stopped:
+                    return
+                self._discard_stale()
+                delay = self._heap[0][0] - self._clock() if self._heap else None
+                if delay is None or delay > 0:
+                    self._cond.wait(delay)
+                    self.wakeups += 1
+                    continue
+            self.poll()
+
+    def start(self):
+        """启动唯一的唤醒线程"""
+        with self._cond:
+            if self._thread is None:
+                self._stopped = False
+                self._thread = threading.Thread(target=self._run, name="timer-manager", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """停止唤醒线程"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+            thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=1)
+
+    # ---------- 查询 ----------
+
+    def snapshot(self, limit=None):
+        """
+        计时器列表 [(名称, 剩余秒数, 状态), ...]
+        运行中的按截止时间排序在前，其后是暂停和已结束的
+        limit: 最多返回多少条（只取最早截止的若干个，无需全量排序）
+        """
+        with self._cond:
+            now = self._clock()
+            running = [t for t in self._timers.values() if t.state == RUNNING]
+            others = [t for t in self._timers.values() if t.state != RUNNING]
+            if limit is None:
+                running.sort(key=lambda t: t.deadline)
+            else:
+                running = heapq.nsmallest(limit, running, key=lambda t: t.deadline)
+            rows = [(t.name, t.remaining(now), t.state) for t in running]
+            rows += [(t.name, t.remaining(now), t.state)
+                     for t in sorted(others, key=lambda t: (t.state, t.name))]
+            return rows if limit is None else rows[:limit]
@@ -0,0 +1,400 @@
+"""
+自定义铃声转码缓存模块
+======================
+把用户选择的 MP3/OGG/FLAC/WAV 铃声一次性解码为混音器原生格式的 PCM 文件，
+之后播放只需内存映射，结束铃声响起时不再解码。
+
+功能：
+- 选择文件时先检查文件头，无法识别或已损坏的文件在选择时就报错，而不是在计时结束时
+- 解码一次后缓存为 16 位 PCM WAV，缓存键为 (路径, 修改时间, 大小, 混音器格式)，
+  文件被替换或混音器格式变化时自动重新转码
+- 记录原始时长与峰值电平，超过最大时长的部分截掉（末尾短淡出避免爆音）
+- 解码内存有上限：WAV 只读取最大时长以内的帧，压缩格式在解码前按文件大小拒绝过长的曲目
+- 打开缓存时清理原始文件已删除或已改动的缓存条目
+- 播放时内存映射缓存文件的数据段，即使 50 MB 的曲目也能立即开始；
+  铃声被替换或移出铃声库时关闭旧映射（Windows 上映射中的文件无法替换或删除）
+
+缓存文件格式：标准 RIFF/WAVE，fmt 与 data 之间多一个 "pmdp" 块保存探测信息，
+普通播放器会忽略该块。同名的 .src 文件记录原始文件的路径、修改时间和大小，供清理使用。
+"""
+
+import io
+import os
+import sys
+import json
+import math
+import mmap
+import wave
+import struct
+import hashlib
+import threading
+from array import array
+from collections import namedtuple
+
+
+DEFAULT_MAX_SECONDS = 60   # 自定义铃声最长保留的秒数
+FADE_SECONDS = 0.05        # 截断处的淡出时长
+# 压缩格式（MP3/OGG/FLAC）无法只解码开头，解码前按文件大小估算时长：
+# 按 320 kbps 计，最多接受约最大时长 5 倍的曲目，解码内存随之有上限
+COMPRESSED_BYTES_PER_SECOND = 40000
+MAX_SOURCE_FACTOR = 5
+
+RIFF_HEADER = struct.Struct("<4sI4s")
+CHUNK_HEADER = struct.Struct("<4sI")
+FMT_BODY = struct.Struct("<HHIIHH")
+INFO_BODY = struct.Struct("<ddB7x")   # 原始时长, 峰值(0~1), 是否截断
+DATA_OFFSET = (RIFF_HEADER.size + CHUNK_HEADER.size + FMT_BODY.size
+               + CHUNK_HEADER.size + INFO_BODY.size + CHUNK_HEADER.size)
+
+
+SoundInfo = namedtuple("SoundInfo", [
+    "source",          # 原始文件路径
+    "path",            # 缓存 WAV 路径
+    "sample_rate",     # 采样率
+    "channels",        # 声道数
+    "frames",          # 缓存中的帧数
+    "source_seconds",  # 原始时长（秒）
+    "peak",            # 峰值电平（0~1，满幅为 1）
+    "trimmed",         # 是否被截断到最大时长
+])
+
+
+def probe_format(path):
+    """
+    根据文件头判断音频格式，返回 "wav" / "mp3" / "ogg" / "flac"
+    无法识别时抛出 ValueError，无法读取时抛出 OSError
+    """
+    with open(path, "rb") as f:
+        head = f.read(12)
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[:4] == b"fLaC":
+        return "flac"
+    if head[:3] == b"ID3" or (len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return "mp3"
+    raise ValueError(f"无法识别的音频文件: {os.path.basename(path)}")
+
+
+def describe(info):
+    """人类可读的探测结果，如 "3:25，峰值 -1.2 dBFS，已截取前 60 秒" """
+    minutes, seconds = divmod(int(round(info.source_seconds)), 60)
+    text = f"{minutes}:{seconds:02d}"
+    if info.peak > 0:
+        text += f"，峰值 {20 * math.log10(info.peak):.1f} dBFS"
+    else:
+        text += "，静音"
+    if info.trimmed:
+        text += f"，已截取前 {info.frames // info.sample_rate} 秒"
+    return text
+
+
+# ---------- 解码器 ----------
+# 解码器签名：decoder(path, max_seconds) -> (16 位小端 PCM 字节, 采样率, 声道数, 原始总帧数)
+# max_seconds 为 None 时解码全部；否则解码器可以只返回开头部分（多返回的由调用方截掉）
+
+def _read_wav_head(path, max_seconds):
+    """读取 WAV 最大时长以内的帧，返回 (参数, 帧字节, 总帧数)"""
+    try:
+        with wave.open(path, "rb") as wav_file:
+            params = wav_file.getparams()
+            frames = params.nframes
+            if max_seconds:
+                frames = min(frames, int(max_seconds * params.framerate))
+            return params, wav_file.readframes(frames), params.nframes
+    except (wave.Error, EOFError) as e:
+        raise ValueError(f"无法读取 WAV 文件 {os.path.basename(path)}: {e}") from e
+
+
+def pygame_decoder(pygame):
+    """用 pygame 混音器解码（支持 MP3/OGG/FLAC，输出即混音器原生格式）"""
+
+    def decode(path, max_seconds=None):
+        frequency, size, channels = pygame.mixer.get_init()
+        if abs(size) != 16:
+            raise ValueError(f"不支持的混音器采样位数: {size}")
+        if probe_format(path) != "wav":
+            # 压缩格式只能整体解码，总帧数由调用方按解码结果计算
+            return pygame.mixer.Sound(path).get_raw(), frequency, channels, None
+        # WAV 先截取开头再交给 pygame 转换采样率和声道
+        params, head, total = _read_wav_head(path, max_seconds)
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav_file:
+            wav_file.setparams(params)
+            wav_file.writeframes(head)
+        del head
+        buffer.seek(0)
+        data = pygame.mixer.Sound(file=buffer).get_raw()
+        return data, frequency, channels, int(total * frequency / params.framerate)
+
+    decode.format = lambda: pygame.mixer.get_init()[::2]
+    return decode
+
+
+def wav_decoder(path, max_seconds=None):
+    """用 wave 模块读取 16 位 WAV（没有 pygame 时的后备，保持原格式）"""
+    params, head, total = _read_wav_head(path, max_seconds)
+    if params.sampwidth != 2:
+        raise ValueError("只支持 16 位 WAV 文件")
+    return head, params.framerate, params.nchannels, total
+
+
+class PcmCache:
+    """自定义铃声的转码缓存"""
+
+    def __init__(self, cache_dir, max_seconds=DEFAULT_MAX_SECONDS, decoder=None):
+        """
+        cache_dir: 缓存目录（按需创建）
+        max_seconds: 最长保留的秒数
+        decoder: 解码函数；为 None 时只能缓存 16 位 WAV
+        """
+        self.cache_dir = cache_dir
+        self.max_seconds = max_seconds
+        self.decoder = decoder
+        self._lock = threading.Lock()
+        self._maps = {}       # 原始路径 -> (缓存路径, mmap, 打开的文件)
+        self.transcoded = 0
+        self.pruned = self.prune()
+
+    # ---------- 缓存键 ----------
+
+    def _mixer_format(self):
+        target = getattr(self.decoder, "format", None)
+        return target() if target else (0, 0)
+
+    def cache_path(self, path):
+        """原始文件对应的缓存文件路径（文件不存在时抛出 OSError）"""
+        st = os.stat(path)
+        rate, channels = self._mixer_format()
+        key = f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}|{rate}|{channels}"
+        digest = hashlib.sha1(key.encode("utf-8", "surrogateescape")).hexdigest()[:20]
+        return os.path.join(self.cache_dir, digest + ".wav")
+
+    @staticmethod
+    def _source_stamp(path):
+        st = os.stat(path)
+        return {"source": os.path.abspath(path), "mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+    def prune(self):
+        """删除原始文件已不存在或已改动的缓存条目（及残留的临时文件），返回删除的个数"""
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return 0
+        removed = 0
+        for name in names:
+            if not name.endswith(".wav"):
+                if name.endswith(".tmp"):
+                    removed += self._remove(os.path.join(self.cache_dir, name))
+                continue
+            cache_file = os.path.join(self.cache_dir, name)
+            src_file = cache_file[:-4] + ".src"
+            try:
+                with open(src_file, "r", encoding="utf-8") as f:
+                    stamp = json.load(f)
+                current = self._source_stamp(stamp["source"])
+            except (OSError, ValueError, KeyError, TypeError):
+                current, stamp = None, None
+            if current is None or current != stamp:
+                removed += self._remove(cache_file)
+                self._remove(src_file)
+        for name in names:
+            # 缓存 WAV 已不存在的 .src
+            if name.endswith(".src") and name[:-4] + ".wav" not in names:
+                self._remove(os.path.join(self.cache_dir, name))
+        if removed:
+            print(f"已清理 {removed} 个过期的铃声缓存")
+        return removed
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return 1
+        except OSError:
+            return 0
+
+    # ---------- 读取 ----------
+
+    @staticmethod
+    def _read_info(cache_file, source):
+        """解析缓存文件头；不是本模块写出的文件时返回 None"""
+        try:
+            with open(cache_file, "rb") as f:
+                head = f.read(DATA_OFFSET)
+                size = os.fstat(f.fileno()).st_size
+        except OSError:
+            return None
+        if len(head) != DATA_OFFSET:
+            return None
+        offset = RIFF_HEADER.size + CHUNK_HEADER.size
+        _, channels, rate, _, block_align, bits = FMT_BODY.unpack_from(head, offset)
+        offset += FMT_BODY.size + CHUNK_HEADER.size
+        source_seconds, peak, trimmed = INFO_BODY.unpack_from(head, offset)
+        offset += INFO_BODY.size
+        tag, data_size = CHUNK_HEADER.unpack_from(head, offset)
+        if (head[:4] != b"RIFF" or head[36:40] != b"pmdp" or tag != b"data"
+                or bits != 16 or DATA_OFFSET + data_size != size):
+            return None
+        return SoundInfo(source, cache_file, rate, channels, data_size // block_align,
+                         source_seconds, peak, bool(trimmed))
+
+    def lookup(self, path):
+        """已缓存时返回 SoundInfo，否则返回 None"""
+        try:
+            cache_file = self.cache_path(path)
+        except OSError:
+            return None
+        return self._read_info(cache_file, path)
+
+    # ---------- 转码 ----------
+
+    def max_source_bytes(self):
+        """压缩格式原始文件的大小上限（字节）；不限制最大时长时为 None"""
+        if not self.max_seconds:
+            return None
+        return int(self.max_seconds * MAX_SOURCE_FACTOR * COMPRESSED_BYTES_PER_SECOND)
+
+    def _decode(self, path):
+        if probe_format(path) != "wav":
+            if self.decoder is None:
+                raise ValueError("未初始化音频解码器，只能缓存 WAV 文件")
+            limit = self.max_source_bytes()
+            size = os.path.getsize(path)
+            if limit and size > limit:
+                raise ValueError(f"文件过大（{size / 1e6:.1f} MB），"
+                                 f"压缩格式的自定义铃声最大 {limit / 1e6:.1f} MB，请先剪短")
+        return (self.decoder or wav_decoder)(path, self.max_seconds)
+
+    def transcode(self, path):
+        """
+        检查文件头、解码、截断并写入缓存，返回 SoundInfo
+        文件无法识别或解码失败时抛出 ValueError / OSError
+        """
+        cache_file = self.cache_path(path)
+        stamp = self._source_stamp(path)
+        try:
+            data, rate, channels, total_frames = self._decode(path)
+        except RuntimeError as e:
+            # pygame.error（RuntimeError 的子类）等解码器异常统一转为 ValueError
+            raise ValueError(f"无法解码 {os.path.basename(path)}: {e}") from e
+
+        block_align = 2 * channels
+        decoded_frames = len(data) // block_align
+        total_frames = max(total_frames or 0, decoded_frames)
+        if not decoded_frames:
+            raise ValueError(f"音频文件为空: {os.path.basename(path)}")
+        frames = decoded_frames
+        if self.max_seconds:
+            frames = min(frames, int(self.max_seconds * rate))
+        trimmed = frames < total_frames
+
+        # 只复制保留的部分
+        samples = array('h')
+        samples.frombytes(memoryview(data)[:frames * block_align])
+        del data
+        if sys.byteorder == "big":
+            samples.byteswap()
+        if trimmed:
+            fade = min(frames, int(FADE_SECONDS * rate))
+            for i in range(fade):
+                gain = i / fade
+                for c in range(channels):
+                    index = (frames - 1 - i) * channels + c
+                    samples[index] = int(samples[index] * gain)
+        peak = max(max(samples), -min(samples)) / 32768
+
+        if sys.byteorder == "big":
+            samples.byteswap()
+        source_seconds = total_frames / rate
+        self._write(cache_file, samples.tobytes(), rate, channels, source_seconds, peak, trimmed)
+        self._write_stamp(cache_file, stamp)
+        self.transcoded += 1
+        return SoundInfo(path, cache_file, rate, channels, frames, source_seconds, peak, trimmed)
+
+    def _write(self, cache_file, pcm, rate, channels, source_seconds, peak, trimmed):
+        """原子写出缓存 WAV（临时文件 + 重命名）"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        block_align = 2 * channels
+        header = b"".join([
+            RIFF_HEADER.pack(b"RIFF", DATA_OFFSET - 8 + len(pcm), b"WAVE"),
+            CHUNK_HEADER.pack(b"fmt ", FMT_BODY.size),
+            FMT_BODY.pack(1, channels, rate, rate * block_align, block_align, 16),
+            CHUNK_HEADER.pack(b"pmdp", INFO_BODY.size),
+            INFO_BODY.pack(source_seconds, peak, 1 if trimmed else 0),
+            CHUNK_HEADER.pack(b"data", len(pcm)),
+        ])
+        tmp_path = f"{cache_file}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(header)
+            f.write(pcm)
+        os.replace(tmp_path, cache_file)
+
+    @staticmethod
+    def _write_stamp(cache_file, stamp):
+        """写出缓存条目的 .src 文件（失败时只影响清理）"""
+        tmp_path = f"{cache_file[:-4]}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(stamp, f, ensure_ascii=False)
+            os.replace(tmp_path, cache_file[:-4] + ".src")
+        except OSError as e:
+            print(f"写入铃声缓存信息失败: {e}")
+
+    def ensure(self, path):
+        """返回已缓存的 SoundInfo，未缓存时转码"""
+        return self.lookup(path) or self.transcode(path)
+
+    # ---------- 播放 ----------
+
+    def map(self, path):
+        """
+        内存映射缓存文件的 PCM 数据段（未缓存时先转码），返回 memoryview
+        原始文件被替换（缓存路径变化）时关闭旧映射；映射在 release() / clear() 之前保持打开
+        """
+        info = self.ensure(path)
+        stale = None
+        with self._lock:
+            entry = self._maps.get(path)
+            if entry is not None and entry[0] != info.path:
+                stale, entry = entry, None
+            if entry is None:
+                f = open(info.path, "rb")
+                try:
+                    entry = (info.path, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), f)
+                except (OSError, ValueError):
+                    f.close()
+                    raise
+                self._maps[path] = entry
+        if stale is not None:
+            self._close(stale)
+        return memoryview(entry[1])[DATA_OFFSET:]
+
+    def release(self, path):
+        """关闭原始文件对应的内存映射（铃声移出铃声库时调用）"""
+        with self._lock:
+            entry = self._maps.pop(path, None)
+        if entry is not None:
+            self._close(entry)
+
+    @staticmethod
+    def _close(entry):
+        _, mapped, f = entry
+        try:
+            mapped.close()
+        except BufferError:
+            pass  # 仍有 memoryview 引用，随对象回收
+        f.close()
+
+    def playable_path(self, path):
+        """供按文件播放的后端使用：已缓存时返回缓存 WAV，否则返回原始路径"""
+        info = self.lookup(path)
+        return info.path if info else path
+
+    def clear(self):
+        """关闭所有内存映射"""
+        with self._lock:
+            maps, self._maps = self._maps, {}
+        for entry in maps.values():
+            self._close(entry)
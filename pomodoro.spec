@@ -21,13 +21,30 @@ a = Analysis(
     ['pomodoro_timer.py'],
     pathex=[project_dir],
     binaries=[],
-    datas=[
-        # 包含 sounds.py 模块
-        ('sounds.py', '.'),
-    ],
+    datas=[],
     hiddenimports=[
         'pygame',
         'pygame.mixer',
+        # 项目模块：部分在函数内按需导入（--headless 不加载图形界面与音频模块），
+        # 显式列出以免分析时遗漏
+        'sounds',
+        'synth',
+        'recipes',
+        'audio',
+        'audio_backends',
+        'pcm_cache',
+        'ambient',
+        'control',
+        'metrics',
+        'checkpoint',
+        'history',
+        'stats',
+        'multi_timer',
+        'cycles',
+        'reminders',
+        'render',
+        'config_store',
+        'timer_engine',
     ],
     hookspath=[],
     hooksconfig={},
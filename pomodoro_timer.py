@@ -15,28 +15,76 @@
 日期：2026-01-02
 """
 
-import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
-import threading
 import time
+_MODULE_LOAD_START = time.perf_counter()  # 供 --profile-startup 统计导入耗时
+
+import threading
 import os
 import sys
-import json
+import math
 
-# 导入内置铃声模块
-from sounds import get_builtin_sounds, get_ding_sound, get_alarm_sound, get_sound_generator
+import metrics
+from audio import SoundBank, AudioDispatcher
+from audio_backends import create_backend, system_beep, BACKEND_NAMES
+from render import FrameRenderer
+from timer_engine import TimerEngine, RUNNING, PAUSED, FINISHED
+from cycles import CyclePlan, FOCUS, LONG_BREAK, PHASE_LABELS, DEFAULT_PHASE_SOUNDS
+from reminders import ReminderPattern
+from multi_timer import TimerManager
+from config_store import ConfigStore
+from checkpoint import CheckpointFile
+import pcm_cache
+from history import SessionLog, SessionRecord
+from stats import StatsIndex, summary_lines
 
-# 尝试导入 pygame 用于音频播放
-try:
-    import pygame
-    pygame.mixer.init()
-    AUDIO_BACKEND = "pygame"
-except ImportError:
-    try:
-        from playsound import playsound
-        AUDIO_BACKEND = "playsound"
-    except ImportError:
-        AUDIO_BACKEND = None
+# 图形界面相关模块（tkinter、内置铃声模块、背景音模块）由 import_gui_modules() 按需导入，
+# --headless 模式下不会加载 tkinter / pygame / NumPy
+tk = ttk = messagebox = filedialog = None
+sounds = ambient = None
+
+# 音频后端（audio_backends.AudioBackend）在窗口显示后由 init_audio_backend() 在后台初始化
+AUDIO_BACKEND = None
+
+
+def import_gui_modules():
+    """导入图形界面所需的模块（tkinter、内置铃声模块与背景音模块）"""
+    global tk, ttk, messagebox, filedialog, sounds, ambient
+    if tk is not None:
+        return
+    import tkinter
+    from tkinter import ttk as _ttk, messagebox as _messagebox, filedialog as _filedialog
+    import sounds as _sounds
+    import ambient as _ambient
+    tk, ttk, messagebox, filedialog = tkinter, _ttk, _messagebox, _filedialog
+    sounds, ambient = _sounds, _ambient
+
+
+def init_audio_backend(name="auto", sink_path=None):
+    """
+    初始化音频后端（audio_backends.AudioBackend），返回后端对象；不可用时返回 None
+    name 为 "auto" 时依次尝试 pygame、playsound、winsound
+    """
+    global AUDIO_BACKEND
+    AUDIO_BACKEND = create_backend(name, sink_path)
+    return AUDIO_BACKEND
+
+
+class StartupProfile:
+    """启动耗时统计（--profile-startup）"""
+    
+    def __init__(self):
+        self.phases = {}
+    
+    def record(self, phase, seconds):
+        """记录一个阶段的耗时（秒）"""
+        self.phases[phase] = seconds
+    
+    def report(self):
+        """生成耗时报告文本"""
+        lines = ["启动耗时分析:"]
+        for phase, seconds in self.phases.items():
+            lines.append(f"  - {phase}: {seconds * 1000:.1f} ms")
+        return "\n".join(lines)
 
 
 def get_resource_path(relative_path):
@@ -56,6 +104,31 @@ def get_config_path():
         return os.path.join(os.path.dirname(os.path.abspath(__file__)), "pomodoro_config.json")
 
 
+def get_history_path():
+    """获取专注历史文件路径（与配置文件同目录）"""
+    return os.path.join(os.path.dirname(get_config_path()), "pomodoro_history.bin")
+
+
+def get_stats_path():
+    """获取专注统计快照路径（与配置文件同目录）"""
+    return os.path.join(os.path.dirname(get_config_path()), "pomodoro_stats.json")
+
+
+def get_sound_cache_dir():
+    """获取自定义铃声转码缓存目录（与配置文件同目录）"""
+    return os.path.join(os.path.dirname(get_config_path()), "sound_cache")
+
+
+def get_control_token_path():
+    """获取本地控制接口令牌文件路径（与配置文件同目录）"""
+    return os.path.join(os.path.dirname(get_config_path()), "pomodoro_control.token")
+
+
+def get_checkpoint_path():
+    """获取会话检查点路径（与配置文件同目录）"""
+    return os.path.join(os.path.dirname(get_config_path()), "pomodoro_session.bin")
+
+
 class PomodoroTimer:
     """番茄钟主应用类"""
     
@@ -64,39 +137,169 @@ class PomodoroTimer:
     DEFAULT_SOUND_PATH = ""
     DEFAULT_INTERVAL_MINUTES = 3
     DEFAULT_INTERVAL_ENABLED = True
+    # 计时模式："after" 由 Tk 事件循环按截止时间调度（无工作线程）；"thread" 使用后台计时线程
+    DEFAULT_TIMER_MODE = "after"
+    # 循环模式：专注轮数、短休息/长休息时长（分钟）、每几轮一次长休息
+    DEFAULT_CYCLE_COUNT = 4
+    DEFAULT_SHORT_BREAK_MINUTES = 5
+    DEFAULT_LONG_BREAK_MINUTES = 15
+    DEFAULT_LONG_BREAK_EVERY = 4
+    # 进度条宽度（像素），进度按此精度量化
+    PROGRESS_STEPS = 350
     
-    def __init__(self, root):
-        """初始化番茄钟应用"""
+    # 指标文件写出间隔（毫秒）
+    METRICS_WRITE_INTERVAL = 15000
+    DEFAULT_AMBIENT_VOLUME = 0.3  # 背景音音量（0–1）
+    
+    def __init__(self, root, profile=None, control_port=None, metrics_file=None, audio_backend=None,
+                 audio_sink=None):
+        """
+        初始化番茄钟应用
+        音频后端和铃声在窗口显示后由 start_audio_warmup() 在后台准备
+        """
+        import_gui_modules()
         self.root = root
+        self.metrics_file = metrics_file
+        self._audio_choice = (audio_backend, audio_sink)  # 命令行指定的后端，覆盖配置
+        self._after_lag = metrics.histogram(
+            "pomodoro_ui_after_lag_seconds", "root.after 回调相对预定时间的延迟")
+        self._play_latency = metrics.histogram(
+            "pomodoro_audio_play_latency_seconds", "播放请求到实际调用 play() 的延迟")
         self.root.title("🍅 番茄钟 - Pomodoro Timer")
-        self.root.geometry("480x700")
+        self.root.geometry("480x740")
         self.root.resizable(False, False)
         self.root.configure(bg="#2C3E50")
         
-        # 计时器状态
-        self.is_running = False
-        self.is_paused = False
-        self.remaining_seconds = 0
-        self.total_seconds = 0
+        # 计时引擎：计时逻辑与界面分离，界面只订阅事件并负责显示
+        self.engine = TimerEngine()
+        self.engine.subscribe("tick", self.update_timer_display)
+        self.engine.subscribe("reminder", self._on_reminder)
+        self.engine.subscribe("prearm", self._on_prearm)
+        self.engine.subscribe("phase", lambda phase, summary: self._ui(self._on_phase, phase, summary))
+        self.engine.subscribe("complete", lambda: self._ui(self.timer_complete))
         self.timer_thread = None
-        self.stop_event = threading.Event()
-        self.last_interval_time = 0
+        self.tick_job = None
+        
+        # 会话检查点：只在状态转换时写入，崩溃或重启后恢复
+        self.checkpoint = CheckpointFile(get_checkpoint_path())
+        self.checkpoint.attach(self.engine)
         
-        # 生成内置铃声
-        self.sound_generator = get_sound_generator()
-        self.builtin_sounds = get_builtin_sounds()
+        # 多计时器：所有命名计时器共用一个截止时间堆和一个唤醒线程
+        self.timer_manager = TimerManager(on_expire=self._on_named_timer_expire)
+        self.timers_window = None
         
-        # 加载配置
+        # 专注背景音（流式生成，需后端支持流式播放）
+        self.ambient_player = None
+        
+        self.profile = profile
+        
+        # 内置铃声（此时只取名称和路径，文件在后台生成）
+        self.sound_generator = sounds.get_sound_generator()
+        self.builtin_sounds = sounds.get_builtin_sound_entries()
+        self._builtin_paths = {path for _, path in self.builtin_sounds}
+        
+        # 加载配置（后台防抖写入）
+        self.config_store = None
         self.config = self.load_config()
         
+        # 自定义铃声转码缓存（解码器在音频后端就绪后设置）
+        self.pcm_cache = pcm_cache.PcmCache(
+            get_sound_cache_dir(),
+            self.config.get("custom_sound_max_seconds", pcm_cache.DEFAULT_MAX_SECONDS))
+        
+        # 专注历史
+        self.session_started_at = None
+        try:
+            self.history = SessionLog(get_history_path())
+            self.stats_index = StatsIndex(self.history, get_stats_path())
+        except Exception as e:
+            print(f"加载专注历史失败: {e}")
+            self.history = None
+            self.stats_index = None
+        
+        # 内存铃声库在音频后端就绪后创建
+        self.sound_bank = None
+        
+        # 共享的音频调度器（替代每次播放新建线程）
+        # 后台准备完成前的播放请求先排队
+        self.audio_dispatcher = AudioDispatcher(self._play_sound, start_paused=True)
+        
         # 创建界面
+        build_start = time.perf_counter()
         self.create_widgets()
+        if self.profile:
+            self.profile.record("界面构建", time.perf_counter() - build_start)
+        
+        # 渲染层：合并排队中的界面更新，只重绘变化的部件
+        self.renderer = FrameRenderer(
+            lambda flush: self._after(0, flush),
+            {
+                "time": lambda text: self.timer_label.config(text=text),
+                "title": self.root.title,
+                "progress": lambda value: self.progress.configure(value=value),
+            },
+        )
         
         # 设置窗口关闭事件
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
         
         # 让窗口居中显示
         self.center_window()
+        
+        # 恢复上次未结束的会话
+        resume_start = time.perf_counter()
+        self.resume_session()
+        if self.profile:
+            self.profile.record("会话恢复", time.perf_counter() - resume_start)
+        
+        # 本地控制接口（默认关闭）
+        self.control_server = None
+        self.start_control_server(control_port)
+        
+        if self.metrics_file:
+            self.root.after(self.METRICS_WRITE_INTERVAL, self._write_metrics_loop)
+    
+    # ---------- 计时状态（由计时引擎提供） ----------
+    
+    @property
+    def is_running(self):
+        return self.engine.is_running
+    
+    @property
+    def is_paused(self):
+        return self.engine.is_paused
+    
+    @property
+    def remaining_seconds(self):
+        return self.engine.remaining_seconds
+    
+    @property
+    def total_seconds(self):
+        return self.engine.total_seconds
+    
+    def _ui(self, func, *args):
+        """在 Tk 线程中执行界面更新（引擎回调可能来自计时线程）"""
+        if threading.current_thread() is threading.main_thread():
+            func(*args)
+        else:
+            self._after(0, func, *args)
+    
+    def _after(self, delay_ms, func, *args):
+        """root.after 的包装：启用指标时记录回调相对预定时间的延迟"""
+        if not metrics.REGISTRY.enabled:
+            return self.root.after(delay_ms, func, *args)
+        due = time.perf_counter() + delay_ms / 1000
+        
+        def run():
+            self._after_lag.record(time.perf_counter() - due)
+            func(*args)
+        
+        return self.root.after(delay_ms, run)
+    
+    def _write_metrics_loop(self):
+        """定期写出指标文件"""
+        metrics.REGISTRY.write(self.metrics_file)
+        self.root.after(self.METRICS_WRITE_INTERVAL, self._write_metrics_loop)
     
     def center_window(self):
         """将窗口居中显示"""
@@ -114,28 +317,32 @@ class PomodoroTimer:
             "sound_path": self.DEFAULT_SOUND_PATH,
             "interval_minutes": self.DEFAULT_INTERVAL_MINUTES,
             "interval_enabled": self.DEFAULT_INTERVAL_ENABLED,
-            "selected_builtin_sound": 3
+            "selected_builtin_sound": 3,
+            "timer_mode": self.DEFAULT_TIMER_MODE,
+            "cycle_enabled": False,
+            "cycle_count": self.DEFAULT_CYCLE_COUNT,
+            "short_break_minutes": self.DEFAULT_SHORT_BREAK_MINUTES,
+            "long_break_minutes": self.DEFAULT_LONG_BREAK_MINUTES,
+            "long_break_every": self.DEFAULT_LONG_BREAK_EVERY,
+            "phase_sounds": dict(DEFAULT_PHASE_SOUNDS),
+            "interval_pattern": "",
+            "control_port": 0,
+            "control_socket": "",
+            "ambient": "",
+            "ambient_volume": self.DEFAULT_AMBIENT_VOLUME,
+            "resume_session": True,
+            "audio_backend": "auto",
+            "audio_sink_path": "",
+            "custom_sound_max_seconds": pcm_cache.DEFAULT_MAX_SECONDS,
+            "session_tag": ""
         }
         
-        try:
-            config_path = get_config_path()
-            if os.path.exists(config_path):
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    loaded_config = json.load(f)
-                    default_config.update(loaded_config)
-        except Exception as e:
-            print(f"加载配置文件失败: {e}")
-        
-        return default_config
+        self.config_store = ConfigStore(get_config_path(), default_config)
+        return self.config_store.load()
     
     def save_config(self):
-        """保存用户配置"""
-        try:
-            config_path = get_config_path()
-            with open(config_path, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"保存配置文件失败: {e}")
+        """保存用户配置（静默期后由后台线程原子写入，内容未变化时跳过）"""
+        self.config_store.save()
     
     def create_widgets(self):
         """创建界面组件"""
@@ -189,7 +396,7 @@ class PomodoroTimer:
         # 进度条
         self.progress = ttk.Progressbar(
             timer_frame,
-            length=350,
+            length=self.PROGRESS_STEPS,
             mode="determinate",
             maximum=100
         )
@@ -224,6 +431,25 @@ class PomodoroTimer:
         self.time_entry.pack(side="left", padx=10)
         self.time_entry.insert(0, str(self.config.get("default_minutes", 25)))
         
+        # 会话标签（写入专注历史，统计中按标签汇总）
+        self.tag_var = tk.StringVar(value=self.config.get("session_tag", ""))
+        tag_entry = tk.Entry(
+            time_frame,
+            textvariable=self.tag_var,
+            font=("微软雅黑", 10),
+            width=10
+        )
+        tag_entry.pack(side="right")
+        
+        tag_label = tk.Label(
+            time_frame,
+            text="🏷️ 标签：",
+            font=("微软雅黑", 11),
+            fg="#ECF0F1",
+            bg="#2C3E50"
+        )
+        tag_label.pack(side="right")
+        
         # 快捷时间按钮
         quick_frame = tk.Frame(settings_frame, bg="#2C3E50")
         quick_frame.pack(fill="x", pady=8)
@@ -248,6 +474,7 @@ class PomodoroTimer:
         interval_frame.pack(pady=5, padx=30, fill="x")
         
         self.interval_enabled_var = tk.BooleanVar(value=self.config.get("interval_enabled", True))
+        self.engine.interval_enabled = self.interval_enabled_var.get()
         
         interval_check = tk.Checkbutton(
             interval_frame,
@@ -291,9 +518,50 @@ class PomodoroTimer:
             command=self.toggle_always_on_top
         )
         top_check.pack(side="left")
+        
+        self.cycle_enabled_var = tk.BooleanVar(value=self.config.get("cycle_enabled", False))
+        
+        cycle_check = tk.Checkbutton(
+            top_frame,
+            text="🔁 循环",
+            font=("微软雅黑", 10),
+            fg="#ECF0F1",
+            bg="#2C3E50",
+            selectcolor="#34495E",
+            activebackground="#2C3E50",
+            activeforeground="#ECF0F1",
+            variable=self.cycle_enabled_var,
+            command=self.on_cycle_toggle
+        )
+        cycle_check.pack(side="left", padx=(10, 0))
 
         # 专注计数显示
-        self.completed_count = 0
+        self.completed_count = self.stats_index.stats.day()[0] if self.stats_index else 0
+        
+        stats_btn = tk.Button(
+            top_frame,
+            text="📊",
+            font=("微软雅黑", 9),
+            bg="#34495E",
+            fg="white",
+            relief="flat",
+            cursor="hand2",
+            command=self.show_stats
+        )
+        stats_btn.pack(side="right", padx=(5, 0))
+        
+        timers_btn = tk.Button(
+            top_frame,
+            text="⏱",
+            font=("微软雅黑", 9),
+            bg="#34495E",
+            fg="white",
+            relief="flat",
+            cursor="hand2",
+            command=self.show_timers
+        )
+        timers_btn.pack(side="right", padx=(5, 0))
+        
         self.count_label = tk.Label(
             top_frame,
             text=f"今日专注: {self.completed_count}",
@@ -431,6 +699,33 @@ class PomodoroTimer:
         if self.selected_sound_var.get() != "自定义...":
             self.custom_sound_frame.pack_forget()
         
+        ambient_frame = tk.Frame(sound_section, bg="#2C3E50")
+        ambient_frame.pack(fill="x", pady=5, before=builtin_frame)
+        
+        ambient_label = tk.Label(
+            ambient_frame,
+            text="专注背景：" if ambient.AVAILABLE else "专注背景（需 NumPy）：",
+            font=("微软雅黑", 10),
+            fg="#BDC3C7",
+            bg="#2C3E50"
+        )
+        ambient_label.pack(side="left")
+        
+        self.ambient_choices = {"无": ""}
+        self.ambient_choices.update((label, kind) for kind, label in ambient.AMBIENT_KINDS.items())
+        current_ambient = self.config.get("ambient", "")
+        self.ambient_var = tk.StringVar(value=ambient.AMBIENT_KINDS.get(current_ambient, "无"))
+        ambient_dropdown = ttk.Combobox(
+            ambient_frame,
+            textvariable=self.ambient_var,
+            values=list(self.ambient_choices),
+            state="readonly" if ambient.AVAILABLE else "disabled",
+            width=20,
+            font=("微软雅黑", 10)
+        )
+        ambient_dropdown.pack(side="left", padx=10)
+        ambient_dropdown.bind("<<ComboboxSelected>>", self.on_ambient_selected)
+        
         # ========== 控制按钮区域 ==========
         button_frame = tk.Frame(self.root, bg="#2C3E50")
         button_frame.pack(pady=20)
@@ -464,21 +759,64 @@ class PomodoroTimer:
         self.reset_btn.pack(side="left", padx=10)
         
         # ========== 音频后端状态 ==========
-        if AUDIO_BACKEND:
-            backend_text = f"音频引擎: {AUDIO_BACKEND}"
-            backend_color = "#27AE60"
-        else:
-            backend_text = "⚠ 未安装音频库 (pygame/playsound)"
-            backend_color = "#E74C3C"
-        
-        backend_label = tk.Label(
+        self.backend_label = tk.Label(
             self.root,
-            text=backend_text,
+            text="音频引擎: 加载中...",
             font=("微软雅黑", 9),
-            fg=backend_color,
+            fg="#95A5A6",
             bg="#2C3E50"
         )
-        backend_label.pack(side="bottom", pady=10)
+        self.backend_label.pack(side="bottom", pady=10)
+    
+    def start_audio_warmup(self):
+        """窗口显示后，在后台初始化音频后端并准备铃声"""
+        end_sound_path = self.get_current_end_sound_path()
+        threading.Thread(target=self._warm_up_audio, args=(end_sound_path,), daemon=True).start()
+    
+    def _warm_up_audio(self, end_sound_path):
+        """后台线程：初始化音频后端、生成内置铃声、预解码到内存"""
+        try:
+            phase_start = time.perf_counter()
+            name, sink_path = self._audio_choice
+            backend = init_audio_backend(name or self.config.get("audio_backend", "auto"),
+                                         sink_path or self.config.get("audio_sink_path") or None)
+            mixer_done = time.perf_counter()
+            
+            self.sound_generator.generate_all_sounds()
+            sounds_done = time.perf_counter()
+            
+            if backend is not None:
+                self.pcm_cache.decoder = backend.pcm_decoder()
+                sound_bank = SoundBank(self._load_sound, on_evict=self.pcm_cache.release)
+                sound_bank.preload(self._builtin_paths)
+                sound_bank.load(end_sound_path)
+                self.sound_bank = sound_bank
+            bank_done = time.perf_counter()
+            
+            if self.profile:
+                self.profile.record("音频后端初始化", mixer_done - phase_start)
+                self.profile.record("铃声准备", sounds_done - mixer_done)
+                self.profile.record("铃声预解码", bank_done - sounds_done)
+        except Exception as e:
+            print(f"音频准备失败: {e}")
+        finally:
+            self.audio_dispatcher.open()
+        
+        try:
+            self.root.after(0, self._on_audio_ready)
+        except (RuntimeError, tk.TclError):
+            pass  # 窗口已关闭
+    
+    def _on_audio_ready(self):
+        """音频就绪后更新后端状态显示"""
+        if AUDIO_BACKEND:
+            self.backend_label.config(text=f"音频引擎: {AUDIO_BACKEND.name}", fg="#27AE60")
+        else:
+            self.backend_label.config(text="⚠ 未安装音频库 (pygame/playsound)", fg="#E74C3C")
+        
+        self.update_ambient()
+        if self.profile:
+            print(self.profile.report())
     
     def validate_time_input(self, new_value):
         """验证时间输入"""
@@ -499,8 +837,37 @@ class PomodoroTimer:
     def on_interval_toggle(self):
         """间隔提醒开关切换"""
         self.config["interval_enabled"] = self.interval_enabled_var.get()
+        self.engine.interval_enabled = self.config["interval_enabled"]
+        self.save_config()
+    
+    def on_cycle_toggle(self):
+        """循环模式开关"""
+        self.config["cycle_enabled"] = self.cycle_enabled_var.get()
         self.save_config()
     
+    def build_plan(self, minutes):
+        """根据设置生成本次的阶段计划"""
+        if not self.config.get("cycle_enabled"):
+            return CyclePlan.single(minutes * 60)
+        return CyclePlan.build(
+            minutes * 60,
+            self.config.get("short_break_minutes", self.DEFAULT_SHORT_BREAK_MINUTES) * 60,
+            self.config.get("long_break_minutes", self.DEFAULT_LONG_BREAK_MINUTES) * 60,
+            max(1, self.config.get("cycle_count", self.DEFAULT_CYCLE_COUNT)),
+            self.config.get("long_break_every", self.DEFAULT_LONG_BREAK_EVERY)
+        )
+    
+    def load_reminder_pattern(self):
+        """配置中的非均匀提醒模式（interval_pattern），未设置或格式错误时返回 None"""
+        text = self.config.get("interval_pattern")
+        if not text:
+            return None
+        try:
+            return ReminderPattern.parse(text)
+        except ValueError as e:
+            print(f"提醒模式无效，改用固定间隔: {e}")
+            return None
+    
     def toggle_always_on_top(self):
         """切换窗口置顶状态"""
         is_top = self.always_on_top_var.get()
@@ -520,7 +887,36 @@ class PomodoroTimer:
                     self.config["selected_builtin_sound"] = i + 1
                     break
         
+        self.refresh_sound_bank()
+        self.save_config()
+    
+    def on_ambient_selected(self, event=None):
+        """背景音选择变更：正在专注时立即切换"""
+        self.config["ambient"] = self.ambient_choices.get(self.ambient_var.get(), "")
         self.save_config()
+        self.stop_ambient()
+        self.update_ambient()
+    
+    def update_ambient(self):
+        """专注阶段计时中播放背景音，暂停、休息或结束时停止"""
+        phase = self.engine.phase
+        kind = self.config.get("ambient")
+        wanted = (kind in ambient.AMBIENT_KINDS and AUDIO_BACKEND is not None
+                  and self.is_running and not self.is_paused
+                  and phase is not None and phase.kind == FOCUS)
+        if not wanted:
+            self.stop_ambient()
+            return
+        if self.ambient_player is None:
+            self.ambient_player = AUDIO_BACKEND.stream(
+                kind, self.config.get("ambient_volume", self.DEFAULT_AMBIENT_VOLUME))
+        if self.ambient_player is not None:
+            self.ambient_player.start()
+    
+    def stop_ambient(self):
+        if self.ambient_player is not None:
+            self.ambient_player.stop()
+            self.ambient_player = None
     
     def get_current_end_sound_path(self):
         """获取当前结束铃声路径"""
@@ -533,14 +929,48 @@ class PomodoroTimer:
                 if name == selected:
                     return path
         
-        return get_alarm_sound()
+        return sounds.get_alarm_sound()
+    
+    def _load_sound(self, path):
+        """
+        铃声库的解码函数
+        内置铃声直接加载；自定义铃声经转码缓存，能直接播放 PCM 的后端只做内存映射
+        """
+        if path in self._builtin_paths:
+            return AUDIO_BACKEND.load(path)
+        if self.pcm_cache.decoder is not None:
+            return AUDIO_BACKEND.load_pcm(self.pcm_cache.map(path))
+        return AUDIO_BACKEND.load(self.pcm_cache.playable_path(path))
+    
+    def refresh_sound_bank(self, reload=False):
+        """
+        预解码当前选择的结束铃声
+        已在铃声库中时直接刷新 LRU 顺序；否则在后台线程解码（自定义铃声可能需要转码），不阻塞界面
+        """
+        if self.sound_bank is None:
+            return
+        path = self.get_current_end_sound_path()
+        if not reload and path in self.sound_bank:
+            self.sound_bank.load(path)
+            return
+        threading.Thread(target=self.sound_bank.load, args=(path, reload), daemon=True).start()
+    
+    def _sound_available(self, sound_path):
+        """铃声是否可播放（已在内存中或文件存在）"""
+        if not sound_path:
+            return False
+        if sound_path in self._builtin_paths:
+            return True
+        if self.sound_bank is not None and sound_path in self.sound_bank:
+            return True
+        return os.path.exists(sound_path)
     
     def preview_sound(self):
         """试听当前选择的铃声"""
         sound_path = self.get_current_end_sound_path()
         
-        if sound_path and os.path.exists(sound_path):
-            threading.Thread(target=self._play_sound, args=(sound_path,), daemon=True).start()
+        if self._sound_available(sound_path):
+            self.audio_dispatcher.submit(sound_path, AudioDispatcher.PREVIEW)
         else:
             self.fallback_system_sound()
     
@@ -559,28 +989,74 @@ class PomodoroTimer:
             initialdir=os.path.expanduser("~\\Music")
         )
         
-        if filepath:
-            self.sound_path_var.set(filepath)
-            self.config["sound_path"] = filepath
+        if not filepath:
+            return
+        
+        # 先检查文件头，无法识别的文件在选择时就报错
+        try:
+            pcm_cache.probe_format(filepath)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("铃声文件无效", str(e))
+            return
+        
+        previous = self.config.get("sound_path", "")
+        self.sound_path_var.set(filepath)
+        self.config["sound_path"] = filepath
+        self.save_config()
+        self._show_custom_sound(filepath, "转码中…")
+        threading.Thread(target=self._prepare_custom_sound, args=(filepath, previous),
+                         daemon=True).start()
+    
+    def _prepare_custom_sound(self, filepath, previous):
+        """后台线程：转码并探测自定义铃声，随后预载到铃声库"""
+        try:
+            if AUDIO_BACKEND is not None:
+                AUDIO_BACKEND.check_format(filepath)  # winsound / wav-sink 只能播放 WAV
+            if self.pcm_cache.decoder is None and pcm_cache.probe_format(filepath) != "wav":
+                info = None  # 音频后端尚未就绪，首次加载时再转码
+            else:
+                info = self.pcm_cache.ensure(filepath)
+                if self.sound_bank is not None:
+                    self.sound_bank.load(filepath, reload=True)
+        except (OSError, ValueError) as e:
+            self._ui(self._reject_custom_sound, filepath, previous, str(e))
+            return
+        self._ui(self._show_custom_sound, filepath, pcm_cache.describe(info) if info else "")
+    
+    def _show_custom_sound(self, filepath, detail=""):
+        """在自定义文件栏显示文件名和探测信息"""
+        if self.config.get("sound_path") != filepath:
+            return
+        text = os.path.basename(filepath)
+        if detail:
+            text += f"（{detail}）"
+        self.sound_entry.config(state="normal")
+        self.sound_entry.delete(0, tk.END)
+        self.sound_entry.insert(0, text)
+        self.sound_entry.config(state="readonly")
+    
+    def _reject_custom_sound(self, filepath, previous, error):
+        """转码失败：恢复之前的铃声并提示"""
+        if self.config.get("sound_path") == filepath:
+            self.sound_path_var.set(previous)
+            self.config["sound_path"] = previous
             self.save_config()
-            
-            sound_name = os.path.basename(filepath)
-            self.sound_entry.config(state="normal")
-            self.sound_entry.delete(0, tk.END)
-            self.sound_entry.insert(0, sound_name)
-            self.sound_entry.config(state="readonly")
+            self._show_custom_sound(previous)
+        messagebox.showerror("铃声文件无效", error)
     
     def update_timer_display(self, seconds):
-        """更新计时器显示"""
+        """更新计时器显示（可在任意线程调用，由渲染层合并后重绘）"""
         minutes = seconds // 60
         secs = seconds % 60
         time_str = f"{minutes:02d}:{secs:02d}"
-        self.timer_label.config(text=time_str)
-        self.root.title(f"🍅 {time_str} - Pomodoro Timer")
+        frame = {"time": time_str, "title": f"🍅 {time_str} - Pomodoro Timer"}
         
         if self.total_seconds > 0:
-            progress = ((self.total_seconds - seconds) / self.total_seconds) * 100
-            self.progress["value"] = progress
+            # 按进度条像素宽度量化，看不出差别的进度变化不触发重绘
+            steps = self.PROGRESS_STEPS
+            done = round((self.total_seconds - seconds) * steps / self.total_seconds)
+            frame["progress"] = done * 100 / steps
+        self.renderer.submit(**frame)
     
     def start_timer(self):
         """开始或暂停计时器"""
@@ -592,101 +1068,166 @@ class PomodoroTimer:
                     return
                 
                 self.config["default_minutes"] = minutes
+                interval_seconds = 0
                 try:
                     interval = int(self.interval_entry.get())
                     self.config["interval_minutes"] = interval
+                    interval_seconds = max(0, interval) * 60
                 except ValueError:
                     pass
                 self.save_config()
                 
-                self.remaining_seconds = minutes * 60
-                self.total_seconds = minutes * 60
-                self.last_interval_time = self.total_seconds
-                self.is_running = True
-                self.is_paused = False
-                self.stop_event.clear()
+                self.engine.start(interval_seconds=interval_seconds, plan=self.build_plan(minutes),
+                                  reminder_pattern=self.load_reminder_pattern())
+                self.session_started_at = time.time()
                 
                 self.start_btn.config(text="⏸ 暂停", bg="#F39C12")
-                self.status_label.config(text="计时中...", fg="#E74C3C")
+                self.status_label.config(**self._running_status())
                 self.time_entry.config(state="disabled")
                 self.interval_entry.config(state="disabled")
                 
-                self.timer_thread = threading.Thread(target=self.run_timer, daemon=True)
-                self.timer_thread.start()
+                self._drive_engine()
+                self.update_ambient()
                 
             except ValueError:
                 messagebox.showwarning("输入错误", "请输入有效的分钟数！")
         
         elif self.is_paused:
-            self.is_paused = False
+            self.engine.resume()
+            if self.timer_thread is None:
+                self._schedule_tick()
             self.start_btn.config(text="⏸ 暂停", bg="#F39C12")
-            self.status_label.config(text="计时中...", fg="#E74C3C")
+            self.status_label.config(**self._running_status())
+            self.update_ambient()
         
         else:
-            self.is_paused = True
+            self.engine.pause()
+            self._cancel_tick()
             self.start_btn.config(text="▶ 继续", bg="#27AE60")
             self.status_label.config(text="已暂停", fg="#F39C12")
+            self.update_ambient()
     
-    def run_timer(self):
-        """计时器线程函数"""
-        while self.remaining_seconds > 0 and not self.stop_event.is_set():
-            if not self.is_paused:
-                time.sleep(1)
-                if self.stop_event.is_set():
-                    break
-                if not self.is_paused:
-                    self.remaining_seconds -= 1
-                    self.root.after(0, self.update_timer_display, self.remaining_seconds)
-                    
-                    if self.interval_enabled_var.get():
-                        self.check_interval_reminder()
-            else:
-                time.sleep(0.1)
-        
-        if self.remaining_seconds <= 0 and not self.stop_event.is_set():
-            self.root.after(0, self.timer_complete)
+    def _drive_engine(self):
+        """按配置的计时模式驱动引擎：后台线程或 Tk 事件循环"""
+        self.timer_thread = None
+        if self.config.get("timer_mode") == "thread":
+            self.timer_thread = threading.Thread(target=self.engine.run, daemon=True)
+            self.timer_thread.start()
+        else:
+            self._schedule_tick()
+    
+    def resume_session(self):
+        """
+        恢复崩溃或重启前未结束的会话
+        错过的阶段切换和完成由恢复后的第一次 tick 补发
+        """
+        if not self.config.get("resume_session", True):
+            self.checkpoint.clear()
+            return
+        checkpoint = self.checkpoint.resume()
+        if checkpoint is None:
+            return
+        self.session_started_at = checkpoint.session_start
+        self.update_timer_display(self.remaining_seconds)
+        self.time_entry.config(state="disabled")
+        self.interval_entry.config(state="disabled")
+        if self.is_paused:
+            self.start_btn.config(text="▶ 继续", bg="#27AE60")
+            self.status_label.config(text="已暂停", fg="#F39C12")
+        else:
+            self.start_btn.config(text="⏸ 暂停", bg="#F39C12")
+            self.status_label.config(**self._running_status())
+        self._drive_engine()
+    
+    def _schedule_tick(self):
+        """在 Tk 事件循环中预约下一个整秒边界的 tick"""
+        delay = self.engine.next_delay()
+        if delay is not None:
+            self.tick_job = self._after(max(1, math.ceil(delay * 1000)), self._on_tick)
+    
+    def _cancel_tick(self):
+        """取消已预约的 tick（暂停期间不产生任何唤醒）"""
+        if self.tick_job is not None:
+            self.root.after_cancel(self.tick_job)
+            self.tick_job = None
+    
+    def _on_tick(self):
+        """Tk 事件循环计时模式的 tick 处理"""
+        self.tick_job = None
+        self.engine.tick()
+        self._schedule_tick()
+    
+    def _on_reminder(self, elapsed_min):
+        """间隔提醒：播放叮声并在状态栏短暂提示"""
+        self.audio_dispatcher.submit(sounds.get_ding_sound(), AudioDispatcher.REMINDER)
+        self._ui(self._show_reminder_status, elapsed_min)
     
-    def check_interval_reminder(self):
-        """检查并播放间隔提醒"""
+    def _show_reminder_status(self, elapsed_min):
+        """状态栏显示已专注时长，1.5 秒后恢复"""
+        self._flash_status(f"已专注 {elapsed_min} 分钟 🔔")
+    
+    def _flash_status(self, text):
+        """状态栏短暂显示一条提示，1.5 秒后恢复计时状态"""
+        self.status_label.config(text=text, fg="#3498DB")
+        self.root.after(1500, lambda: self.status_label.config(
+            **self._running_status()
+        ) if self.is_running and not self.is_paused else None)
+    
+    def _running_status(self):
+        """计时中的状态栏文字和颜色（循环模式下显示当前阶段）"""
+        phase = self.engine.phase
+        plan = self.engine.plan
+        if phase is None or len(plan) == 1:
+            return {"text": "计时中...", "fg": "#E74C3C"}
+        label = f"{PHASE_LABELS[phase.kind]} {phase.cycle}/{plan.cycles}"
+        if phase.kind == FOCUS:
+            return {"text": f"{label} 计时中...", "fg": "#E74C3C"}
+        return {"text": f"☕ {label}", "fg": "#27AE60" if phase.kind == LONG_BREAK else "#3498DB"}
+    
+    def _phase_sound_path(self, phase):
+        """阶段开始时播放的内置铃声；phase 为 None 表示计划结束，使用结束铃声"""
+        if phase is None:
+            return self.get_current_end_sound_path()
+        name = self.config.get("phase_sounds", DEFAULT_PHASE_SOUNDS).get(phase.kind)
         try:
-            interval_minutes = int(self.interval_entry.get())
-            if interval_minutes <= 0:
-                return
-            
-            interval_seconds = interval_minutes * 60
-            elapsed_since_last = self.last_interval_time - self.remaining_seconds
-            
-            if elapsed_since_last >= interval_seconds and self.remaining_seconds > 0:
-                ding_path = get_ding_sound()
-                threading.Thread(target=self._play_sound, args=(ding_path,), daemon=True).start()
-                self.last_interval_time = self.remaining_seconds
-                
-                elapsed_total = self.total_seconds - self.remaining_seconds
-                elapsed_min = elapsed_total // 60
-                self.root.after(0, lambda: self.status_label.config(
-                    text=f"已专注 {elapsed_min} 分钟 🔔", 
-                    fg="#3498DB"
-                ))
-                self.root.after(1500, lambda: self.status_label.config(
-                    text="计时中...", 
-                    fg="#E74C3C"
-                ) if self.is_running and not self.is_paused else None)
-                
-        except ValueError:
-            pass
+            return sounds.get_builtin_sound(name) if name else None
+        except KeyError:
+            return None
+    
+    def _on_prearm(self, upcoming):
+        """阶段边界前预先解码下一段的提示音，边界到达时直接播放"""
+        path = self._phase_sound_path(upcoming)
+        if not path or self.sound_bank is None or path in self.sound_bank:
+            return
+        threading.Thread(target=self.sound_bank.load, args=(path,), daemon=True).start()
+    
+    def _on_phase(self, phase, summary):
+        """进入新阶段：记录刚结束的专注、播放阶段提示音、更新状态栏"""
+        if summary["kind"] == FOCUS:
+            self.record_session(completed=True, summary=summary)
+            self.completed_count += 1
+            self.count_label.config(text=f"今日专注: {self.completed_count}")
+        if phase.kind == FOCUS:
+            self.session_started_at = time.time()
+        
+        path = self._phase_sound_path(phase)
+        if self._sound_available(path):
+            self.audio_dispatcher.submit(path, AudioDispatcher.ALARM)
+        if not self.is_paused:
+            self.status_label.config(**self._running_status())
+        self.update_ambient()
     
     def timer_complete(self):
         """计时完成处理"""
-        self.is_running = False
-        self.is_paused = False
-        
+        self.stop_ambient()
         self.start_btn.config(text="▶ 开始", bg="#27AE60")
         self.status_label.config(text="🎉 时间到！", fg="#27AE60")
         self.time_entry.config(state="normal")
         self.interval_entry.config(state="normal")
-        self.progress["value"] = 100
+        self.renderer.submit(progress=100)
         
         self.play_notification_sound()
+        self.record_session(completed=True)
         
         # 更新专注次数
         self.completed_count += 1
@@ -701,69 +1242,324 @@ class PomodoroTimer:
     
     def _play_sound(self, sound_path):
         """播放音频文件"""
-        if not sound_path or not os.path.exists(sound_path):
+        if not self._sound_available(sound_path):
             return
         
-        if AUDIO_BACKEND == "pygame":
-            try:
-                sound = pygame.mixer.Sound(sound_path)
-                sound.play()
-            except Exception as e:
-                print(f"pygame播放失败: {e}")
-        
-        elif AUDIO_BACKEND == "playsound":
-            try:
-                playsound(sound_path)
-            except Exception as e:
-                print(f"playsound播放失败: {e}")
+        if AUDIO_BACKEND is None or self.sound_bank is None:
+            return
+        try:
+            sound = self.sound_bank.get(sound_path)
+            if sound is not None:
+                self._record_play_latency()
+                AUDIO_BACKEND.play(sound)
+        except Exception as e:
+            print(f"{AUDIO_BACKEND.name}播放失败: {e}")
+    
+    def _record_play_latency(self):
+        """记录从播放请求到实际开始播放的延迟"""
+        age = self.audio_dispatcher.request_age()
+        if age is not None:
+            self._play_latency.record(age)
     
     def play_notification_sound(self):
         """播放结束提示铃声"""
         sound_path = self.get_current_end_sound_path()
         
-        if sound_path and os.path.exists(sound_path):
-            threading.Thread(target=self._play_sound, args=(sound_path,), daemon=True).start()
+        if self._sound_available(sound_path):
+            self.audio_dispatcher.submit(sound_path, AudioDispatcher.ALARM)
         else:
             self.fallback_system_sound()
     
     def fallback_system_sound(self):
-        """使用Windows系统提示音"""
+        """铃声不可用时使用系统提示音"""
+        if AUDIO_BACKEND is not None:
+            AUDIO_BACKEND.beep()
+        else:
+            system_beep()
+    
+    def show_stats(self):
+        """打开专注统计窗口（直接读取增量汇总，无需扫描历史）"""
+        if self.stats_index is None:
+            messagebox.showinfo("专注统计", "专注历史不可用")
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title("📊 专注统计")
+        window.configure(bg="#2C3E50")
+        window.resizable(False, False)
+        
+        tk.Label(
+            window,
+            text="\n".join(summary_lines(self.stats_index.stats)),
+            font=("微软雅黑", 10),
+            fg="#ECF0F1",
+            bg="#2C3E50",
+            justify="left",
+            padx=20,
+            pady=15
+        ).pack()
+    
+    # 多计时器列表最多显示的行数（按剩余时间取最早结束的若干个）
+    TIMER_VIEW_ROWS = 200
+    TIMER_STATE_LABELS = {RUNNING: "计时中", PAUSED: "已暂停", FINISHED: "已结束"}
+    
+    def show_timers(self):
+        """打开多计时器列表窗口"""
+        if self.timers_window is not None and self.timers_window.winfo_exists():
+            self.timers_window.lift()
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title("⏱ 多计时器")
+        window.configure(bg="#2C3E50")
+        window.resizable(False, False)
+        self.timers_window = window
+        
+        add_frame = tk.Frame(window, bg="#2C3E50")
+        add_frame.pack(padx=15, pady=(12, 6), fill="x")
+        
+        tk.Label(add_frame, text="名称", font=("微软雅黑", 10), fg="#ECF0F1",
+                 bg="#2C3E50").pack(side="left")
+        name_entry = tk.Entry(add_frame, font=("微软雅黑", 10), width=14)
+        name_entry.pack(side="left", padx=5)
+        tk.Label(add_frame, text="分钟", font=("微软雅黑", 10), fg="#ECF0F1",
+                 bg="#2C3E50").pack(side="left")
+        minutes_entry = tk.Entry(add_frame, font=("Consolas", 11), width=5, justify="center")
+        minutes_entry.pack(side="left", padx=5)
+        
+        def add_timer():
+            name = name_entry.get().strip()
+            try:
+                minutes = float(minutes_entry.get())
+            except ValueError:
+                minutes = 0
+            if not name or minutes <= 0:
+                messagebox.showwarning("输入错误", "请输入名称和大于0的分钟数！", parent=window)
+                return
+            self.timer_manager.add(name, minutes * 60)
+            self.timer_manager.start()
+            name_entry.delete(0, tk.END)
+            refresh()
+        
+        tk.Button(add_frame, text="添加", font=("微软雅黑", 9), bg="#27AE60", fg="white",
+                  relief="flat", cursor="hand2", command=add_timer).pack(side="left", padx=(5, 0))
+        
+        tree = ttk.Treeview(window, columns=("remaining", "state"), height=10)
+        tree.heading("#0", text="名称")
+        tree.heading("remaining", text="剩余")
+        tree.heading("state", text="状态")
+        tree.column("#0", width=180)
+        tree.column("remaining", width=90, anchor="center")
+        tree.column("state", width=80, anchor="center")
+        tree.pack(padx=15, pady=6)
+        
+        def selected_names():
+            return list(tree.selection())
+        
+        def toggle_selected():
+            for name in selected_names():
+                timer = self.timer_manager.get(name)
+                if timer is None:
+                    continue
+                if timer.state == RUNNING:
+                    self.timer_manager.pause(name)
+                elif timer.state == PAUSED:
+                    self.timer_manager.resume(name)
+                else:
+                    self.timer_manager.restart(name)
+            refresh()
+        
+        def remove_selected():
+            for name in selected_names():
+                self.timer_manager.remove(name)
+            refresh()
+        
+        button_frame = tk.Frame(window, bg="#2C3E50")
+        button_frame.pack(padx=15, pady=(0, 12), fill="x")
+        for text, color, command in (("⏯ 暂停/继续", "#F39C12", toggle_selected),
+                                     ("🗑 删除", "#E74C3C", remove_selected)):
+            tk.Button(button_frame, text=text, font=("微软雅黑", 9), bg=color, fg="white",
+                      relief="flat", cursor="hand2", command=command).pack(side="left", padx=(0, 8))
+        count_label = tk.Label(button_frame, font=("微软雅黑", 9), fg="#95A5A6", bg="#2C3E50")
+        count_label.pack(side="right")
+        
+        shown = {}
+        
+        def refresh():
+            """按快照差异更新列表，只改动变化的行"""
+            if not window.winfo_exists():
+                return
+            rows = self.timer_manager.snapshot(limit=self.TIMER_VIEW_ROWS)
+            names = set()
+            for index, (name, remaining, state) in enumerate(rows):
+                names.add(name)
+                minutes, secs = divmod(math.ceil(remaining), 60)
+                values = (f"{minutes:02d}:{secs:02d}", self.TIMER_STATE_LABELS.get(state, state))
+                if name not in shown:
+                    tree.insert("", index, iid=name, text=name, values=values)
+                elif shown[name] != values:
+                    tree.item(name, values=values)
+                shown[name] = values
+                if tree.index(name) != index:
+                    tree.move(name, "", index)
+            for name in [name for name in shown if name not in names]:
+                tree.delete(name)
+                del shown[name]
+            total = len(self.timer_manager)
+            count_label.config(text=f"共 {total} 个" + (f"，显示前 {len(rows)} 个" if total > len(rows) else ""))
+        
+        def refresh_loop():
+            if window.winfo_exists():
+                refresh()
+                window.after(1000, refresh_loop)
+        
+        refresh_loop()
+    
+    def _on_named_timer_expire(self, timer):
+        """命名计时器到期：播放叮声提醒（多个同时到期时由调度器合并）"""
+        self.audio_dispatcher.submit(sounds.get_ding_sound(), AudioDispatcher.REMINDER)
+        self._ui(self._flash_status, f"⏱ {timer.name} 时间到")
+    
+    # ---------- 本地控制接口 ----------
+    
+    def start_control_server(self, port=None):
+        """
+        按配置启动本地控制接口
+        port: 命令行指定的端口，优先于配置中的 control_port；两者都为 0 且未配置
+        Unix 域套接字时不启动
+        """
+        port = port or self.config.get("control_port", 0) or None
+        socket_path = self.config.get("control_socket") or None
+        if port is None and socket_path is None:
+            return
+        
+        # 按需导入，未开启控制接口时不加载 asyncio
+        from control import ControlServer
+        
+        def command(action):
+            return lambda: self._call_in_ui(action)
+        
+        # 状态读取 Tk 拥有的数据，与命令一样转交界面线程
+        server = ControlServer(command(lambda: None), {
+            "start": command(lambda: None if self.is_running else self.start_timer()),
+            "pause": command(lambda: self.start_timer() if self.is_running and not self.is_paused else None),
+            "resume": command(lambda: self.start_timer() if self.is_paused else None),
+            "toggle": command(self.start_timer),
+            "reset": command(self.reset_timer),
+        }, port=port, socket_path=socket_path, token_path=get_control_token_path())
+        try:
+            server.start()
+        except OSError as e:
+            print(f"本地控制接口启动失败: {e}")
+            return
+        
+        for event in ("state", "tick", "reminder", "complete"):
+            self.engine.subscribe(event, lambda *args, event=event: server.publish(
+                event, args[0] if args else None))
+        self.engine.subscribe("phase", lambda phase, summary: server.publish(
+            "phase", {"kind": phase.kind, "cycle": phase.cycle,
+                      "seconds": phase.end - phase.start}))
+        self.control_server = server
+        if server.address:
+            print(f"本地控制接口: http://{server.address[0]}:{server.address[1]}")
+        if socket_path:
+            print(f"本地控制接口: {socket_path}")
+        print(f"控制令牌已写入 {get_control_token_path()}（请求头 X-Pomodoro-Token）")
+    
+    def _call_in_ui(self, action):
+        """把控制命令转交 Tk 线程执行，返回结果为状态字典的 Future"""
+        import concurrent.futures
+        future = concurrent.futures.Future()
+        
+        def run():
+            try:
+                action()
+                future.set_result(self.control_status())
+            except Exception as e:
+                future.set_exception(e)
+        
+        self.root.after(0, run)
+        return future
+    
+    def control_status(self):
+        """控制接口返回的状态"""
+        phase = self.engine.phase
+        return {
+            "state": self.engine.state,
+            "remaining_seconds": self.remaining_seconds,
+            "total_seconds": self.total_seconds,
+            "phase": phase.kind if phase else None,
+            "cycle": phase.cycle if phase else None,
+            "cycles": self.engine.plan.cycles if self.engine.plan else None,
+            "completed_today": self.completed_count,
+        }
+    
+    def record_session(self, completed, summary=None):
+        """
+        把专注会话写入专注历史并更新统计
+        summary: 计时引擎的 phase_summary()，默认取当前阶段；休息阶段不记录
+        """
+        summary = summary or self.engine.phase_summary()
+        if self.stats_index is None or self.session_started_at is None or summary["kind"] != FOCUS:
+            return
+        
+        selected = self.selected_sound_var.get()
+        if selected == "自定义...":
+            selected = os.path.basename(self.sound_path_var.get())
+        
         try:
-            import winsound
-            winsound.MessageBeep(winsound.MB_ICONEXCLAMATION)
+            self.stats_index.record(SessionRecord(
+                start=self.session_started_at,
+                end=time.time(),
+                planned_seconds=summary["planned_seconds"],
+                focused_seconds=summary["focused_seconds"],
+                pauses=summary["pauses"],
+                reminders=summary["reminders"],
+                completed=completed,
+                tag=self.tag_var.get().strip(),
+                sound=selected
+            ))
         except Exception as e:
-            print(f"系统提示音播放失败: {e}")
+            print(f"保存专注历史失败: {e}")
+        self.session_started_at = None
     
     def reset_timer(self):
         """重置计时器"""
-        self.stop_event.set()
-        self.is_running = False
-        self.is_paused = False
-        
-        if self.timer_thread and self.timer_thread.is_alive():
-            self.timer_thread.join(timeout=1)
+        if self.is_running:
+            self.record_session(completed=False)
+        self._cancel_tick()
+        self.stop_ambient()
         
         try:
             minutes = int(self.time_entry.get()) if self.time_entry.get() else self.config.get("default_minutes", 25)
         except ValueError:
             minutes = self.config.get("default_minutes", 25)
         
-        self.remaining_seconds = minutes * 60
-        self.total_seconds = minutes * 60
+        # 重置会立即唤醒计时线程使其退出，无需等待
+        self.engine.reset(total_seconds=minutes * 60)
+        self.timer_thread = None
         self.update_timer_display(self.remaining_seconds)
         
         self.start_btn.config(text="▶ 开始", bg="#27AE60")
         self.status_label.config(text="准备就绪", fg="#95A5A6")
         self.time_entry.config(state="normal")
         self.interval_entry.config(state="normal")
-        self.progress["value"] = 0
-        self.root.title("🍅 番茄钟 - Pomodoro Timer")
+        self.renderer.submit(progress=0, title="🍅 番茄钟 - Pomodoro Timer")
     
     def on_closing(self):
-        """窗口关闭处理"""
-        self.stop_event.set()
-        if self.timer_thread and self.timer_thread.is_alive():
-            self.timer_thread.join(timeout=1)
+        """
+        窗口关闭处理
+        计时中关闭时把会话检查点存为暂停，下次启动从剩余时间继续
+        （关闭期间不计时；resume_session 为 false 时记为中止）
+        """
+        if self.is_running:
+            if self.config.get("resume_session", True):
+                self.checkpoint.suspend()
+            else:
+                self.record_session(completed=False)
+        self._cancel_tick()
+        self.stop_ambient()
+        self.engine.reset()
         
         try:
             minutes = int(self.time_entry.get())
@@ -778,13 +1574,225 @@ class PomodoroTimer:
             pass
         
         self.config["interval_enabled"] = self.interval_enabled_var.get()
-        self.save_config()
-        
+        self.config["session_tag"] = self.tag_var.get().strip()
+        self.config_store.close()
+        if self.stats_index is not None:
+            self.stats_index.close()
+        
+        self.audio_dispatcher.stop()
+        self.timer_manager.stop()
+        self.pcm_cache.clear()
+        if AUDIO_BACKEND is not None:
+            AUDIO_BACKEND.close()
+        if self.metrics_file:
+            metrics.REGISTRY.write(self.metrics_file)
+        if self.control_server is not None:
+            self.control_server.stop()
+        if self.profile:
+            render = self.renderer.metrics()
+            print(f"渲染统计: 提交 {render['scheduled']} 帧，合并 {render['coalesced']} 帧，"
+                  f"绘制 {render['painted']} 帧，部件更新 {render['widget_updates']} 次")
         self.root.destroy()
 
 
-def main():
+def _play_blocking(sound_path):
+    """命令行模式下播放铃声并等待播放结束"""
+    if AUDIO_BACKEND is not None:
+        AUDIO_BACKEND.play_blocking(AUDIO_BACKEND.load(sound_path))
+
+
+def run_headless(minutes, interval_minutes=0, play_sound=False, record=True, cycles=0,
+                 short_break=PomodoroTimer.DEFAULT_SHORT_BREAK_MINUTES,
+                 long_break=PomodoroTimer.DEFAULT_LONG_BREAK_MINUTES, reminder_pattern=None,
+                 ambient_kind=None, audio_backend="auto", audio_sink=None, tag=""):
+    """
+    无界面运行一次番茄钟（不导入 tkinter）
+    cycles 大于 0 时按循环计划运行（专注之间插入短休息/长休息）
+    reminder_pattern: reminders.ReminderPattern，给出时代替 interval_minutes
+    ambient_kind: 专注阶段播放的背景音（需 play_sound 且后端支持流式播放）
+    audio_backend / audio_sink: 音频后端名称与 wav-sink 输出文件
+    tag: 写入专注历史的会话标签
+    在终端显示倒计时，Ctrl+C 中止；返回进程退出码
+    """
+    engine = TimerEngine()
+    interactive = sys.stdout.isatty()
+    if cycles > 0:
+        plan = CyclePlan.build(minutes * 60, short_break * 60, long_break * 60, cycles,
+                               PomodoroTimer.DEFAULT_LONG_BREAK_EVERY)
+    else:
+        plan = CyclePlan.single(minutes * 60)
+    
+    ding_path = alarm_path = None
+    phase_paths = {}
+    if play_sound and init_audio_backend(audio_backend, audio_sink):
+        import sounds as _sounds
+        ding_path = _sounds.get_ding_sound()
+        alarm_path = _sounds.get_alarm_sound()
+        phase_paths = {kind: _sounds.get_builtin_sound(name)
+                       for kind, name in DEFAULT_PHASE_SOUNDS.items()}
+    
+    ambient_player = None
+    if ambient_kind and AUDIO_BACKEND is not None:
+        ambient_player = AUDIO_BACKEND.stream(ambient_kind, PomodoroTimer.DEFAULT_AMBIENT_VOLUME)
+    if ambient_kind and ambient_player is None:
+        print("背景音需要 --sound、NumPy 和支持流式播放的音频后端（pygame），已忽略")
+    
+    def on_tick(remaining):
+        if interactive:
+            mins, secs = divmod(remaining, 60)
+            print(f"\r⏳ {mins:02d}:{secs:02d}", end="", flush=True)
+    
+    def on_reminder(elapsed_min):
+        print(f"\r🔔 已专注 {elapsed_min} 分钟" + " " * 8, flush=True)
+        if ding_path:
+            threading.Thread(target=_play_blocking, args=(ding_path,), daemon=True).start()
+    
+    stats_index = None
+    if record:
+        try:
+            stats_index = StatsIndex(SessionLog(get_history_path()), get_stats_path())
+        except (OSError, ValueError) as e:
+            print(f"专注历史不可用: {e}")
+    
+    session = {"started_at": time.time()}
+    
+    def record_focus(summary, completed):
+        if stats_index is None or summary["kind"] != FOCUS:
+            return
+        stats_index.record(SessionRecord(
+            start=session["started_at"],
+            end=time.time(),
+            planned_seconds=summary["planned_seconds"],
+            focused_seconds=summary["focused_seconds"],
+            pauses=summary["pauses"],
+            reminders=summary["reminders"],
+            completed=completed,
+            tag=tag,
+            sound="",
+        ))
+    
+    def on_phase(phase, summary):
+        record_focus(summary, True)
+        session["started_at"] = time.time()
+        label = PHASE_LABELS[phase.kind]
+        print(f"\r▶ 第 {phase.cycle}/{plan.cycles} 轮 {label}（{(phase.end - phase.start) // 60} 分钟）"
+              + " " * 8, flush=True)
+        path = phase_paths.get(phase.kind)
+        if path:
+            threading.Thread(target=_play_blocking, args=(path,), daemon=True).start()
+        if ambient_player is not None:
+            if phase.kind == FOCUS:
+                ambient_player.start()
+            else:
+                ambient_player.stop()
+    
+    engine.subscribe("tick", on_tick)
+    engine.subscribe("reminder", on_reminder)
+    engine.subscribe("phase", on_phase)
+    
+    engine.start(interval_seconds=max(0, interval_minutes) * 60, plan=plan,
+                 reminder_pattern=reminder_pattern)
+    if len(plan) > 1:
+        print(f"🍅 开始 {plan.cycles} 轮循环，每轮专注 {minutes} 分钟（Ctrl+C 中止）")
+    else:
+        print(f"🍅 开始专注 {minutes} 分钟（Ctrl+C 中止）")
+    if ambient_player is not None:
+        ambient_player.start()
+    try:
+        state = engine.run()
+    except KeyboardInterrupt:
+        engine.reset()
+        state = None
+    finally:
+        if ambient_player is not None:
+            ambient_player.stop()
+    
+    completed = state == FINISHED
+    record_focus(engine.phase_summary(), completed)
+    if stats_index is not None:
+        stats_index.close()
+    
+    try:
+        if not completed:
+            print("\n已中止")
+            return 130
+        print("\r🎉 时间到！休息一下吧！" + " " * 8)
+        if alarm_path:
+            _play_blocking(alarm_path)
+        return 0
+    finally:
+        if AUDIO_BACKEND is not None:
+            AUDIO_BACKEND.close()
+
+
+def main(argv=None):
     """主函数"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="番茄钟 - Pomodoro Timer")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="输出启动耗时分析（导入、音频初始化、铃声准备、界面构建）")
+    parser.add_argument("--control-port", type=int, default=None,
+                        help="在本机指定端口开启控制接口（覆盖配置中的 control_port）")
+    parser.add_argument("--metrics-file", default=None,
+                        help="启用运行指标并写出到该文件（.json 为 JSON 快照，其余为 Prometheus 文本格式）")
+    parser.add_argument("--audio-backend", default=None, choices=BACKEND_NAMES,
+                        help="音频后端（覆盖配置中的 audio_backend）；null 只记录播放请求，"
+                             "wav-sink 把所有播放混音写入 WAV 文件")
+    parser.add_argument("--audio-sink", default=None,
+                        help="wav-sink 后端的输出文件（默认 pomodoro_sink.wav）")
+    parser.add_argument("--headless", action="store_true",
+                        help="无界面模式：在终端中运行一次番茄钟")
+    parser.add_argument("--minutes", type=int, default=25,
+                        help="无界面模式的专注时长（分钟，默认 25）")
+    parser.add_argument("--interval", type=int, default=0,
+                        help="无界面模式的间隔提醒（分钟，0 表示不提醒）")
+    parser.add_argument("--interval-pattern", default=None,
+                        help='无界面模式的非均匀提醒模式，如 "5, 2@10"（每 5 分钟，最后 10 分钟每 2 分钟）')
+    parser.add_argument("--sound", action="store_true",
+                        help="无界面模式下播放提醒和结束铃声")
+    parser.add_argument("--tag", default="",
+                        help="会话标签（写入专注历史，统计中按标签汇总）")
+    parser.add_argument("--ambient", default=None, choices=["brown", "pink", "binaural", "rain"],
+                        help="无界面模式下专注阶段播放的背景音（需同时指定 --sound）")
+    parser.add_argument("--cycles", type=int, default=0,
+                        help="无界面模式的循环轮数（0 表示只专注一次）")
+    parser.add_argument("--short-break", type=int, default=PomodoroTimer.DEFAULT_SHORT_BREAK_MINUTES,
+                        help="循环模式的短休息时长（分钟）")
+    parser.add_argument("--long-break", type=int, default=PomodoroTimer.DEFAULT_LONG_BREAK_MINUTES,
+                        help="循环模式的长休息时长（分钟）")
+    args = parser.parse_args(argv)
+    
+    if args.metrics_file:
+        metrics.enable()
+    
+    if args.headless:
+        if args.minutes <= 0:
+            parser.error("--minutes 必须大于 0")
+        pattern = None
+        if args.interval_pattern:
+            try:
+                pattern = ReminderPattern.parse(args.interval_pattern)
+            except ValueError as e:
+                parser.error(str(e))
+        try:
+            return run_headless(args.minutes, args.interval, play_sound=args.sound,
+                                cycles=args.cycles, short_break=args.short_break,
+                                long_break=args.long_break, reminder_pattern=pattern,
+                                ambient_kind=args.ambient,
+                                audio_backend=args.audio_backend or "auto",
+                                audio_sink=args.audio_sink, tag=args.tag)
+        finally:
+            if args.metrics_file:
+                metrics.REGISTRY.write(args.metrics_file)
+    
+    import_gui_modules()
+    
+    profile = None
+    if args.profile_startup:
+        profile = StartupProfile()
+        profile.record("模块导入", time.perf_counter() - _MODULE_LOAD_START)
+    
     root = tk.Tk()
     
     # 设置DPI感知
@@ -794,9 +1802,23 @@ def main():
     except Exception:
         pass
     
-    app = PomodoroTimer(root)
+    app = PomodoroTimer(root, profile=profile, control_port=args.control_port,
+                        metrics_file=args.metrics_file, audio_backend=args.audio_backend,
+                        audio_sink=args.audio_sink)
+    
+    def on_first_frame():
+        if profile:
+            profile.record("首帧时间（自导入起）", time.perf_counter() - _MODULE_LOAD_START)
+        app.start_audio_warmup()
+    
+    # 窗口首次绘制后再准备音频
+    root.after_idle(on_first_frame)
     root.mainloop()
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    # 打包后的程序中，铃声合成进程池的子进程从这里进入
+    import multiprocessing
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,246 @@
+"""
+声音配方模块
+============
+用 JSON 或 TOML 文件描述提示音（音符、泛音、包络、时长），无需修改 Python 代码即可添加铃声。
+
+功能：
+- 配方目录中的每个 .json / .toml 文件定义一个铃声（或在 "recipes" 表中定义多个）
+- 编译时校验并展开为规范形式：音名换算为频率、泛音按基频展开、补全默认包络，
+  得到 synth 后端 voices 方法的参数；规范形式的哈希即缓存键，
+  只改动格式或键顺序不会触发重新合成
+- 编译结果按文件 (修改时间, 大小) 缓存，未变化的文件不再解析
+- 无法解析或不合法的配方打印原因后跳过，不影响其他铃声
+
+配方格式（JSON）：
+    {
+      "label": "🎹 上行琶音",
+      "gain": 0.5,
+      "envelope": {"attack": 0.005, "decay": 4.0, "release": 0.05},
+      "partials": [[1, 1.0], [2, 0.25]],
+      "notes": [
+        {"note": "C5", "start": 0.0, "duration": 0.4},
+        {"note": "E5", "start": 0.12, "duration": 0.4},
+        {"frequency": 784, "start": 0.24, "duration": 0.6, "envelope": {"decay": 2.5}}
+      ]
+    }
+
+- note / frequency：音名（如 "A4"、"F#5"、"Bb3"）或频率（赫兹）
+- partials：[[频率倍数, 幅度], ...]，默认只有基频
+- envelope：attack 线性起音秒数，decay 指数衰减速率（每秒），release 结尾线性释音秒数
+- 配方级的 envelope / partials 作为各音符的默认值；duration 缺省为最后一个音符结束的时刻
+"""
+
+import os
+import re
+import json
+
+try:
+    import tomllib
+except ImportError:  # Python 3.11 以下
+    tomllib = None
+
+
+RECIPE_EXTENSIONS = (".json", ".toml")
+MAX_DURATION = 30.0   # 单个铃声的最长秒数
+MAX_NOTES = 256       # 单个配方的最多音符数
+DEFAULT_GAIN = 0.5
+DEFAULT_ENVELOPE = {"attack": 0.005, "decay": 0.0, "release": 0.01}
+DEFAULT_PARTIALS = ((1, 1.0),)
+
+NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+NOTE_PATTERN = re.compile(r"^([A-Ga-g])([#b]?)(-?\d)$")
+NOTE_OFFSETS = {"C": -9, "D": -7, "E": -5, "F": -4, "G": -2, "A": 0, "B": 2}
+
+
+def note_frequency(name):
+    """音名换算为频率（十二平均律，A4 = 440 Hz）"""
+    match = NOTE_PATTERN.match(name.strip())
+    if not match:
+        raise ValueError(f"无法识别的音名: {name}")
+    letter, accidental, octave = match.groups()
+    semitones = NOTE_OFFSETS[letter.upper()] + (int(octave) - 4) * 12
+    semitones += {"#": 1, "b": -1}.get(accidental, 0)
+    return round(440.0 * 2 ** (semitones / 12), 4)
+
+
+def _number(value, field, minimum=0.0, maximum=None):
+    """读取非负数值字段"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{field} 必须是数字")
+    if value < minimum or (maximum is not None and value > maximum):
+        bound = f"{minimum} ~ {maximum}" if maximum is not None else f">= {minimum}"
+        raise ValueError(f"{field} 超出范围（{bound}）: {value}")
+    return float(value)
+
+
+def _envelope(spec, defaults, where):
+    if spec is None:
+        return defaults
+    if not isinstance(spec, dict):
+        raise ValueError(f"{where}.envelope 必须是表")
+    unknown = set(spec) - set(DEFAULT_ENVELOPE)
+    if unknown:
+        raise ValueError(f"{where}.envelope 包含未知字段: {', '.join(sorted(unknown))}")
+    envelope = dict(defaults)
+    for key, value in spec.items():
+        envelope[key] = _number(value, f"{where}.envelope.{key}")
+    return envelope
+
+
+def _partials(spec, defaults, where):
+    if spec is None:
+        return defaults
+    if not isinstance(spec, list) or not spec:
+        raise ValueError(f"{where}.partials 必须是非空列表")
+    partials = []
+    for i, partial in enumerate(spec):
+        if not isinstance(partial, list) or len(partial) != 2:
+            raise ValueError(f"{where}.partials[{i}] 必须是 [频率倍数, 幅度]")
+        partials.append((_number(partial[0], f"{where}.partials[{i}] 倍数", 0.001),
+                         _number(partial[1], f"{where}.partials[{i}] 幅度", -1.0, 1.0)))
+    return tuple(partials)
+
+
+def _frequency(note, where):
+    if "note" in note:
+        if not isinstance(note["note"], str):
+            raise ValueError(f"{where}.note 必须是音名字符串")
+        return note_frequency(note["note"])
+    if "frequency" in note:
+        return _number(note["frequency"], f"{where}.frequency", 20.0, 20000.0)
+    raise ValueError(f"{where} 缺少 note 或 frequency")
+
+
+def compile_recipe(name, spec):
+    """
+    把配方描述编译为 sounds 模块的配方字典
+    {"label", "file", "kind": "voices", "params": {"voices", "duration", "gain"}}
+    配方不合法时抛出 ValueError
+    """
+    if not NAME_PATTERN.match(name):
+        raise ValueError(f"配方名称只能包含字母、数字、下划线和连字符: {name}")
+    if not isinstance(spec, dict):
+        raise ValueError(f"配方 {name} 必须是表")
+    notes = spec.get("notes")
+    if not isinstance(notes, list) or not notes:
+        raise ValueError(f"配方 {name} 缺少 notes")
+    if len(notes) > MAX_NOTES:
+        raise ValueError(f"配方 {name} 的音符超过 {MAX_NOTES} 个")
+
+    envelope = _envelope(spec.get("envelope"), DEFAULT_ENVELOPE, name)
+    partials = _partials(spec.get("partials"), DEFAULT_PARTIALS, name)
+    voices = []
+    end = 0.0
+    for i, note in enumerate(notes):
+        where = f"{name}.notes[{i}]"
+        if not isinstance(note, dict):
+            raise ValueError(f"{where} 必须是表")
+        frequency = _frequency(note, where)
+        start = _number(note.get("start", 0.0), f"{where}.start", 0.0, MAX_DURATION)
+        length = _number(note.get("duration"), f"{where}.duration", 0.001, MAX_DURATION)
+        amplitude = _number(note.get("amplitude", 1.0), f"{where}.amplitude", 0.0, 1.0)
+        note_envelope = _envelope(note.get("envelope"), envelope, where)
+        voices.append([
+            start, length,
+            [[frequency * ratio, amplitude * level]
+             for ratio, level in _partials(note.get("partials"), partials, where)],
+            note_envelope["attack"], note_envelope["decay"], note_envelope["release"],
+        ])
+        end = max(end, start + length)
+
+    duration = _number(spec.get("duration", end), f"{name}.duration", 0.001, MAX_DURATION)
+    gain = _number(spec.get("gain", DEFAULT_GAIN), f"{name}.gain", 0.0, 1.0)
+    label = spec.get("label", name)
+    if not isinstance(label, str):
+        raise ValueError(f"{name}.label 必须是字符串")
+    return {
+        "label": label,
+        "file": f"recipe_{name}.wav",
+        "kind": "voices",
+        "params": {"voices": voices, "duration": duration, "gain": gain},
+    }
+
+
+def parse_file(path):
+    """读取配方文件，返回 {名称: 配方描述}"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".toml":
+        if tomllib is None:
+            raise ValueError("需要 Python 3.11 及以上才能读取 TOML 配方")
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError("配方文件的顶层必须是表")
+    if "recipes" in data:
+        if not isinstance(data["recipes"], dict):
+            raise ValueError("recipes 必须是 {名称: 配方} 表")
+        return data["recipes"]
+    return {os.path.splitext(os.path.basename(path))[0]: data}
+
+
+class RecipeLibrary:
+    """配方目录：按文件缓存编译结果，只重新编译变化过的文件"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._compiled = {}   # 文件路径 -> ((修改时间, 大小), {名称: 配方}, {错误键: 错误信息})
+        self.errors = {}      # 文件名（或 "文件名:配方名"）-> 错误信息
+
+    def _files(self):
+        try:
+            names = sorted(os.listdir(self.directory))
+        except OSError:
+            return []
+        return [os.path.join(self.directory, name) for name in names
+                if name.lower().endswith(RECIPE_EXTENSIONS)]
+
+    def _compile_file(self, path):
+        """
+        编译一个配方文件，返回 ({名称: 配方}, {"文件名:配方名": 错误信息})
+        不合法的配方打印原因后跳过，同一文件中的其他配方照常使用
+        """
+        recipes = {}
+        errors = {}
+        filename = os.path.basename(path)
+        for name, spec in parse_file(path).items():
+            try:
+                recipes[name] = compile_recipe(name, spec)
+            except ValueError as e:
+                errors[f"{filename}:{name}"] = str(e)
+                print(f"声音配方 {filename}:{name} 无效，已跳过: {e}")
+        return recipes, errors
+
+    def load(self, reserved=()):
+        """
+        扫描目录并返回 {名称: 配方}（按文件名排序）
+        reserved 中的名称（内置铃声）和重复的名称被跳过
+        """
+        recipes = {}
+        seen = set()
+        self.errors = {}
+        for path in self._files():
+            seen.add(path)
+            try:
+                st = os.stat(path)
+                stamp = (st.st_mtime_ns, st.st_size)
+                cached = self._compiled.get(path)
+                if cached is None or cached[0] != stamp:
+                    cached = (stamp,) + self._compile_file(path)
+                    self._compiled[path] = cached
+            except (OSError, ValueError) as e:
+                self._compiled.pop(path, None)
+                self.errors[os.path.basename(path)] = str(e)
+                print(f"声音配方 {os.path.basename(path)} 无效，已跳过: {e}")
+                continue
+            self.errors.update(cached[2])
+            for name, recipe in cached[1].items():
+                if name in reserved or name in recipes:
+                    print(f"声音配方名称重复，已跳过: {name}")
+                    continue
+                recipes[name] = recipe
+        for path in set(self._compiled) - seen:
+            del self._compiled[path]
+        return recipes
@@ -0,0 +1,76 @@
+"""
+间隔提醒计划模块
+================
+在专注阶段开始时一次性算出全部提醒时刻，计时中只需依次取出下一个。
+
+功能：
+- 提醒时刻相对阶段开始计算（相位锁定），个别 tick 延迟不会推迟后续提醒
+- 支持非均匀模式，例如“每 5 分钟一次，最后 10 分钟改为每 2 分钟一次”
+- 模式文本格式："5, 2@10" 表示每 5 分钟，最后 10 分钟内每 2 分钟（单位：分钟）
+"""
+
+
+class ReminderPattern:
+    """间隔提醒模式"""
+
+    def __init__(self, every, tails=()):
+        """
+        every: 基础提醒间隔（秒），0 表示不使用基础间隔
+        tails: [(间隔秒数, 窗口秒数), ...]，在阶段最后“窗口秒数”内改用该间隔
+        """
+        self.every = max(0, int(every))
+        self.tails = sorted(((int(interval), int(window)) for interval, window in tails
+                             if interval > 0 and window > 0), key=lambda tail: -tail[1])
+
+    @classmethod
+    def parse(cls, text):
+        """
+        解析模式文本（单位：分钟），如 "5"、"5, 2@10"、"3, 2@10, 1@3"
+        格式错误时抛出 ValueError
+        """
+        parts = [part.strip() for part in str(text).split(",") if part.strip()]
+        if not parts:
+            raise ValueError("提醒模式为空")
+        every = 0
+        tails = []
+        for part in parts:
+            if "@" in part:
+                interval, window = part.split("@", 1)
+                tails.append((int(interval) * 60, int(window) * 60))
+            elif every or tails:
+                raise ValueError(f"无法识别的提醒模式: {text}")
+            else:
+                every = int(part) * 60
+        if every < 0 or any(interval <= 0 or window <= 0 for interval, window in tails):
+            raise ValueError(f"无法识别的提醒模式: {text}")
+        return cls(every, tails)
+
+    def __bool__(self):
+        return bool(self.every or self.tails)
+
+    def offsets(self, duration):
+        """
+        时长为 duration 秒的阶段内所有提醒时刻（相对阶段开始的秒数，升序，不含结束时刻）
+        基础间隔从阶段开始计时；尾段从其窗口开始计时，窗口越小优先级越高
+        """
+        duration = int(duration)
+        segments = [(self.every, 0)]
+        segments += [(interval, max(0, duration - window)) for interval, window in self.tails]
+        times = []
+        for index, (interval, start) in enumerate(segments):
+            stop = segments[index + 1][1] if index + 1 < len(segments) else duration
+            if interval <= 0:
+                continue
+            t = start if index else interval
+            while t < stop:
+                if t > 0:
+                    times.append(t)
+                t += interval
+        return sorted(set(times))
+
+    def describe(self):
+        """人类可读的模式描述"""
+        parts = [f"每 {self.every // 60} 分钟"] if self.every else []
+        parts += [f"最后 {window // 60} 分钟每 {interval // 60} 分钟"
+                  for interval, window in self.tails]
+        return "，".join(parts)
@@ -0,0 +1,75 @@
+"""
+界面渲染模块
+============
+合并（coalesce）界面更新请求，只重绘真正变化的部件。
+
+功能：
+- 任意线程提交帧（部件名 -> 显示值），界面线程中最多只排队一次重绘
+- 重绘前有新帧到达时只保留最新的值，旧帧被合并丢弃
+- 与上次绘制的值比较，只更新文本或数值发生变化的部件
+- 统计已提交、被合并、实际绘制的帧数以及部件更新次数
+"""
+
+import threading
+
+
+class FrameRenderer:
+    """合并帧并按差异重绘的渲染器"""
+
+    def __init__(self, post, painters):
+        """
+        post: 把函数投递到界面线程执行的函数（如 lambda f: root.after(0, f)）
+        painters: {部件名: 绘制函数}，绘制函数接收新的显示值
+        """
+        self._post = post
+        self._painters = dict(painters)
+        self._lock = threading.Lock()
+        self._pending = None     # 尚未绘制的最新帧
+        self._painted = {}       # 上次绘制到部件上的值
+
+        self.scheduled = 0
+        self.coalesced = 0
+        self.painted = 0
+        self.widget_updates = 0
+
+    def submit(self, **frame):
+        """提交一帧（可只包含部分部件），可在任意线程调用"""
+        with self._lock:
+            self.scheduled += 1
+            if self._pending is not None:
+                # 已有重绘在排队：并入最新值即可
+                self._pending.update(frame)
+                self.coalesced += 1
+                return
+            self._pending = frame
+        self._post(self.flush)
+
+    def flush(self):
+        """在界面线程中绘制最新帧，只更新变化的部件"""
+        with self._lock:
+            frame = self._pending
+            self._pending = None
+        if frame is None:
+            return
+
+        changed = 0
+        for name, value in frame.items():
+            if self._painted.get(name, self) == value:
+                continue
+            self._painters[name](value)
+            self._painted[name] = value
+            changed += 1
+
+        with self._lock:
+            self.painted += 1
+            self.widget_updates += changed
+
+    def metrics(self):
+        """渲染统计"""
+        with self._lock:
+            return {
+                "scheduled": self.scheduled,
+                "coalesced": self.coalesced,
+                "painted": self.painted,
+                "widget_updates": self.widget_updates,
+            }
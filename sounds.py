@@ -7,13 +7,126 @@
 - 生成不同类型的提示音（ding, bell, alarm）
 - 使用 wave 模块生成 WAV 格式音频
 - 支持 pygame 播放
+- 合成由 synth 模块完成（NumPy 或 array 后端，整段数组运算）
+- sound_recipes/ 目录中的 JSON / TOML 声音配方（见 recipes 模块）与内置铃声一起列出
+- 纯 Python 后端下，需要重新合成的铃声分发到进程池并行合成（每个进程一个配方），
+  单核机器或无法创建子进程时退回串行；子进程用 forkserver / spawn 启动，
+  不在多线程的界面进程中 fork
 """
 
 import os
-import math
+import json
 import wave
-import struct
-import tempfile
+import hashlib
+import zlib
+import threading
+
+from synth import create_synth, encode_pcm16
+from recipes import RecipeLibrary
+
+
+# 配方版本号：合成算法本身改变时递增，使所有缓存失效
+RECIPE_VERSION = 1
+
+# 缓存清单文件名（位于 sounds/ 目录下）
+MANIFEST_FILENAME = "manifest.json"
+
+# 用户声音配方目录名（位于程序目录下）
+RECIPES_DIRNAME = "sound_recipes"
+
+# 内置铃声配方
+# label 为界面显示名称；kind 对应 synth 后端的方法名，params 为其参数；
+# kind 与 params 的哈希即缓存键
+BUILTIN_RECIPES = {
+    # 高频短促的叮声
+    "ding": {
+        "label": "🔔 叮 (Ding)",
+        "file": "ding.wav",
+        "kind": "decay_tone",
+        "params": {
+            "frequency": 1200,  # 1200Hz - 清脆的高音
+            "duration": 0.3,    # 0.3秒
+            "volume": 0.7,
+            "decay": 8.0        # 快速衰减
+        }
+    },
+    # 混合多个频率模拟钟声
+    "bell": {
+        "label": "🔔 钟声 (Bell)",
+        "file": "bell.wav",
+        "kind": "chord",
+        "params": {
+            "frequencies": [523, 659, 784],  # C5, E5, G5 和弦
+            "duration": 1.5,
+            "amplitude": 0.3,
+            "decay": 2.0
+        }
+    },
+    # 双音交替的闹钟声，1.5秒后整体衰减
+    "alarm": {
+        "label": "⏰ 闹钟 (Alarm)",
+        "file": "alarm.wav",
+        "kind": "alternating",
+        "params": {
+            "freq1": 800,
+            "freq2": 1000,
+            "switch_interval": 0.15,  # 每0.15秒切换一次
+            "duration": 2.0,
+            "amplitude": 0.6,
+            "hold": 1.5,
+            "release": 3
+        }
+    },
+    # 递降的三连音
+    "chime": {
+        "label": "🎐 风铃 (Chime)",
+        "file": "chime.wav",
+        "kind": "notes",
+        "params": {
+            "notes": [
+                [880, 0.0, 0.3],   # A5
+                [784, 0.15, 0.3],  # G5
+                [659, 0.30, 0.4],  # E5
+            ],
+            "duration": 1.0,
+            "amplitude": 0.4,
+            "decay": 5
+        }
+    },
+    "double_beep": {
+        "label": "📢 双响 (Double Beep)",
+        "file": "double_beep.wav",
+        "kind": "double_beep",
+        "params": {
+            "frequency": 1000,
+            "beep_duration": 0.1,
+            "gap": 0.1,
+            "duration": 0.6,
+            "amplitude": 0.6,
+            "decay": 10
+        }
+    },
+}
+
+
+def render_recipe(kind, params, sample_rate, backend):
+    """进程池工作函数：在子进程中合成一个配方，返回 16 位 PCM 字节"""
+    synth = create_synth(sample_rate, backend)
+    return encode_pcm16(getattr(synth, kind)(**params))
+
+
+def recipe_hash(recipe, sample_rate, channels, sample_width):
+    """计算配方的内容哈希（包含采样参数与配方版本）"""
+    payload = {
+        "version": RECIPE_VERSION,
+        "kind": recipe["kind"],
+        "params": recipe["params"],
+        "sample_rate": sample_rate,
+        "channels": channels,
+        "sample_width": sample_width,
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
 
 
 class SoundGenerator:
@@ -24,64 +137,233 @@ class SoundGenerator:
     CHANNELS = 1         # 单声道
     SAMPLE_WIDTH = 2     # 16位
     
-    def __init__(self):
-        """初始化音频生成器"""
-        self.sounds_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sounds")
+    def __init__(self, sounds_dir=None, recipes_dir=None):
+        """
+        初始化音频生成器
+        sounds_dir: 铃声输出目录，默认为程序目录下的 sounds/
+        recipes_dir: 声音配方目录，默认为程序目录下的 sound_recipes/
+        """
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        self.sounds_dir = sounds_dir or os.path.join(base_dir, "sounds")
         self._ensure_sounds_dir()
         self._generated_files = {}
+        self._manifest = None
+        self._lock = threading.Lock()
+        self.synth = create_synth(self.SAMPLE_RATE)
+        self.recipe_library = RecipeLibrary(recipes_dir or os.path.join(base_dir, RECIPES_DIRNAME))
+        self.recipes = {}
+        self.reload_recipes()
     
     def _ensure_sounds_dir(self):
         """确保 sounds 目录存在"""
         if not os.path.exists(self.sounds_dir):
             os.makedirs(self.sounds_dir)
     
-    def _generate_sine_wave(self, frequency, duration, volume=0.8):
-        """生成正弦波音频数据"""
-        num_samples = int(self.SAMPLE_RATE * duration)
-        samples = []
+    def reload_recipes(self):
+        """
+        重新扫描声音配方目录，返回配方名称列表
+        内置铃声在前，用户配方按文件名排序接在后面
+        """
+        user_recipes = self.recipe_library.load(reserved=BUILTIN_RECIPES)
+        with self._lock:
+            recipes = dict(BUILTIN_RECIPES)
+            recipes.update(user_recipes)
+            for name, recipe in self.recipes.items():
+                if recipes.get(name) is not recipe:
+                    self._generated_files.pop(name, None)
+            self.recipes = recipes
+        return list(user_recipes)
+    
+    @property
+    def manifest_path(self):
+        """缓存清单路径"""
+        return os.path.join(self.sounds_dir, MANIFEST_FILENAME)
+    
+    def _load_manifest(self):
+        """读取缓存清单，缺失或损坏时视为空"""
+        if self._manifest is None:
+            try:
+                with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+                if manifest.get("version") != RECIPE_VERSION:
+                    manifest = {}
+            except (OSError, ValueError):
+                manifest = {}
+            self._manifest = manifest.get("sounds", {}) if isinstance(manifest, dict) else {}
+        return self._manifest
+    
+    def _save_manifest(self):
+        """原子地写回缓存清单"""
+        data = {"version": RECIPE_VERSION, "sounds": self._manifest}
+        tmp_path = self.manifest_path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.manifest_path)
+        except OSError as e:
+            print(f"保存铃声缓存清单失败: {e}")
+    
+    def _file_checksum(self, filename):
+        """读取铃声文件，返回 (大小, CRC32)"""
+        with open(os.path.join(self.sounds_dir, filename), 'rb') as f:
+            data = f.read()
+        return len(data), zlib.crc32(data)
+    
+    def _is_cached(self, filename, digest):
+        """缓存是否有效：配方哈希一致，文件存在且大小与 CRC32 均与记录相符"""
+        entry = self._load_manifest().get(filename)
+        if not entry or entry.get("hash") != digest:
+            return False
+        try:
+            size, crc = self._file_checksum(filename)
+        except OSError:
+            return False
+        return size == entry.get("size") and crc == entry.get("crc32")
+    
+    def _render_cached(self, name):
+        """
+        按配方获取内置铃声
+        仅在配方变化、文件缺失或损坏时重新合成，否则直接返回缓存文件
+        """
+        filepath = self._generated_files.get(name)
+        if filepath:
+            return filepath
         
-        for i in range(num_samples):
-            t = i / self.SAMPLE_RATE
-            # 添加淡入淡出效果
-            fade_samples = int(0.01 * self.SAMPLE_RATE)  # 10ms 淡入淡出
-            if i < fade_samples:
-                fade = i / fade_samples
-            elif i > num_samples - fade_samples:
-                fade = (num_samples - i) / fade_samples
-            else:
-                fade = 1.0
+        with self._lock:
+            recipe = self.recipes[name]
+            filename = recipe["file"]
+            filepath = os.path.join(self.sounds_dir, filename)
+            digest = recipe_hash(recipe, self.SAMPLE_RATE, self.CHANNELS, self.SAMPLE_WIDTH)
             
-            value = volume * fade * math.sin(2 * math.pi * frequency * t)
-            samples.append(int(value * 32767))
-        
-        return samples
+            if not self._is_cached(filename, digest):
+                samples = getattr(self.synth, recipe["kind"])(**recipe["params"])
+                self._save_wav(samples, filename)
+                self._record(filename, digest)
+                self._save_manifest()
+            
+            self._generated_files[name] = filepath
+            return filepath
+    
+    def _record(self, filename, digest):
+        """在缓存清单中记录刚写出的铃声（调用方持有锁）"""
+        size, crc = self._file_checksum(filename)
+        self._manifest[filename] = {
+            "hash": digest,
+            "size": size,
+            "crc32": crc
+        }
+    
+    def _stale_recipes(self):
+        """需要重新合成的配方 {名称: 配方哈希}"""
+        stale = {}
+        with self._lock:
+            for name, recipe in self.recipes.items():
+                if name in self._generated_files:
+                    continue
+                digest = recipe_hash(recipe, self.SAMPLE_RATE, self.CHANNELS, self.SAMPLE_WIDTH)
+                if not self._is_cached(recipe["file"], digest):
+                    stale[name] = digest
+        return stale
+    
+    def _parallel_workers(self, pending, workers):
+        """
+        进程池大小；返回 0 表示串行
+        workers 为 None 时自动选择：只在纯 Python 后端、多核且有多个铃声待合成时并行
+        （NumPy 后端合成全部铃声只需几十毫秒，不值得启动子进程）
+        单核机器上即使指定了 workers 也串行：子进程的启动开销大于并行收益
+        """
+        if (os.cpu_count() or 1) < 2:
+            return 0
+        if workers is None:
+            if self.synth.name != "array":
+                return 0
+            workers = os.cpu_count() or 1
+        workers = min(workers, pending)
+        return workers if workers > 1 else 0
+    
+    def _render_parallel(self, stale, workers):
+        """
+        把待合成的配方分发到进程池，按完成顺序写入 sounds/
+        返回成功写入的数量；进程池不可用时返回已完成的部分，其余由调用方串行合成
+        """
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        from concurrent.futures.process import BrokenProcessPool
+
+        # 调用方通常是界面进程的后台线程，多线程进程中 fork 不安全
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        written = 0
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                futures = {}
+                for name in stale:
+                    recipe = self.recipes[name]
+                    future = executor.submit(render_recipe, recipe["kind"], recipe["params"],
+                                             self.SAMPLE_RATE, self.synth.name)
+                    futures[future] = name
+                for future in as_completed(futures):
+                    name = futures[future]
+                    try:
+                        frames = future.result()
+                    except BrokenProcessPool:
+                        raise
+                    except Exception as e:
+                        print(f"铃声 {name} 并行合成失败，改为串行: {e}")
+                        continue
+                    filename = self.recipes[name]["file"]
+                    with self._lock:
+                        self._write_wav(frames, filename)
+                        self._record(filename, stale[name])
+                        self._generated_files[name] = os.path.join(self.sounds_dir, filename)
+                    written += 1
+        except (OSError, NotImplementedError, BrokenProcessPool) as e:
+            # 沙箱或受限环境中不允许创建子进程
+            print(f"无法使用进程池合成铃声，改为串行: {e}")
+        if written:
+            with self._lock:
+                self._save_manifest()
+        return written
+    
+    def _generate_sine_wave(self, frequency, duration, volume=0.8):
+        """生成正弦波音频数据（带 10ms 淡入淡出）"""
+        return self.synth.sine_wave(frequency, duration, volume)
     
     def _generate_decay_tone(self, frequency, duration, volume=0.8, decay=3.0):
         """生成带衰减的音调"""
-        num_samples = int(self.SAMPLE_RATE * duration)
-        samples = []
-        
-        for i in range(num_samples):
-            t = i / self.SAMPLE_RATE
-            # 指数衰减
-            envelope = math.exp(-decay * t)
-            value = volume * envelope * math.sin(2 * math.pi * frequency * t)
-            samples.append(int(value * 32767))
-        
-        return samples
+        return self.synth.decay_tone(frequency, duration, volume, decay)
     
     def _save_wav(self, samples, filename):
-        """保存为 WAV 文件"""
+        """
+        保存为 WAV 文件
+        整段编码后一次写入临时文件，再原子替换目标文件，
+        中途崩溃不会在 sounds/ 中留下截断的 WAV
+        """
+        return self._write_wav(encode_pcm16(samples), filename)
+    
+    def _write_wav(self, frames, filename):
+        """把已编码的 16 位 PCM 写为 WAV（临时文件 + 原子替换）"""
         filepath = os.path.join(self.sounds_dir, filename)
-        
-        with wave.open(filepath, 'w') as wav_file:
-            wav_file.setnchannels(self.CHANNELS)
-            wav_file.setsampwidth(self.SAMPLE_WIDTH)
-            wav_file.setframerate(self.SAMPLE_RATE)
-            
-            for sample in samples:
-                packed = struct.pack('<h', max(-32768, min(32767, sample)))
-                wav_file.writeframes(packed)
+        # 临时文件用 open() 创建，权限与直接写入时一致（受 umask 控制，而非 mkstemp 的 0600）；
+        # 文件名带进程号与线程号，并发写入互不干扰
+        tmp_path = os.path.join(self.sounds_dir,
+                                f".{filename}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, 'wb') as f:
+                with wave.open(f, 'wb') as wav_file:
+                    wav_file.setnchannels(self.CHANNELS)
+                    wav_file.setsampwidth(self.SAMPLE_WIDTH)
+                    wav_file.setframerate(self.SAMPLE_RATE)
+                    wav_file.writeframes(frames)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, filepath)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
         
         return filepath
     
@@ -90,164 +372,46 @@ class SoundGenerator:
         生成清脆的 "叮" 提示音
         用于间隔提醒
         """
-        filename = "ding.wav"
-        filepath = os.path.join(self.sounds_dir, filename)
-        
-        if os.path.exists(filepath):
-            return filepath
-        
-        # 高频短促的叮声
-        samples = self._generate_decay_tone(
-            frequency=1200,  # 1200Hz - 清脆的高音
-            duration=0.3,    # 0.3秒
-            volume=0.7,
-            decay=8.0        # 快速衰减
-        )
-        
-        return self._save_wav(samples, filename)
+        return self._render_cached("ding")
     
     def generate_bell(self):
         """
         生成悦耳的钟声
         用作结束提示音
         """
-        filename = "bell.wav"
-        filepath = os.path.join(self.sounds_dir, filename)
-        
-        if os.path.exists(filepath):
-            return filepath
-        
-        samples = []
-        
-        # 混合多个频率模拟钟声
-        frequencies = [523, 659, 784]  # C5, E5, G5 和弦
-        duration = 1.5
-        num_samples = int(self.SAMPLE_RATE * duration)
-        
-        for i in range(num_samples):
-            t = i / self.SAMPLE_RATE
-            envelope = math.exp(-2.0 * t)
-            
-            value = 0
-            for freq in frequencies:
-                value += 0.3 * envelope * math.sin(2 * math.pi * freq * t)
-            
-            samples.append(int(value * 32767))
-        
-        return self._save_wav(samples, filename)
+        return self._render_cached("bell")
     
     def generate_alarm(self):
         """
         生成响亮的闹钟声
         用作番茄钟结束的主提示音
         """
-        filename = "alarm.wav"
-        filepath = os.path.join(self.sounds_dir, filename)
-        
-        if os.path.exists(filepath):
-            return filepath
-        
-        samples = []
-        duration = 2.0
-        num_samples = int(self.SAMPLE_RATE * duration)
-        
-        # 双音交替的闹钟声
-        freq1, freq2 = 800, 1000
-        switch_interval = 0.15  # 每0.15秒切换一次
-        
-        for i in range(num_samples):
-            t = i / self.SAMPLE_RATE
-            
-            # 整体衰减
-            envelope = 1.0 if t < 1.5 else math.exp(-3 * (t - 1.5))
-            
-            # 频率切换
-            if int(t / switch_interval) % 2 == 0:
-                freq = freq1
-            else:
-                freq = freq2
-            
-            value = 0.6 * envelope * math.sin(2 * math.pi * freq * t)
-            samples.append(int(value * 32767))
-        
-        return self._save_wav(samples, filename)
+        return self._render_cached("alarm")
     
     def generate_soft_chime(self):
         """
         生成柔和的风铃声
         适合作为轻柔的提示音
         """
-        filename = "chime.wav"
-        filepath = os.path.join(self.sounds_dir, filename)
-        
-        if os.path.exists(filepath):
-            return filepath
-        
-        samples = []
-        duration = 1.0
-        num_samples = int(self.SAMPLE_RATE * duration)
-        
-        # 递降的三连音
-        notes = [
-            (880, 0.0, 0.3),   # A5
-            (784, 0.15, 0.3),  # G5
-            (659, 0.30, 0.4),  # E5
-        ]
-        
-        for i in range(num_samples):
-            t = i / self.SAMPLE_RATE
-            value = 0
-            
-            for freq, start, note_duration in notes:
-                if t >= start:
-                    note_t = t - start
-                    if note_t < note_duration:
-                        envelope = math.exp(-5 * note_t)
-                        value += 0.4 * envelope * math.sin(2 * math.pi * freq * note_t)
-            
-            samples.append(int(value * 32767))
-        
-        return self._save_wav(samples, filename)
+        return self._render_cached("chime")
     
     def generate_double_beep(self):
         """
         生成双声提示音
         用于重要提醒
         """
-        filename = "double_beep.wav"
-        filepath = os.path.join(self.sounds_dir, filename)
-        
-        if os.path.exists(filepath):
-            return filepath
-        
-        samples = []
-        duration = 0.6
-        num_samples = int(self.SAMPLE_RATE * duration)
-        
-        freq = 1000
-        beep_duration = 0.1
-        gap = 0.1
-        
-        for i in range(num_samples):
-            t = i / self.SAMPLE_RATE
-            value = 0
-            
-            # 第一声
-            if 0 <= t < beep_duration:
-                envelope = math.exp(-10 * t)
-                value = 0.6 * envelope * math.sin(2 * math.pi * freq * t)
-            # 第二声
-            elif beep_duration + gap <= t < beep_duration * 2 + gap:
-                t2 = t - beep_duration - gap
-                envelope = math.exp(-10 * t2)
-                value = 0.6 * envelope * math.sin(2 * math.pi * freq * t2)
-            
-            samples.append(int(value * 32767))
-        
-        return self._save_wav(samples, filename)
+        return self._render_cached("double_beep")
     
-    def generate_all_sounds(self):
-        """生成所有内置铃声"""
+    def generate_all_sounds(self, workers=None):
+        """
+        生成所有内置铃声和配方铃声（只合成配方变化过的）
+        workers: 并行合成的进程数；None 为自动，0 或 1 为串行（单核机器上始终串行）
+        """
+        stale = self._stale_recipes()
+        pool_size = self._parallel_workers(len(stale), workers)
+        if pool_size:
+            self._render_parallel(stale, pool_size)
+        
         sounds = {
             "ding": self.generate_ding(),
             "bell": self.generate_bell(),
@@ -255,8 +419,25 @@ class SoundGenerator:
             "chime": self.generate_soft_chime(),
             "double_beep": self.generate_double_beep()
         }
+        for name in list(self.recipes):
+            if name not in sounds:
+                try:
+                    sounds[name] = self._render_cached(name)
+                except (ValueError, MemoryError) as e:
+                    print(f"声音配方 {name} 合成失败: {e}")
         return sounds
     
+    def builtin_sound_entries(self):
+        """
+        获取内置铃声（含配方铃声）的名称和路径，但不生成文件
+        用于在铃声就绪前先构建界面
+        返回格式: [(显示名称, 文件路径), ...]
+        """
+        return [
+            (recipe["label"], os.path.join(self.sounds_dir, recipe["file"]))
+            for recipe in self.recipes.values()
+        ]
+    
     def get_builtin_sounds(self):
         """
         获取所有内置铃声的信息
@@ -265,13 +446,7 @@ class SoundGenerator:
         # 确保所有铃声都已生成
         self.generate_all_sounds()
         
-        return [
-            ("🔔 叮 (Ding)", os.path.join(self.sounds_dir, "ding.wav")),
-            ("🔔 钟声 (Bell)", os.path.join(self.sounds_dir, "bell.wav")),
-            ("⏰ 闹钟 (Alarm)", os.path.join(self.sounds_dir, "alarm.wav")),
-            ("🎐 风铃 (Chime)", os.path.join(self.sounds_dir, "chime.wav")),
-            ("📢 双响 (Double Beep)", os.path.join(self.sounds_dir, "double_beep.wav")),
-        ]
+        return self.builtin_sound_entries()
 
 
 # 便捷函数
@@ -288,6 +463,14 @@ def get_builtin_sounds():
     """获取内置铃声列表"""
     return get_sound_generator().get_builtin_sounds()
 
+def get_builtin_sound_entries():
+    """获取内置铃声列表（不生成文件）"""
+    return get_sound_generator().builtin_sound_entries()
+
+def get_builtin_sound(name):
+    """按配方名称（如 "bell" 或配方文件名）获取铃声路径"""
+    return get_sound_generator()._render_cached(name)
+
 def get_ding_sound():
     """获取叮声路径"""
     return get_sound_generator().generate_ding()
@@ -0,0 +1,261 @@
+"""
+专注统计模块
+============
+在专注历史之上维护增量汇总（rollup），查询时不再扫描原始日志。
+
+汇总内容：
+- 每日：完成数、专注秒数
+- 每周（ISO 周）：完成数、专注秒数
+- 每个标签：完成数、专注秒数
+- 会话时长直方图（按 5 分钟分桶）
+- 连续专注天数（当前连续、历史最长）
+
+汇总快照保存在 pomodoro_stats.json 中，并记录已汇总的日志条数；
+启动时只需补上快照之后新增的记录，快照缺失或不一致时才完整重建。
+快照经由 ConfigStore 防抖后台写入，会话结束时不在调用线程中写盘；
+即使快照落后于日志，下次启动也会从日志补齐。
+"""
+
+import json
+import datetime
+
+from config_store import ConfigStore
+
+
+STATS_VERSION = 1
+HISTOGRAM_BUCKET = 5 * 60  # 直方图分桶宽度（秒）
+
+
+def day_of(timestamp):
+    """时间戳所在的本地日期序号（date.toordinal）"""
+    return datetime.date.fromtimestamp(timestamp).toordinal()
+
+
+def week_of(day):
+    """日期序号所在的 ISO 周，格式 "YYYY-Www" """
+    year, week, _ = datetime.date.fromordinal(day).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+class FocusStats:
+    """增量维护的专注统计"""
+
+    def __init__(self):
+        self.days = {}        # 日期序号 -> [完成数, 专注秒数]
+        self.weeks = {}       # ISO 周 -> [完成数, 专注秒数]
+        self.tags = {}        # 标签 -> [完成数, 专注秒数]
+        self.histogram = {}   # 分桶下标 -> 会话数
+        self.total = [0, 0.0]
+        self.indexed = 0      # 已汇总的日志记录数
+
+        # 连续天数：以最近一个有完成记录的日期为终点的连续段
+        self.streak_end = None
+        self.streak_length = 0
+        self.longest_streak = 0
+
+    # ---------- 增量更新 ----------
+
+    @staticmethod
+    def _bump(table, key, completed, seconds):
+        entry = table.get(key)
+        if entry is None:
+            table[key] = [completed, seconds]
+        else:
+            entry[0] += completed
+            entry[1] += seconds
+
+    def add(self, record):
+        """汇总一条会话记录（SessionRecord）"""
+        self.indexed += 1
+        completed = 1 if record.completed else 0
+        seconds = record.focused_seconds
+        day = day_of(record.end)
+
+        self._bump(self.days, day, completed, seconds)
+        self._bump(self.weeks, week_of(day), completed, seconds)
+        self._bump(self.tags, record.tag, completed, seconds)
+        self.total[0] += completed
+        self.total[1] += seconds
+
+        bucket = int(seconds // HISTOGRAM_BUCKET)
+        self.histogram[bucket] = self.histogram.get(bucket, 0) + 1
+
+        if completed:
+            self._extend_streak(day)
+
+    def _extend_streak(self, day):
+        """更新连续天数；记录乱序到达时退回到重新计算"""
+        if self.streak_end is None or day == self.streak_end + 1:
+            self.streak_length += 1
+            self.streak_end = day
+        elif day == self.streak_end:
+            return
+        elif day > self.streak_end + 1:
+            self.streak_length = 1
+            self.streak_end = day
+        else:
+            self._recompute_streaks()
+            return
+        self.longest_streak = max(self.longest_streak, self.streak_length)
+
+    def _recompute_streaks(self):
+        """根据每日汇总重新计算连续天数"""
+        active = sorted(day for day, (completed, _) in self.days.items() if completed)
+        self.streak_end = None
+        self.streak_length = 0
+        self.longest_streak = 0
+        for day in active:
+            self._extend_streak(day)
+
+    # ---------- 查询 ----------
+
+    def day(self, date=None):
+        """某天的 (完成数, 专注秒数)，date 为 datetime.date，默认今天"""
+        date = date or datetime.date.today()
+        completed, seconds = self.days.get(date.toordinal(), (0, 0.0))
+        return completed, seconds
+
+    def week(self, date=None):
+        """某天所在 ISO 周的 (完成数, 专注秒数)"""
+        date = date or datetime.date.today()
+        completed, seconds = self.weeks.get(week_of(date.toordinal()), (0, 0.0))
+        return completed, seconds
+
+    def tag_totals(self):
+        """各标签的 {标签: (完成数, 专注秒数)}"""
+        return {tag: tuple(entry) for tag, entry in self.tags.items()}
+
+    def current_streak(self, date=None):
+        """截至某天的当前连续天数（昨天有完成记录也算连续）"""
+        today = (date or datetime.date.today()).toordinal()
+        if self.streak_end is not None and self.streak_end >= today - 1:
+            return self.streak_length
+        return 0
+
+    def histogram_rows(self):
+        """直方图 [(分桶起始分钟, 会话数), ...]"""
+        return [(bucket * HISTOGRAM_BUCKET // 60, count)
+                for bucket, count in sorted(self.histogram.items())]
+
+    def daily_range(self, start, end):
+        """[start, end] 日期区间内每天的 (date, 完成数, 专注秒数)"""
+        rows = []
+        for day in range(start.toordinal(), end.toordinal() + 1):
+            completed, seconds = self.days.get(day, (0, 0.0))
+            rows.append((datetime.date.fromordinal(day), completed, seconds))
+        return rows
+
+    # ---------- 快照 ----------
+
+    def to_dict(self):
+        return {
+            "version": STATS_VERSION,
+            "indexed": self.indexed,
+            "days": {str(day): list(entry) for day, entry in self.days.items()},
+            "weeks": {week: list(entry) for week, entry in self.weeks.items()},
+            "tags": {tag: list(entry) for tag, entry in self.tags.items()},
+            "histogram": {str(bucket): count for bucket, count in self.histogram.items()},
+            "total": list(self.total),
+            "streak": [self.streak_end, self.streak_length, self.longest_streak],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("version") != STATS_VERSION:
+            raise ValueError("统计快照版本不匹配")
+        stats = cls()
+        stats.indexed = data["indexed"]
+        stats.days = {int(day): entry for day, entry in data["days"].items()}
+        stats.weeks = data["weeks"]
+        stats.tags = data["tags"]
+        stats.histogram = {int(bucket): count for bucket, count in data["histogram"].items()}
+        stats.total = data["total"]
+        stats.streak_end, stats.streak_length, stats.longest_streak = data["streak"]
+        return stats
+
+
+class StatsIndex:
+    """与专注历史日志保持同步的统计索引"""
+
+    def __init__(self, log, path, quiet_period=ConfigStore.DEFAULT_QUIET_PERIOD):
+        """
+        log: history.SessionLog
+        path: 汇总快照文件路径
+        quiet_period: 最后一次更新后等待多久再写出快照
+        """
+        self.log = log
+        self.path = path
+        self._store = ConfigStore(path, quiet_period=quiet_period, name="stats", label="统计快照")
+        self.stats = self._load()
+        self._store.data = self.stats.to_dict()  # close() 时写出的内容始终是完整快照
+
+    def _load(self):
+        """加载快照并补上之后新增的日志记录"""
+        stats = None
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                stats = FocusStats.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError, TypeError):
+            stats = None
+
+        if stats is None or stats.indexed > len(self.log):
+            stats = FocusStats()
+
+        if stats.indexed < len(self.log):
+            for record in self.log.iter_range(stats.indexed):
+                stats.add(record)
+            self._save(stats)
+        return stats
+
+    def _save(self, stats=None):
+        """登记汇总快照（复制当前数据），静默期后由后台线程原子写入"""
+        self._store.data = (stats or self.stats).to_dict()
+        self._store.save()
+
+    def record(self, record):
+        """追加会话到日志并更新汇总"""
+        self.log.append(record)
+        self.stats.add(record)
+        self._save()
+
+    def flush(self):
+        """立即写出尚未落盘的快照"""
+        self._store.flush()
+
+    def close(self):
+        """停止后台写入线程并写出当前快照"""
+        self._store.close()
+
+
+def format_duration(seconds):
+    """把秒数格式化为 "X小时Y分" """
+    minutes = int(seconds // 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}小时{minutes}分" if hours else f"{minutes}分"
+
+
+def summary_lines(stats, date=None):
+    """统计窗口显示的文本行"""
+    date = date or datetime.date.today()
+    day_count, day_seconds = stats.day(date)
+    week_count, week_seconds = stats.week(date)
+    lines = [
+        f"今日：{day_count} 个番茄，专注 {format_duration(day_seconds)}",
+        f"本周：{week_count} 个番茄，专注 {format_duration(week_seconds)}",
+        f"累计：{stats.total[0]} 个番茄，专注 {format_duration(stats.total[1])}",
+        f"连续专注：{stats.current_streak(date)} 天（最长 {stats.longest_streak} 天）",
+    ]
+    tags = sorted(((tag, entry) for tag, entry in stats.tag_totals().items() if tag),
+                  key=lambda item: item[1][1], reverse=True)
+    if tags:
+        lines.append("标签：")
+        for tag, (count, seconds) in tags[:5]:
+            lines.append(f"  {tag}: {count} 个，{format_duration(seconds)}")
+    rows = stats.histogram_rows()
+    if rows:
+        peak = max(count for _, count in rows)
+        lines.append("会话时长分布：")
+        for minute, count in rows[:12]:
+            bar = "█" * max(1, round(count * 20 / peak))
+            lines.append(f"  {minute:>3}分+ {bar} {count}")
+    return lines
@@ -0,0 +1,364 @@
+"""
+音频合成后端
+============
+以整段数组的方式生成包络和振荡器，替代逐采样的 Python 循环。
+
+后端：
+- NumpySynth：安装了 NumPy 时使用，整段向量运算
+- ArraySynth：纯 Python 后备，使用 array + 预计算的时间轴/包络表
+
+两个后端与原先逐采样的实现使用完全相同的浮点运算顺序，
+生成的采样逐位一致，可用 verify_backends() 互相校验。
+
+可通过环境变量 POMODORO_SYNTH=numpy|array 强制选择后端。
+"""
+
+import os
+import sys
+import math
+from array import array
+from bisect import bisect_left
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    np = None
+    HAS_NUMPY = False
+
+
+SAMPLE_RATE = 44100  # 采样率
+FULL_SCALE = 32767   # 16位满幅
+PCM16_MIN, PCM16_MAX = -32768, 32767
+
+
+class ArraySynth:
+    """纯 Python 合成后端（array + 预计算表）"""
+
+    name = "array"
+
+    def __init__(self, sample_rate=SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self._time_table = []
+        self._decay_tables = {}
+
+    def _times(self, num_samples):
+        """时间轴表 t[i] = i / sample_rate，按需增长并复用"""
+        table = self._time_table
+        if len(table) < num_samples:
+            sample_rate = self.sample_rate
+            table.extend(i / sample_rate for i in range(len(table), num_samples))
+        return table[:num_samples]
+
+    def _decay(self, decay, num_samples):
+        """指数衰减包络表 exp(-decay * t)，按衰减系数缓存"""
+        table = self._decay_tables.setdefault(decay, [])
+        if len(table) < num_samples:
+            exp = math.exp
+            table.extend(exp(-decay * t) for t in self._times(num_samples)[len(table):])
+        return table[:num_samples]
+
+    def sine_wave(self, frequency, duration, volume=0.8):
+        """带 10ms 淡入淡出的正弦波"""
+        num_samples = int(self.sample_rate * duration)
+        fade_samples = int(0.01 * self.sample_rate)
+        omega = 2 * math.pi * frequency
+        sin = math.sin
+        times = self._times(num_samples)
+        head = num_samples - fade_samples
+
+        samples = array('i', bytes(4 * num_samples))
+        for i, t in enumerate(times):
+            if i < fade_samples:
+                fade = i / fade_samples
+            elif i > head:
+                fade = (num_samples - i) / fade_samples
+            else:
+                fade = 1.0
+            samples[i] = int(volume * fade * sin(omega * t) * FULL_SCALE)
+        return samples
+
+    def decay_tone(self, frequency, duration, volume=0.8, decay=3.0):
+        """指数衰减的单音"""
+        num_samples = int(self.sample_rate * duration)
+        omega = 2 * math.pi * frequency
+        sin = math.sin
+        return array('i', [
+            int(volume * envelope * sin(omega * t) * FULL_SCALE)
+            for t, envelope in zip(self._times(num_samples), self._decay(decay, num_samples))
+        ])
+
+    def chord(self, frequencies, duration, amplitude, decay):
+        """共用一条衰减包络的和弦"""
+        num_samples = int(self.sample_rate * duration)
+        omegas = [2 * math.pi * freq for freq in frequencies]
+        sin = math.sin
+        samples = array('i', bytes(4 * num_samples))
+        times = self._times(num_samples)
+        envelopes = self._decay(decay, num_samples)
+        for i in range(num_samples):
+            t = times[i]
+            envelope = envelopes[i]
+            value = 0
+            for omega in omegas:
+                value += amplitude * envelope * sin(omega * t)
+            samples[i] = int(value * FULL_SCALE)
+        return samples
+
+    def alternating(self, freq1, freq2, switch_interval, duration, amplitude,
+                    hold, release):
+        """两个频率交替，保持 hold 秒后以 release 速率衰减"""
+        num_samples = int(self.sample_rate * duration)
+        omegas = (2 * math.pi * freq1, 2 * math.pi * freq2)
+        sin = math.sin
+        exp = math.exp
+        return array('i', [
+            int(amplitude * (1.0 if t < hold else exp(-release * (t - hold)))
+                * sin(omegas[int(t / switch_interval) % 2] * t) * FULL_SCALE)
+            for t in self._times(num_samples)
+        ])
+
+    def notes(self, notes, duration, amplitude, decay):
+        """依次起音的若干衰减音符 [(频率, 起始时间, 时长), ...]"""
+        num_samples = int(self.sample_rate * duration)
+        sin = math.sin
+        exp = math.exp
+        values = [0] * num_samples
+        times = self._times(num_samples)
+        for freq, start, note_duration in notes:
+            omega = 2 * math.pi * freq
+            for i in range(num_samples):
+                t = times[i]
+                if t >= start:
+                    note_t = t - start
+                    if note_t < note_duration:
+                        values[i] += amplitude * exp(-decay * note_t) * sin(omega * note_t)
+        return array('i', [int(value * FULL_SCALE) for value in values])
+
+    def double_beep(self, frequency, beep_duration, gap, duration, amplitude, decay):
+        """间隔 gap 秒的两声短促衰减音"""
+        num_samples = int(self.sample_rate * duration)
+        omega = 2 * math.pi * frequency
+        second_start = beep_duration + gap
+        second_end = beep_duration * 2 + gap
+        sin = math.sin
+        exp = math.exp
+        samples = array('i', bytes(4 * num_samples))
+        for i, t in enumerate(self._times(num_samples)):
+            if 0 <= t < beep_duration:
+                value = amplitude * exp(-decay * t) * sin(omega * t)
+            elif second_start <= t < second_end:
+                t2 = t - beep_duration - gap
+                value = amplitude * exp(-decay * t2) * sin(omega * t2)
+            else:
+                continue
+            samples[i] = int(value * FULL_SCALE)
+        return samples
+
+    def voices(self, voices, duration, gain):
+        """
+        声音配方编译出的声部叠加（见 recipes 模块）
+        voices: [(起始时间, 时长, [(频率, 幅度), ...], 起音, 衰减, 释音), ...]
+        """
+        num_samples = int(self.sample_rate * duration)
+        sin = math.sin
+        exp = math.exp
+        values = [0] * num_samples
+        times = self._times(num_samples)
+        for start, length, partials, attack, decay, release in voices:
+            omegas = [(2 * math.pi * freq, amplitude) for freq, amplitude in partials]
+            for i in range(bisect_left(times, start), num_samples):
+                note_t = times[i] - start
+                if note_t >= length:
+                    break
+                envelope = exp(-decay * note_t)
+                if note_t < attack:
+                    envelope *= note_t / attack
+                if length - note_t < release:
+                    envelope *= (length - note_t) / release
+                oscillator = 0
+                for omega, amplitude in omegas:
+                    oscillator += amplitude * sin(omega * note_t)
+                values[i] += envelope * oscillator
+        return array('i', [int(value * gain * FULL_SCALE) for value in values])
+
+
+class NumpySynth:
+    """NumPy 向量化合成后端"""
+
+    name = "numpy"
+
+    def __init__(self, sample_rate=SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self._time_table = np.zeros(0)
+
+    def _times(self, num_samples):
+        """时间轴 t[i] = i / sample_rate"""
+        if len(self._time_table) < num_samples:
+            self._time_table = np.arange(num_samples, dtype=np.float64) / self.sample_rate
+        return self._time_table[:num_samples]
+
+    @staticmethod
+    def _to_int(values):
+        """与 int() 相同的向零截断"""
+        return (values * FULL_SCALE).astype(np.int32)
+
+    def sine_wave(self, frequency, duration, volume=0.8):
+        """带 10ms 淡入淡出的正弦波"""
+        num_samples = int(self.sample_rate * duration)
+        fade_samples = int(0.01 * self.sample_rate)
+        index = np.arange(num_samples)
+        fade = np.ones(num_samples)
+        head = index < fade_samples
+        tail = index > num_samples - fade_samples
+        fade[head] = index[head] / fade_samples
+        fade[tail] = (num_samples - index[tail]) / fade_samples
+        omega = 2 * math.pi * frequency
+        return self._to_int(volume * fade * np.sin(omega * self._times(num_samples)))
+
+    def decay_tone(self, frequency, duration, volume=0.8, decay=3.0):
+        """指数衰减的单音"""
+        t = self._times(int(self.sample_rate * duration))
+        omega = 2 * math.pi * frequency
+        return self._to_int(volume * np.exp(-decay * t) * np.sin(omega * t))
+
+    def chord(self, frequencies, duration, amplitude, decay):
+        """共用一条衰减包络的和弦"""
+        t = self._times(int(self.sample_rate * duration))
+        envelope = amplitude * np.exp(-decay * t)
+        values = np.zeros(len(t))
+        for freq in frequencies:
+            values += envelope * np.sin(2 * math.pi * freq * t)
+        return self._to_int(values)
+
+    def alternating(self, freq1, freq2, switch_interval, duration, amplitude,
+                    hold, release):
+        """两个频率交替，保持 hold 秒后以 release 速率衰减"""
+        t = self._times(int(self.sample_rate * duration))
+        envelope = np.where(t < hold, 1.0, np.exp(-release * (t - hold)))
+        second = (t / switch_interval).astype(np.int64) % 2 == 1
+        omega = np.where(second, 2 * math.pi * freq2, 2 * math.pi * freq1)
+        return self._to_int(amplitude * envelope * np.sin(omega * t))
+
+    def notes(self, notes, duration, amplitude, decay):
+        """依次起音的若干衰减音符 [(频率, 起始时间, 时长), ...]"""
+        t = self._times(int(self.sample_rate * duration))
+        values = np.zeros(len(t))
+        for freq, start, note_duration in notes:
+            note_t = t - start
+            active = (t >= start) & (note_t < note_duration)
+            note_t = note_t[active]
+            values[active] += (amplitude * np.exp(-decay * note_t)
+                               * np.sin(2 * math.pi * freq * note_t))
+        return self._to_int(values)
+
+    def double_beep(self, frequency, beep_duration, gap, duration, amplitude, decay):
+        """间隔 gap 秒的两声短促衰减音"""
+        t = self._times(int(self.sample_rate * duration))
+        omega = 2 * math.pi * frequency
+        values = np.zeros(len(t))
+        first = (0 <= t) & (t < beep_duration)
+        second = (beep_duration + gap <= t) & (t < beep_duration * 2 + gap)
+        t1 = t[first]
+        t2 = t[second] - beep_duration - gap
+        values[first] = amplitude * np.exp(-decay * t1) * np.sin(omega * t1)
+        values[second] = amplitude * np.exp(-decay * t2) * np.sin(omega * t2)
+        return self._to_int(values)
+
+    def voices(self, voices, duration, gain):
+        """
+        声音配方编译出的声部叠加（见 recipes 模块）
+        voices: [(起始时间, 时长, [(频率, 幅度), ...], 起音, 衰减, 释音), ...]
+        """
+        t = self._times(int(self.sample_rate * duration))
+        values = np.zeros(len(t))
+        for start, length, partials, attack, decay, release in voices:
+            note_t = t - start
+            active = (t >= start) & (note_t < length)
+            note_t = note_t[active]
+            envelope = np.exp(-decay * note_t)
+            rising = note_t < attack
+            envelope[rising] *= note_t[rising] / attack
+            remaining = length - note_t
+            falling = remaining < release
+            envelope[falling] *= remaining[falling] / release
+            oscillator = np.zeros(len(note_t))
+            for freq, amplitude in partials:
+                oscillator += amplitude * np.sin(2 * math.pi * freq * note_t)
+            values[active] += envelope * oscillator
+        return self._to_int(values * gain)
+
+
+def encode_pcm16(samples):
+    """
+    将整段采样限幅并编码为 16 位小端 PCM 字节串
+    支持 NumPy 数组、array 以及普通整数序列
+    """
+    if HAS_NUMPY and isinstance(samples, np.ndarray):
+        return np.clip(samples, PCM16_MIN, PCM16_MAX).astype('<i2').tobytes()
+
+    if not len(samples):
+        return b""
+    if PCM16_MIN <= min(samples) and max(samples) <= PCM16_MAX:
+        pcm = array('h', samples)
+    else:
+        pcm = array('h', [PCM16_MIN if s < PCM16_MIN else PCM16_MAX if s > PCM16_MAX else s
+                          for s in samples])
+    if sys.byteorder == "big":
+        pcm.byteswap()
+    return pcm.tobytes()
+
+
+def create_synth(sample_rate=SAMPLE_RATE, backend=None):
+    """
+    创建合成后端
+    backend 为 None 时读取 POMODORO_SYNTH 环境变量，默认优先 NumPy
+    """
+    backend = backend or os.environ.get("POMODORO_SYNTH", "")
+    if backend == "array" or (backend != "numpy" and not HAS_NUMPY):
+        return ArraySynth(sample_rate)
+    if not HAS_NUMPY:
+        raise RuntimeError("未安装 NumPy，无法使用 numpy 合成后端")
+    return NumpySynth(sample_rate)
+
+
+def samples_equal(a, b):
+    """逐采样比较两段音频数据"""
+    return len(a) == len(b) and all(int(x) == int(y) for x, y in zip(a, b))
+
+
+def verify_backends(sample_rate=SAMPLE_RATE):
+    """
+    校验 NumPy 后端与纯 Python 后端的输出是否逐位一致
+    返回 {方法名: 是否一致}，未安装 NumPy 时返回空字典
+    """
+    if not HAS_NUMPY:
+        return {}
+
+    reference = ArraySynth(sample_rate)
+    vectorized = NumpySynth(sample_rate)
+    cases = {
+        "sine_wave": ((880, 0.5, 0.8), {}),
+        "decay_tone": ((1200, 0.3, 0.7, 8.0), {}),
+        "chord": (([523, 659, 784], 1.5, 0.3, 2.0), {}),
+        "alternating": ((800, 1000, 0.15, 2.0, 0.6, 1.5, 3), {}),
+        "notes": (([(880, 0.0, 0.3), (784, 0.15, 0.3), (659, 0.30, 0.4)], 1.0, 0.4, 5), {}),
+        "double_beep": ((1000, 0.1, 0.1, 0.6, 0.6, 10), {}),
+        "voices": (([(0.0, 0.5, [(440, 1.0), (880, 0.3)], 0.01, 4.0, 0.05),
+                     (0.2, 0.4, [(660, 0.8)], 0.0, 6.0, 0.02)], 0.7, 0.5), {}),
+    }
+
+    results = {}
+    for method, (args, kwargs) in cases.items():
+        expected = getattr(reference, method)(*args, **kwargs)
+        actual = getattr(vectorized, method)(*args, **kwargs)
+        results[method] = samples_equal(expected, actual)
+    return results
+
+
+if __name__ == "__main__":
+    if HAS_NUMPY:
+        for method, ok in verify_backends().items():
+            print(f"  - {method}: {'一致' if ok else '不一致'}")
+    else:
+        print("未安装 NumPy，仅可使用纯 Python 后端")
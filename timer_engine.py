@@ -0,0 +1,483 @@
+"""
+计时引擎模块
+============
+基于 time.monotonic() 截止时间的无漂移倒计时。
+
+功能：
+- 剩余时间由截止时间计算，而非每秒累减，调度抖动不会累积
+- 每次睡眠到下一个整秒边界
+- 暂停期间精确累计已用时间
+- 记录每次 tick 的实际偏差（drift）
+- 可注入时钟（FakeClock），无需真实等待即可模拟长时间会话
+- TimerEngine：与界面无关的番茄钟状态机，通过事件回调通知界面或命令行
+- 支持预先展开的专注/休息循环计划（cycles.CyclePlan），阶段切换按预计算的边界触发
+- 间隔提醒时刻在阶段开始时一次算好（reminders.ReminderPattern），计时中只取下一个
+"""
+
+import math
+import time
+import random
+import threading
+
+import metrics
+from cycles import CyclePlan, FOCUS
+from reminders import ReminderPattern
+
+
+class MonotonicCountdown:
+    """基于单调时钟截止时间的倒计时"""
+
+    def __init__(self, total_seconds, clock=time.monotonic, sleep=time.sleep):
+        """
+        total_seconds: 总时长（秒）
+        clock: 返回单调时间（秒）的函数
+        sleep: 睡眠函数，接收秒数
+        """
+        self.total_seconds = total_seconds
+        self._clock = clock
+        self._sleep = sleep
+
+        self._started_at = None    # 本段计时开始时刻
+        self._elapsed_before = 0.0  # 之前各段已累计的时间
+        self._paused = False
+        self._pending_boundary = None
+
+        # 偏差统计（秒，正数表示晚于预期）
+        self.last_drift = 0.0
+        self.max_drift = 0.0
+        self.tick_count = 0
+        self.completion_drift = None
+
+    # ---------- 状态控制 ----------
+
+    def start(self, elapsed=0.0):
+        """开始计时；elapsed 为之前已用的时间（从检查点恢复时使用）"""
+        self._started_at = self._clock()
+        self._elapsed_before = elapsed
+        self._paused = False
+
+    def pause(self):
+        """暂停：把本段已用时间并入累计值"""
+        if self._started_at is not None and not self._paused:
+            self._elapsed_before += self._clock() - self._started_at
+            self._paused = True
+
+    def resume(self):
+        """继续：重新记录本段开始时刻"""
+        if self._paused:
+            self._started_at = self._clock()
+            self._paused = False
+
+    @property
+    def is_paused(self):
+        return self._paused
+
+    @property
+    def started(self):
+        return self._started_at is not None
+
+    # ---------- 时间查询 ----------
+
+    def elapsed(self):
+        """已专注的时间（秒，不含暂停）"""
+        if self._started_at is None:
+            return 0.0
+        if self._paused:
+            return self._elapsed_before
+        return self._elapsed_before + (self._clock() - self._started_at)
+
+    def remaining(self):
+        """剩余时间（秒，浮点）"""
+        return max(0.0, self.total_seconds - self.elapsed())
+
+    def remaining_seconds(self):
+        """剩余整秒数（用于显示，向下取整的已用秒数）"""
+        return max(0, self.total_seconds - int(self.elapsed()))
+
+    def deadline(self):
+        """按当前暂停情况推算的完成时刻（单调时钟）"""
+        if self._started_at is None or self._paused:
+            return None
+        return self._started_at + (self.total_seconds - self._elapsed_before)
+
+    @property
+    def finished(self):
+        return self.started and self.elapsed() >= self.total_seconds
+
+    # ---------- 调度 ----------
+
+    def next_tick_delay(self):
+        """
+        计算距离下一个整秒边界的时间，并记住该边界供 mark_tick() 计算偏差
+        适用于由外部事件循环（如 Tk 的 after）调度的场景
+        """
+        elapsed = self.elapsed()
+        self._pending_boundary = min(math.floor(elapsed) + 1, self.total_seconds)
+        return max(0.0, self._pending_boundary - elapsed)
+
+    def mark_tick(self):
+        """
+        在被唤醒后调用：记录相对预期边界的偏差，返回新的剩余整秒数
+        提前唤醒（偏差为负）时不计入统计
+        """
+        boundary = self._pending_boundary
+        if boundary is not None and not self._paused:
+            drift = self.elapsed() - boundary
+            if drift >= 0:
+                self._pending_boundary = None
+                self.last_drift = drift
+                self.max_drift = max(self.max_drift, drift)
+                self.tick_count += 1
+                if boundary >= self.total_seconds and self.completion_drift is None:
+                    self.completion_drift = drift
+        return self.remaining_seconds()
+
+    def sleep_until_next_tick(self):
+        """
+        睡眠到下一个整秒边界并记录偏差
+        返回新的剩余整秒数；睡眠被提前打断时返回值可能不变
+        """
+        delay = self.next_tick_delay()
+        if delay > 0:
+            self._sleep(delay)
+        return self.mark_tick()
+
+
+# 计时器状态
+IDLE = "idle"
+RUNNING = "running"
+PAUSED = "paused"
+FINISHED = "finished"
+
+
+class TimerEngine:
+    """
+    番茄钟计时状态机（不依赖任何界面库）
+
+    事件（通过 subscribe 注册回调）：
+    - "state"：状态变化，参数为新状态
+    - "tick"：当前阶段剩余整秒数变化，参数为剩余秒数
+    - "reminder"：间隔提醒（仅专注阶段），参数为本阶段已专注分钟数
+    - "prearm"：距下一个阶段边界不足 prearm_seconds 秒，参数为下一个阶段（计划结束时为 None）
+    - "phase"：进入新阶段，参数为 (新阶段, 上一阶段的 phase_summary())
+    - "complete"：整个计划完成
+
+    驱动方式：
+    - 外部事件循环：用 next_delay() 预约，到时调用 tick()
+    - 阻塞运行：run()，适合后台线程或命令行
+    回调在驱动 tick 的线程中执行。
+    """
+
+    EVENTS = ("state", "tick", "reminder", "prearm", "phase", "complete")
+    PREARM_SECONDS = 3  # 提前多少秒预备下一阶段的提示音
+
+    def __init__(self, clock=time.monotonic, sleep=None):
+        """
+        clock: 单调时钟函数
+        sleep: run() 使用的睡眠函数；默认使用可被暂停/重置打断的等待
+        """
+        self._clock = clock
+        self._wakeup = threading.Event()
+        self._sleep = sleep or self._wakeup.wait
+        self._listeners = {event: [] for event in self.EVENTS}
+
+        self.state = IDLE
+        self.countdown = None
+        self.plan = None
+        self.phase_index = 0
+        self.total_seconds = 0       # 当前阶段时长
+        self.remaining_seconds = 0   # 当前阶段剩余整秒数
+        self.reminder_pattern = None
+        self.reminder_deadlines = []  # 当前阶段的提醒时刻（相对计划开始的秒数）
+        self._next_reminder = 0
+        self.interval_enabled = True
+        self.prearm_seconds = self.PREARM_SECONDS
+        self.pauses = 0              # 当前阶段的暂停次数
+        self.reminders = 0           # 当前阶段的间隔提醒次数
+        self._armed = False
+
+        self._last_tick_at = None
+        self._tick_interval = metrics.histogram(
+            "pomodoro_tick_interval_seconds", "相邻两次 tick 的实际间隔")
+        self._tick_drift = metrics.histogram(
+            "pomodoro_tick_drift_seconds", "tick 相对预期整秒边界的延迟")
+
+    # ---------- 事件 ----------
+
+    def subscribe(self, event, callback):
+        """注册事件回调"""
+        self._listeners[event].append(callback)
+
+    def _emit(self, event, *args):
+        for callback in self._listeners[event]:
+            callback(*args)
+
+    def _set_state(self, state):
+        self.state = state
+        self._wakeup.set()
+        self._emit("state", state)
+
+    # ---------- 状态 ----------
+
+    @property
+    def is_running(self):
+        return self.state in (RUNNING, PAUSED)
+
+    @property
+    def is_paused(self):
+        return self.state == PAUSED
+
+    @property
+    def phase(self):
+        """当前阶段（未开始时为 None）"""
+        return self.plan[self.phase_index] if self.plan else None
+
+    def elapsed(self):
+        """整个计划已运行的秒数（不含暂停）"""
+        return self.countdown.elapsed() if self.countdown else 0.0
+
+    def phase_elapsed(self):
+        """当前阶段已运行的秒数（不含暂停）"""
+        phase = self.phase
+        if phase is None:
+            return 0.0
+        return min(max(0.0, self.elapsed() - phase.start), phase.end - phase.start)
+
+    def phase_summary(self):
+        """当前阶段的小结，用于记录专注历史"""
+        phase = self.phase
+        return {
+            "kind": phase.kind if phase else FOCUS,
+            "planned_seconds": self.total_seconds,
+            "focused_seconds": self.phase_elapsed(),
+            "pauses": self.pauses,
+            "reminders": self.reminders,
+        }
+
+    # ---------- 控制 ----------
+
+    def start(self, total_seconds=None, interval_seconds=0, plan=None, reminder_pattern=None):
+        """
+        开始一次新的倒计时
+        total_seconds: 单个专注阶段的时长；给出 plan 时忽略
+        interval_seconds: 均匀的间隔提醒（秒），0 表示不提醒
+        plan: cycles.CyclePlan，按计划依次运行各个阶段
+        reminder_pattern: reminders.ReminderPattern，给出时代替 interval_seconds
+        """
+        self.plan = plan or CyclePlan.single(total_seconds)
+        if reminder_pattern is None and interval_seconds > 0:
+            reminder_pattern = ReminderPattern(interval_seconds)
+        self.reminder_pattern = reminder_pattern or None
+        self.countdown = MonotonicCountdown(self.plan.total_seconds, clock=self._clock)
+        self.countdown.start()
+        self._last_tick_at = None
+        self._enter_phase(0)
+        self._set_state(RUNNING)
+
+    def restore(self, plan, elapsed, phase_index=None, paused=False, pauses=0, reminders=0,
+                reminder_pattern=None, offline=0.0):
+        """
+        从检查点恢复计时
+        elapsed: 检查点写入时计划已运行的秒数（不含暂停），此前的间隔提醒视为已触发
+        phase_index: 检查点所在的阶段
+        offline: 检查点之后停机经过的秒数，计入已运行时间；越过阶段边界时下一次 tick
+                 依次补发错过的阶段切换，超过计划总时长时补发完成事件，
+                 错过的间隔提醒与 tick 长时间阻塞时一样只合并提醒一次
+        """
+        total = elapsed + offline
+        self.plan = plan
+        self.reminder_pattern = reminder_pattern or None
+        self.countdown = MonotonicCountdown(plan.total_seconds, clock=self._clock)
+        self.countdown.start(min(total, plan.total_seconds))
+        if paused:
+            self.countdown.pause()
+        self._last_tick_at = None
+        self._enter_phase(plan.phase_index(elapsed) if phase_index is None else phase_index)
+        self.pauses = pauses
+        self.reminders = reminders
+        deadlines = self.reminder_deadlines
+        while self._next_reminder < len(deadlines) and deadlines[self._next_reminder] <= elapsed:
+            self._next_reminder += 1
+        self.remaining_seconds = max(0, plan.ends[plan.phase_index(total)] - int(total))
+        self._set_state(PAUSED if paused else RUNNING)
+
+    def _enter_phase(self, index):
+        """切换到第 index 个阶段并重置阶段内的状态"""
+        self.phase_index = index
+        phase = self.plan[index]
+        self.total_seconds = phase.end - phase.start
+        self.remaining_seconds = self.total_seconds
+        if self.reminder_pattern and phase.kind == FOCUS:
+            self.reminder_deadlines = [phase.start + offset
+                                       for offset in self.reminder_pattern.offsets(self.total_seconds)]
+        else:
+            self.reminder_deadlines = []
+        self._next_reminder = 0
+        self.pauses = 0
+        self.reminders = 0
+        self._armed = False
+
+    def pause(self):
+        """暂停"""
+        if self.state == RUNNING:
+            self.countdown.pause()
+            self._last_tick_at = None
+            self.pauses += 1
+            self._set_state(PAUSED)
+
+    def resume(self):
+        """继续"""
+        if self.state == PAUSED:
+            self.countdown.resume()
+            self._set_state(RUNNING)
+
+    def toggle(self):
+        """暂停/继续切换"""
+        if self.state == RUNNING:
+            self.pause()
+        elif self.state == PAUSED:
+            self.resume()
+
+    def reset(self, total_seconds=None):
+        """停止计时并回到空闲状态"""
+        if total_seconds is not None:
+            self.total_seconds = total_seconds
+        self.remaining_seconds = self.total_seconds
+        self._set_state(IDLE)
+
+    # ---------- 驱动 ----------
+
+    def next_delay(self):
+        """距离下一次 tick 的秒数；未在计时中时返回 None"""
+        if self.state != RUNNING:
+            return None
+        return self.countdown.next_tick_delay()
+
+    def tick(self):
+        """处理一次 tick：更新剩余时间、检查间隔提醒、阶段切换和完成"""
+        if self.state != RUNNING:
+            return
+        now = self._clock()
+        if self._last_tick_at is not None:
+            self._tick_interval.record(now - self._last_tick_at)
+        self._last_tick_at = now
+        ticks = self.countdown.tick_count
+        elapsed = self.countdown.total_seconds - self.countdown.mark_tick()
+        if self.countdown.tick_count != ticks:
+            self._tick_drift.record(self.countdown.last_drift)
+
+        # 阶段边界是预先算好的整秒偏移，与 tick 边界重合，只需比较
+        last = len(self.plan) - 1
+        entered = False
+        while self.phase_index < last and elapsed >= self.plan.ends[self.phase_index]:
+            summary = self.phase_summary()
+            self._enter_phase(self.phase_index + 1)
+            entered = True
+            self._emit("phase", self.phase, summary)
+            if self.state != RUNNING:
+                return
+
+        remaining = self.plan.ends[self.phase_index] - elapsed
+        if remaining != self.remaining_seconds or entered:
+            self.remaining_seconds = remaining
+            self._emit("tick", remaining)
+            if (self._next_reminder < len(self.reminder_deadlines)
+                    and elapsed >= self.reminder_deadlines[self._next_reminder]):
+                self._fire_reminder(elapsed)
+            if not self._armed and 0 < remaining <= self.prearm_seconds:
+                self._armed = True
+                upcoming = self.phase_index + 1
+                self._emit("prearm", self.plan[upcoming] if upcoming <= last else None)
+        if self.remaining_seconds <= 0 and self.state == RUNNING:
+            self._set_state(FINISHED)
+            self._emit("complete")
+
+    def _fire_reminder(self, elapsed):
+        """
+        取出已到期的提醒时刻；错过多个时（如长时间阻塞）只提醒一次
+        提醒时刻相对阶段开始预先算好，tick 延迟不会推迟后续提醒
+        """
+        deadlines = self.reminder_deadlines
+        index = self._next_reminder
+        while index < len(deadlines) and elapsed >= deadlines[index]:
+            index += 1
+        self._next_reminder = index
+        if self.interval_enabled:
+            self.reminders += 1
+            self._emit("reminder", (deadlines[index - 1] - self.phase.start) // 60)
+
+    def run(self):
+        """
+        阻塞运行直到完成或重置
+        暂停期间阻塞等待状态变化，不做轮询
+        """
+        while True:
+            self._wakeup.clear()
+            if self.state == PAUSED:
+                self._wakeup.wait()
+                continue
+            if self.state != RUNNING:
+                return self.state
+            delay = self.countdown.next_tick_delay()
+            if delay > 0:
+                self._sleep(delay)
+            self.tick()
+
+
+class FakeClock:
+    """
+    可注入的模拟时钟
+    sleep() 只推进虚拟时间，并可附加随机的过睡时间模拟调度抖动
+    """
+
+    def __init__(self, start=1000.0, jitter=0.0, seed=0):
+        self.now = start
+        self.jitter = jitter
+        self._random = random.Random(seed)
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        """推进虚拟时间（附加 0~jitter 秒的随机延迟）"""
+        self.now += max(0.0, seconds)
+        if self.jitter:
+            self.now += self._random.uniform(0, self.jitter)
+
+    def advance(self, seconds):
+        """模拟处理耗时"""
+        self.now += seconds
+
+
+def simulate_session(total_seconds, jitter=0.005, work=0.002, pauses=(), seed=0):
+    """
+    用模拟时钟运行一次完整会话
+    jitter: 每次睡眠的最大过睡时间
+    work: 每个 tick 的处理耗时（模拟界面更新和间隔提醒）
+    pauses: [(在剩余多少秒时暂停, 暂停时长), ...]
+    返回倒计时对象，可查看 completion_drift / max_drift
+    """
+    clock = FakeClock(jitter=jitter, seed=seed)
+    countdown = MonotonicCountdown(total_seconds, clock=clock, sleep=clock.sleep)
+    pending_pauses = sorted(pauses, reverse=True)
+    countdown.start()
+
+    while not countdown.finished:
+        remaining = countdown.sleep_until_next_tick()
+        clock.advance(work)
+        if pending_pauses and remaining <= pending_pauses[0][0]:
+            _, pause_length = pending_pauses.pop(0)
+            countdown.pause()
+            clock.advance(pause_length)
+            countdown.resume()
+
+    return countdown
+
+
+if __name__ == "__main__":
+    # 模拟一次 2 小时会话（含抖动、处理耗时和两次暂停）
+    session = simulate_session(2 * 60 * 60, pauses=[(5400, 120.5), (600, 33.3)])
+    print(f"tick 次数: {session.tick_count}")
+    print(f"完成偏差: {session.completion_drift * 1000:.3f} ms")
+    print(f"最大 tick 偏差: {session.max_drift * 1000:.3f} ms")
+    assert abs(session.completion_drift) < 0.010, "完成偏差超过 10 ms"